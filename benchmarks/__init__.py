@@ -0,0 +1,5 @@
+"""Benchmark commands (bench_*) and the local service fakes the tests share.
+
+A development-only app: settings installs it only when requirements-dev.txt
+is present, and nothing in the ``image`` app imports it.
+"""
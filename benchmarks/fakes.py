@@ -0,0 +1,319 @@
+"""Local fakes of the external services, shared by image/tests.py and the bench_* commands.
+
+FakeGCSServer speaks the subset of the GCS JSON API the google-cloud-storage
+client uses here (object metadata, ranged media download, multipart and
+resumable uploads) plus the unsigned ``PUT /<bucket>/<object>`` that
+generate_upload_url() hands out under STORAGE_EMULATOR_HOST. FakeModelServer
+answers generateContent like Gemini, with a configurable latency.
+
+use_fake_redis() swaps the shared Redis pools for an in-memory fakeredis
+server, and peak_rss() samples this process's resident set while a block runs.
+"""
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+import google_crc32c
+
+from image.utils import redis_pool
+
+
+class _StoredObject:
+    """업로드된 오브젝트. keep_data=False면 바이트는 버리고 크기/해시만 남긴다."""
+
+    def __init__(self, content_type: str, keep_data: bool):
+        self.content_type = content_type
+        self.keep_data = keep_data
+        self.data = bytearray()
+        self.size = 0
+        self._md5 = hashlib.md5()
+        self._crc = google_crc32c.Checksum()
+
+    def append(self, chunk: bytes) -> None:
+        if self.keep_data:
+            self.data.extend(chunk)
+        self.size += len(chunk)
+        self._md5.update(chunk)
+        self._crc.update(chunk)
+
+    def resource(self, bucket: str, name: str) -> Dict:
+        return {
+            "bucket": bucket,
+            "name": name,
+            "size": str(self.size),
+            "contentType": self.content_type,
+            "md5Hash": base64.b64encode(self._md5.digest()).decode(),
+            "crc32c": base64.b64encode(self._crc.digest()).decode(),
+            "generation": "1",
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # keep-alive를 지원해야 클라이언트의 커넥션 재사용을 확인할 수 있다
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _send(self, status: int, body: bytes = b"", headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _FakeGCSHandler(_Handler):
+
+    def _send_resource(self, bucket: str, name: str) -> None:
+        body = json.dumps(self.server.objects[(bucket, name)].resource(bucket, name)).encode()
+        self._send(200, body, {"Content-Type": "application/json"})
+
+    def _store(self, bucket: str, name: str, data: bytes, content_type: str) -> None:
+        obj = _StoredObject(content_type, self.server.keep_data)
+        obj.append(data)
+        self.server.objects[(bucket, name)] = obj
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        m = re.fullmatch(r"(/download)?/storage/v1/b/([^/]+)/o/(.+)", url.path)
+        if not m:
+            return self._send(404)
+        download, bucket, name = m.group(1), m.group(2), unquote(m.group(3))
+        obj = self.server.objects.get((bucket, name))
+        if obj is None:
+            return self._send(404, b'{"error": {"code": 404}}', {"Content-Type": "application/json"})
+        if not download:
+            return self._send_resource(bucket, name)
+        data = bytes(obj.data)
+        rng = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+        if rng:
+            start = int(rng.group(1))
+            end = min(int(rng.group(2) or len(data) - 1), len(data) - 1)
+            return self._send(206, data[start:end + 1], {
+                "Content-Type": obj.content_type,
+                "Content-Range": f"bytes {start}-{end}/{len(data)}",
+            })
+        self._send(200, data, {"Content-Type": obj.content_type})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self._body()
+        m = re.fullmatch(r"/upload/storage/v1/b/([^/]+)/o", url.path)
+        if not m:
+            return self._send(404)
+        bucket = m.group(1)
+        upload_type = parse_qs(url.query).get("uploadType", [""])[0]
+        if upload_type == "multipart":
+            boundary = re.search(r'boundary="?([^";]+)"?', self.headers["Content-Type"]).group(1).encode()
+            parts = body.split(b"--" + boundary)
+            meta = json.loads(parts[1].split(b"\r\n\r\n", 1)[1].strip())
+            media_headers, media = parts[2].split(b"\r\n\r\n", 1)
+            content_type = re.search(rb"content-type: *([^\r\n]+)", media_headers, re.I).group(1).decode()
+            self._store(bucket, meta["name"], media[:-2] if media.endswith(b"\r\n") else media, content_type)
+            return self._send_resource(bucket, meta["name"])
+        if upload_type == "resumable":
+            meta = json.loads(body or b"{}")
+            upload_id = uuid.uuid4().hex
+            content_type = self.headers.get("X-Upload-Content-Type") or meta.get("contentType") or ""
+            self.server.uploads[upload_id] = (bucket, meta["name"], _StoredObject(content_type, self.server.keep_data))
+            return self._send(200, b"", {"Location": f"http://{self.headers['Host']}/upload/resumable/{upload_id}"})
+        self._send(400)
+
+    def do_PUT(self):
+        url = urlparse(self.path)
+        m = re.fullmatch(r"/upload/resumable/([0-9a-f]+)", url.path)
+        if m:
+            bucket, name, obj = self.server.uploads[m.group(1)]
+            obj.append(self._body())
+            total = (self.headers.get("Content-Range") or "").rsplit("/", 1)[-1]
+            if total == "*":
+                return self._send(308, b"", {"Range": f"bytes=0-{obj.size - 1}"})
+            del self.server.uploads[m.group(1)]
+            self.server.objects[(bucket, name)] = obj
+            return self._send_resource(bucket, name)
+        # generate_upload_url()이 에뮬레이터용으로 돌려주는 PUT /<bucket>/<object>
+        bucket, _, name = url.path.lstrip("/").partition("/")
+        self._store(bucket, unquote(name), self._body(), self.headers.get("Content-Type") or "")
+        self._send(200)
+
+
+class FakeGCSServer:
+    """Threaded fake GCS endpoint; point STORAGE_EMULATOR_HOST at ``url``."""
+
+    def __init__(self, keep_data: bool = True, host: str = "127.0.0.1", port: int = 0):
+        self._httpd = ThreadingHTTPServer((host, port), _FakeGCSHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.keep_data = keep_data
+        self._httpd.objects = {}
+        self._httpd.uploads = {}
+        self.url = f"http://{host}:{self._httpd.server_port}"
+
+    @property
+    def objects(self) -> Dict[Tuple[str, str], _StoredObject]:
+        return self._httpd.objects
+
+    def put(self, bucket: str, name: str, data: bytes, content_type: str) -> None:
+        obj = _StoredObject(content_type, keep_data=True)
+        obj.append(data)
+        self._httpd.objects[(bucket, name)] = obj
+
+    def start(self) -> "FakeGCSServer":
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class _FakeModelHandler(_Handler):
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        self._body()
+        if not urlparse(self.path).path.endswith(":generateContent"):
+            return self._send(404)
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        try:
+            time.sleep(self.server.latency)
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+        body = json.dumps({
+            "candidates": [{
+                "content": {"role": "model", "parts": [
+                    {"inlineData": {"mimeType": "image/png", "data": self.server.image_b64}},
+                ]},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+        }).encode()
+        self._send(200, body, {"Content-Type": "application/json"})
+
+
+class FakeModelServer:
+    """Threaded stand-in for the Gemini generateContent endpoint.
+
+    Point GOOGLE_GENAI_BASE_URL at ``url``. Every call sleeps ``latency``
+    seconds and answers with ``image`` as inline PNG data; ``connections``
+    and ``max_in_flight`` show connection reuse and achieved concurrency.
+    """
+
+    def __init__(self, latency: float = 0.0, image: Optional[bytes] = None, host: str = "127.0.0.1", port: int = 0):
+        if image is None:
+            import io
+            from PIL import Image
+            buf = io.BytesIO()
+            Image.new("RGB", (64, 64), (40, 120, 200)).save(buf, format="PNG")
+            image = buf.getvalue()
+        self.image = image
+        self._httpd = ThreadingHTTPServer((host, port), _FakeModelHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.lock = threading.Lock()
+        self._httpd.latency = latency
+        self._httpd.image_b64 = base64.b64encode(image).decode("ascii")
+        self._httpd.connections = 0
+        self._httpd.requests = 0
+        self._httpd.in_flight = 0
+        self._httpd.max_in_flight = 0
+        self.url = f"http://{host}:{self._httpd.server_port}"
+
+    @property
+    def connections(self) -> int:
+        return self._httpd.connections
+
+    @property
+    def requests(self) -> int:
+        return self._httpd.requests
+
+    @property
+    def max_in_flight(self) -> int:
+        return self._httpd.max_in_flight
+
+    def start(self) -> "FakeModelServer":
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def use_fake_redis() -> Callable[[], None]:
+    """utils/redis_pool의 동기/비동기 풀을 새 fakeredis 서버로 바꾸고, 원래대로 돌리는 함수를 반환."""
+    import fakeredis
+    import fakeredis.aioredis
+    import redis
+    import redis.asyncio as aioredis
+
+    server = fakeredis.FakeServer()
+    saved = dict(redis_pool._pools), dict(redis_pool._async_pools)
+    for decode in (True, False):
+        redis_pool._pools[decode] = redis.ConnectionPool(
+            connection_class=fakeredis.FakeConnection, server=server, decode_responses=decode)
+        redis_pool._async_pools[decode] = aioredis.ConnectionPool(
+            connection_class=fakeredis.aioredis.FakeConnection, server=server, decode_responses=decode)
+
+    def restore():
+        redis_pool._pools.clear()
+        redis_pool._pools.update(saved[0])
+        redis_pool._async_pools.clear()
+        redis_pool._async_pools.update(saved[1])
+    return restore
+
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss() -> int:
+    """현재 RSS(bytes). /proc이 없는 플랫폼에서는 0."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return 0
+
+
+@contextmanager
+def peak_rss(interval: float = 0.002):
+    """블록 실행 중 RSS를 샘플링해 기준 대비 최대 증가량을 result["peak"]에 남긴다."""
+    result = {"peak": 0}
+    baseline = current_rss()
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            result["peak"] = max(result["peak"], current_rss() - baseline)
+            time.sleep(interval)
+
+    t = threading.Thread(target=sample, daemon=True)
+    t.start()
+    try:
+        yield result
+    finally:
+        done.set()
+        t.join()
+        result["peak"] = max(result["peak"], current_rss() - baseline)
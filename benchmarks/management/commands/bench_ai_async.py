@@ -0,0 +1,158 @@
+import asyncio
+import io
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+
+from benchmarks.fakes import FakeGCSServer, FakeModelServer, use_fake_redis
+from image.utils import gcs, genai_client
+
+
+@contextmanager
+def fake_backends(latency: float):
+    """Redis/GCS/Gemini를 전부 로컬 fake로 돌린다. 모델 서버(FakeModelServer)를 넘겨준다."""
+    model = FakeModelServer(latency=latency).start()
+    storage = FakeGCSServer(keep_data=False).start()
+    spool = tempfile.TemporaryDirectory()
+    restore_redis = use_fake_redis()
+    overrides = override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+        GOOGLE_GENAI_API_KEY="bench",
+        GOOGLE_GENAI_BASE_URL=model.url,
+        GCS_BUCKET_NAME="bench",
+        GCS_PUBLIC_URL_PREFIX="http://bench",
+        HANDOFF_BACKEND="spool",
+        HANDOFF_SPOOL_DIR=spool.name,
+        # 같은 사진이 캐시로 끝나거나 한도에 막히지 않도록
+        AI_RESULT_CACHE_ENABLED=False,
+        AI_MODEL_LIMITS={"default": {"rpm": 0, "concurrency": 0}},
+    )
+    try:
+        with mock.patch.dict(os.environ, {"STORAGE_EMULATOR_HOST": storage.url}), overrides:
+            gcs._reset_client()
+            genai_client._reset_client()
+            yield model
+    finally:
+        gcs._reset_client()
+        genai_client._reset_client()
+        restore_redis()
+        spool.cleanup()
+        storage.stop()
+        model.stop()
+
+
+def _create_jobs(count: int):
+    from PIL import Image
+
+    from image.models import AIJob, Session, Style
+    from image.utils.handoff import stash_original
+
+    style, _ = Style.objects.get_or_create(code="bench", defaults={"name": "Bench", "prompt": "cartoon"})
+    buf = io.BytesIO()
+    Image.new("RGB", (512, 384), (90, 140, 200)).save(buf, format="JPEG", quality=90)
+    photo = buf.getvalue()
+    job_ids = []
+    for _ in range(count):
+        session = Session.objects.create(style=style)
+        stash_original(str(session.uuid), photo)
+        job_ids.append(AIJob.objects.create(session=session, request_payload={}).id)
+    return job_ids
+
+
+def _finished(job_ids):
+    from image.models import AIJob
+    return AIJob.objects.filter(
+        id__in=job_ids, status__in=[AIJob.Status.SUCCEEDED, AIJob.Status.FAILED]
+    ).count()
+
+
+async def _run_async(job_ids, concurrency: int) -> float:
+    from image.async_runner import AsyncAIRunner, _db, enqueue
+
+    loop = asyncio.get_running_loop()
+    # run_ai_async_worker와 같은 스레드 풀 크기
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency + 4))
+    for job_id in job_ids:
+        enqueue(job_id)
+    runner = AsyncAIRunner(concurrency=concurrency, name=f"bench-{uuid.uuid4().hex[:8]}")
+    started = time.perf_counter()
+    task = asyncio.create_task(runner.run())
+    while await _db(_finished)(job_ids) < len(job_ids):
+        await asyncio.sleep(0.02)
+    elapsed = time.perf_counter() - started
+    runner.stop()
+    await task
+    return elapsed
+
+
+def run_benchmark(jobs: int, concurrency: int, sequential_jobs: int, model: FakeModelServer) -> dict:
+    """Run ``sequential_jobs`` through the Celery task body one by one, then ``jobs`` through the asyncio runner."""
+    from image.models import AIJob
+    from image.tasks import run_ai_generation_task
+
+    # 클라이언트 생성/첫 커넥션 비용은 측정에서 뺀다
+    warm_up = _create_jobs(1)
+    run_ai_generation_task(warm_up[0])
+
+    sequential_ids = _create_jobs(sequential_jobs)
+    started = time.perf_counter()
+    for job_id in sequential_ids:
+        # 프리포크 프로세스 하나가 하는 일과 같다: 한 번에 작업 하나
+        run_ai_generation_task(job_id)
+    sequential_s = (time.perf_counter() - started) / max(1, sequential_jobs)
+
+    async_ids = _create_jobs(jobs)
+    requests_before = model.requests
+    elapsed = asyncio.run(_run_async(async_ids, concurrency))
+    return {
+        "sequential_ms_per_job": sequential_s * 1000,
+        "async_elapsed_s": elapsed,
+        "async_jobs_per_s": jobs / elapsed,
+        "speedup": (jobs / elapsed) * sequential_s,
+        "model_requests": model.requests - requests_before,
+        "model_max_in_flight": model.max_in_flight,
+        "model_connections": model.connections,
+        "failed": AIJob.objects.filter(id__in=warm_up + sequential_ids + async_ids, status=AIJob.Status.FAILED).count(),
+    }
+
+
+class Command(BaseCommand):
+    help = ("Benchmark the asyncio AI executor against one job at a time, with a local fake model server, "
+            "fake GCS and fakeredis. Runs in a throwaway test database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--jobs", type=int, default=64)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--latency", type=float, default=1.0, help="Seconds the fake model takes per call")
+        parser.add_argument("--sequential-jobs", type=int, default=4)
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            # 공유 캐시 메모리 DB는 스레드 간 동시 쓰기에서 "table is locked"가 나므로 파일로 만들고,
+            # 읽다가 쓰기로 올라가는 트랜잭션이 바로 "database is locked"로 끝나지 않게 IMMEDIATE로 연다
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(tempfile.gettempdir(), "bench_ai_async.sqlite3")
+            connection.settings_dict["OPTIONS"] = {**connection.settings_dict["OPTIONS"],
+                                                   "transaction_mode": "IMMEDIATE", "timeout": 30}
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with fake_backends(options["latency"]) as model:
+                stats = run_benchmark(options["jobs"], options["concurrency"], options["sequential_jobs"], model)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(f"fake model latency: {options['latency']:.2f}s")
+        self.stdout.write(f"one job at a time: {stats['sequential_ms_per_job']:.0f} ms/job "
+                          f"({1000 / stats['sequential_ms_per_job']:.2f} jobs/s per process)")
+        self.stdout.write(f"asyncio runner (concurrency {options['concurrency']}): {options['jobs']} jobs in "
+                          f"{stats['async_elapsed_s']:.2f}s = {stats['async_jobs_per_s']:.2f} jobs/s "
+                          f"({stats['speedup']:.1f}x)")
+        self.stdout.write(f"model: {stats['model_requests']} requests, peak in-flight {stats['model_max_in_flight']}, "
+                          f"{stats['model_connections']} connections; failed jobs: {stats['failed']}")
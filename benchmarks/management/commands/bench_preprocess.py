@@ -0,0 +1,68 @@
+import io
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from image.utils.preprocess import preprocess_for_model
+
+
+def synthetic_photo(width: int, height: int) -> bytes:
+    """사진처럼 그라디언트 위에 센서 노이즈가 있는 JPEG (무작위 노이즈만 있으면 압축률이 비현실적)."""
+    from PIL import Image, ImageChops, ImageFilter
+
+    gradient = Image.linear_gradient("L").resize((width, height))
+    base = Image.merge("RGB", (gradient, gradient.rotate(90).resize((width, height)), gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    noise = Image.effect_noise((width, height), 24).filter(ImageFilter.GaussianBlur(1)).convert("RGB")
+    img = ImageChops.add(base, noise, scale=1.2, offset=-40)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=92)
+    return buf.getvalue()
+
+
+def _legacy_payload(data: bytes) -> bytes:
+    # user-009 이전 경로: 원본 해상도 그대로 RGBA 무손실 PNG
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as img:
+        buf = io.BytesIO()
+        img.convert("RGBA").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class Command(BaseCommand):
+    help = "Compare AI request payload size and encode time: full-size RGBA PNG vs preprocess_for_model."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--input", help="Photo to use (default: a synthetic 12MP JPEG)")
+        parser.add_argument("--width", type=int, default=4032)
+        parser.add_argument("--height", type=int, default=3024)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        if options["input"]:
+            with open(options["input"], "rb") as f:
+                data = f.read()
+        else:
+            data = synthetic_photo(options["width"], options["height"])
+
+        default = settings.AI_PREPROCESS
+        variants = [("legacy RGBA PNG (full size)", _legacy_payload)]
+        for fmt, quality in ((default["format"], default["quality"]), ("JPEG", 85), ("WEBP", 80)):
+            opts = {**default, "format": fmt, "quality": quality}
+            variants.append((f"{fmt} q{quality} max_side {opts['max_side']}",
+                             lambda d, opts=opts: preprocess_for_model(d, opts)[0]))
+
+        self.stdout.write(f"input: {len(data) / 1024:.0f} KB, repeat {options['repeat']}")
+        baseline = None
+        for name, fn in variants:
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                payload = fn(data)
+                timings.append(time.perf_counter() - started)
+            baseline = baseline or len(payload)
+            self.stdout.write(
+                f"{name:<34} {len(payload) / 1024:9.0f} KB ({len(payload) / baseline:6.1%})"
+                f"  {statistics.median(timings) * 1000:8.1f} ms"
+            )
@@ -0,0 +1,72 @@
+import io
+import statistics
+import time
+
+from django.core.files.images import get_image_dimensions
+from django.core.management.base import BaseCommand
+
+from benchmarks.management.commands.bench_preprocess import synthetic_photo
+from image.utils.images import probe_image
+
+
+class _CountingReader(io.BytesIO):
+    """read()로 실제로 읽어 간 바이트 수를 센다."""
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def _legacy_validate(f) -> None:
+    # user-025 이전 경로: ImageField 검증(verify) + get_image_size + 업로드 전 전체 read()
+    from PIL import Image
+    with Image.open(f) as img:
+        img.verify()
+    f.seek(0)
+    get_image_dimensions(f)
+    f.seek(0)
+    f.read()
+
+
+def _full_decode(f) -> None:
+    from PIL import Image
+    with Image.open(f) as img:
+        img.load()
+
+
+class Command(BaseCommand):
+    help = "Compare upload validation cost: the old verify + dimensions + read() path, a full decode and probe_image."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--input", help="Photo to use (default: a synthetic 12MP JPEG)")
+        parser.add_argument("--width", type=int, default=4032)
+        parser.add_argument("--height", type=int, default=3024)
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, **options):
+        if options["input"]:
+            with open(options["input"], "rb") as f:
+                data = f.read()
+        else:
+            data = synthetic_photo(options["width"], options["height"])
+
+        variants = (
+            ("verify + dimensions + read()", _legacy_validate),
+            ("full decode (load)", _full_decode),
+            ("probe_image (header + tail)", probe_image),
+        )
+        self.stdout.write(f"input: {len(data) / 1024:.0f} KB, repeat {options['repeat']}")
+        for name, fn in variants:
+            timings = []
+            for _ in range(options["repeat"]):
+                f = _CountingReader(data)
+                started = time.perf_counter()
+                fn(f)
+                timings.append(time.perf_counter() - started)
+            self.stdout.write(f"{name:<30} {statistics.median(timings) * 1000:8.2f} ms"
+                              f"  {f.bytes_read / 1024:9.0f} KB read")
@@ -0,0 +1,43 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from image.utils.qr import build_redirect_url, generate_slug, make_qr_png, make_qr_pngs
+
+
+class Command(BaseCommand):
+    help = "Compare batch QR rendering (make_qr_pngs) with one make_qr_png call per code on mixed-length URLs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=200)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--long-every", type=int, default=10,
+                            help="Every Nth URL gets a long query string (0 = all URLs are short)")
+
+    def handle(self, *args, **options):
+        urls = []
+        for i in range(options["count"]):
+            url = build_redirect_url(generate_slug())
+            if options["long_every"] and i % options["long_every"] == 0:
+                # 긴 URL 뒤의 짧은 URL이 큰 버전으로 그려지던 회귀를 잡는다
+                url += "?" + "utm_campaign=booth&" * 8
+            urls.append(url)
+
+        variants = (
+            ("make_qr_png per code", lambda: [make_qr_png(u) for u in urls]),
+            ("make_qr_pngs batch", lambda: make_qr_pngs(urls)),
+        )
+        outputs = {}
+        self.stdout.write(f"{len(urls)} URLs, repeat {options['repeat']}")
+        for name, fn in variants:
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                outputs[name] = fn()
+                timings.append(time.perf_counter() - started)
+            total = sum(len(png) for png in outputs[name])
+            self.stdout.write(f"{name:<22} {statistics.median(timings) / len(urls) * 1000:7.2f} ms/code"
+                              f"  {total / len(urls):7.0f} B/code")
+        per_code, batch = (outputs[name] for name, _ in variants)
+        self.stdout.write("identical output: " + ("yes" if per_code == batch else "NO"))
@@ -0,0 +1,93 @@
+import asyncio
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+
+from benchmarks.fakes import current_rss, use_fake_redis
+from image.utils.events import publish_session_event
+from image.utils.sse_hub import astream_session_events, get_event_hub
+
+
+class Command(BaseCommand):
+    help = "Hold many concurrent SSE streams in one event loop and measure fan-out latency and memory per client."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=2000)
+        parser.add_argument("--sessions", type=int, default=500, help="Clients are spread evenly over this many sessions")
+        parser.add_argument("--events", type=int, default=5, help="Events published per session")
+        parser.add_argument("--fake-redis", action="store_true",
+                            help="Use an in-memory fakeredis server instead of REDIS_URL")
+
+    def handle(self, *args, **options):
+        restore = use_fake_redis() if options["fake_redis"] else None
+        try:
+            stats = asyncio.run(self._run(options["clients"], options["sessions"], options["events"]))
+        finally:
+            if restore is not None:
+                restore()
+
+        self.stdout.write(f"clients: {stats['clients']} over {stats['sessions']} sessions, "
+                          f"{stats['events']} events/session")
+        self.stdout.write(f"connect: {stats['connect_s']:.2f}s total, RSS +{stats['rss_per_client'] / 1024:.1f} KB/client")
+        self.stdout.write(f"frames delivered: {stats['frames']} (expected {stats['expected']})")
+        self.stdout.write(f"fan-out latency: p50 {stats['p50_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms, "
+                          f"max {stats['max_ms']:.1f} ms")
+        self.stdout.write(f"redis subscriptions held by the hub: 1 (subscribers: {stats['subscribers']})")
+
+    async def _run(self, clients, sessions, events):
+        sessions = max(1, min(sessions, clients))
+        session_ids = [uuid.uuid4().hex for _ in range(sessions)]
+        arrivals = [[] for _ in range(clients)]
+        connected = asyncio.Semaphore(0)
+
+        async def client(i):
+            # 실제 응답과 같은 제너레이터를 돌리되 HTTP 전송만 빼고 프레임을 소비한다
+            stream = astream_session_events(session_ids[i % sessions], keepalive_seconds=3600)
+            try:
+                await stream.__anext__()  # retry 힌트 = 구독 완료
+                connected.release()
+                async for frame in stream:
+                    arrivals[i].append(time.perf_counter())
+                    if len(arrivals[i]) >= events:
+                        return
+            finally:
+                await stream.aclose()
+
+        rss_before = current_rss()
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(client(i)) for i in range(clients)]
+        for _ in range(clients):
+            await connected.acquire()
+        connect_s = time.perf_counter() - started
+        rss_per_client = (current_rss() - rss_before) / clients
+        subscribers = get_event_hub().subscriber_count
+
+        published = {}
+        for seq in range(events):
+            for idx, session_uuid in enumerate(session_ids):
+                published[(idx, seq)] = time.perf_counter()
+                await asyncio.to_thread(publish_session_event, session_uuid, "progress", {"seq": seq})
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=60 + clients / 100)
+
+        # 메시지별 지연 = 해당 세션의 마지막 구독자가 받은 시각 - 발행 시각
+        latencies = []
+        for (idx, seq), sent in published.items():
+            received = [arrivals[i][seq] for i in range(idx, clients, sessions)]
+            latencies.append((max(received) - sent) * 1000)
+        latencies.sort()
+
+        return {
+            "clients": clients,
+            "sessions": sessions,
+            "events": events,
+            "connect_s": connect_s,
+            "rss_per_client": rss_per_client,
+            "subscribers": subscribers,
+            "frames": sum(len(a) for a in arrivals),
+            "expected": clients * events,
+            "p50_ms": statistics.median(latencies),
+            "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+            "max_ms": latencies[-1],
+        }
@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+import time
+
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from benchmarks.fakes import FakeGCSServer, peak_rss
+from image.utils import gcs
+
+
+class Command(BaseCommand):
+    help = "Compare peak RSS of the buffered (read() + upload_from_string) and streaming upload paths."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size-mb", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--emulator", default=None,
+                            help="Existing STORAGE_EMULATOR_HOST to upload to (default: a fake GCS child process)")
+
+    def handle(self, *args, **options):
+        size = options["size_mb"] * 1024 * 1024
+        server = proc = None
+        emulator = options["emulator"]
+        if emulator is None:
+            # 수신 측 버퍼가 측정에 섞이지 않도록 fake 서버는 자식 프로세스에서 돌린다
+            server = FakeGCSServer(keep_data=False)
+            proc = multiprocessing.get_context("fork").Process(target=server.serve_forever, daemon=True)
+            proc.start()
+            emulator = server.url
+
+        upload = TemporaryUploadedFile("bench.bin", "application/octet-stream", size, None)
+        block = os.urandom(1024 * 1024)
+        for _ in range(size // len(block)):
+            upload.write(block)
+        upload.flush()
+
+        old_env = os.environ.get("STORAGE_EMULATOR_HOST")
+        os.environ["STORAGE_EMULATOR_HOST"] = emulator
+        gcs._reset_client()
+        try:
+            with override_settings(GCS_BUCKET_NAME="bench", GCS_PUBLIC_URL_PREFIX="http://bench"):
+                results = self._run(upload, options["repeat"])
+        finally:
+            upload.close()
+            gcs._reset_client()
+            if old_env is None:
+                os.environ.pop("STORAGE_EMULATOR_HOST", None)
+            else:
+                os.environ["STORAGE_EMULATOR_HOST"] = old_env
+            if proc is not None:
+                proc.terminate()
+                proc.join()
+
+        self.stdout.write(f"upload size: {options['size_mb']} MB, repeat {options['repeat']}")
+        for name, (peak, elapsed) in results.items():
+            self.stdout.write(f"{name:>10}: peak RSS +{peak / 1024 / 1024:6.1f} MB  {elapsed * 1000:8.1f} ms/upload")
+
+    def _run(self, upload, repeat):
+        results = {}
+        # 클라이언트 생성/커넥션 수립 비용은 측정에서 뺀다
+        gcs.upload_bytes(b"warm-up", "bench/warm-up", "application/octet-stream")
+
+        def streaming(i):
+            gcs.upload_stream(upload, f"bench/stream-{i}", "application/octet-stream", size=upload.size)
+
+        def buffered(i):
+            upload.seek(0)
+            data = upload.read()
+            gcs.upload_bytes(data, f"bench/buffered-{i}", "application/octet-stream")
+            del data
+
+        # 해제된 큰 버퍼가 기준선을 올리지 않도록 streaming을 먼저 잰다
+        for name, fn in (("streaming", streaming), ("buffered", buffered)):
+            peak = 0
+            started = time.perf_counter()
+            for i in range(repeat):
+                with peak_rss() as rss:
+                    fn(i)
+                peak = max(peak, rss["peak"])
+            results[name] = (peak, (time.perf_counter() - started) / repeat)
+        return results
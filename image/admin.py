@@ -3,7 +3,7 @@ from .models import Style, Session, ImageAsset, AIJob, QRCode
 
 @admin.register(Style)
 class StyleAdmin(admin.ModelAdmin):
-    list_display = ("id","code","name","is_active","created_at","thumbnail_url")
+    list_display = ("id","code","name","is_active","created_at","thumbnail_url","reference_image_url")
 
 @admin.register(Session)
 class SessionAdmin(admin.ModelAdmin):
@@ -13,6 +13,7 @@ class SessionAdmin(admin.ModelAdmin):
 @admin.register(ImageAsset)
 class ImageAssetAdmin(admin.ModelAdmin):
     list_display = ("id","session","kind","public_url","created_at")
+    search_fields = ("sha256",)
     list_filter = ("kind",)
 
 @admin.register(AIJob)
@@ -22,6 +23,6 @@ class AIJobAdmin(admin.ModelAdmin):
 
 @admin.register(QRCode)
 class QRAdmin(admin.ModelAdmin):
-    list_display = ("id","slug","status","target_url","qr_image_public_url","created_at")
-    list_filter = ("status",)
+    list_display = ("id","slug","status","is_pooled","target_url","qr_image_public_url","created_at")
+    list_filter = ("status","is_pooled")
     search_fields = ("slug",)
@@ -0,0 +1,178 @@
+"""Asyncio executor for AI generation jobs.
+
+AI jobs spend almost all of their time waiting on the network, so instead of
+one prefork process per job this runs many pipelines concurrently in one
+event loop. Only the model call is natively async (genai ``client.aio``).
+Everything else stays on the synchronous code shared with the Celery task
+and runs in the loop's default thread pool (``asyncio.to_thread`` / _db):
+DB reads and writes, the original photo (hand-off, else a GCS or public-URL
+download), preprocessing and the result upload to GCS. The pool is sized
+to the concurrency (run_ai_async_worker), so those stages still overlap
+across jobs. In-flight jobs are bounded by a semaphore.
+
+Enable with AI_EXECUTOR=asyncio and start one or more runners::
+
+    python manage.py run_ai_async_worker --concurrency 32
+
+Jobs are queued in a Redis list. Each runner moves the jobs it takes into
+its own processing list, so jobs left behind by a crashed runner are requeued
+when it restarts with the same --name. Throttled jobs wait in a delay zset.
+"""
+import asyncio
+import logging
+import socket
+import time
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from .utils.redis_pool import get_async_redis_client, get_redis_client
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "ai:async:queue"
+DELAYED_KEY = "ai:async:delayed"
+
+
+def _processing_key(name: str) -> str:
+    return f"ai:async:processing:{name}"
+
+
+def _encode(ai_job_id: int, attempt: int) -> str:
+    return f"{ai_job_id}:{attempt}"
+
+
+def _decode(item: str):
+    job_id, _, attempt = item.partition(":")
+    return int(job_id), int(attempt or 0)
+
+
+def enqueue(ai_job_id: int, attempt: int = 0, delay: float = 0.0) -> None:
+    """Queue a job for the asyncio runners (sync; called from views)."""
+    client = get_redis_client()
+    if delay > 0:
+        client.zadd(DELAYED_KEY, {_encode(ai_job_id, attempt): time.time() + delay})
+    else:
+        client.lpush(QUEUE_KEY, _encode(ai_job_id, attempt))
+
+
+def _db(func):
+    # thread_sensitive=False: 작업별 DB/GCS 호출이 한 스레드에 줄 서지 않도록.
+    # 풀 스레드에는 요청/작업 경계가 없어 Django가 커넥션을 정리해 주지 않으므로
+    # 호출 앞뒤로 끊긴/오래된 커넥션을 직접 닫는다 (CONN_MAX_AGE 존중)
+    def call(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(call, thread_sensitive=False)
+
+
+class AsyncAIRunner:
+    def __init__(self, concurrency: int, name: Optional[str] = None):
+        self.concurrency = concurrency
+        self.name = name or socket.gethostname()
+        self._stopping = False
+        self._tasks = set()
+
+    def stop(self) -> None:
+        self._stopping = True
+
+    async def run(self) -> None:
+        redis = get_async_redis_client()
+        processing = _processing_key(self.name)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        # 이전 실행에서 처리 중이던 작업을 다시 큐에 넣는다
+        while await redis.lmove(processing, QUEUE_KEY, "RIGHT", "RIGHT"):
+            pass
+
+        promoter = asyncio.create_task(self._promote_delayed(redis))
+        logger.info("AsyncAIRunner %s started (concurrency=%d)", self.name, self.concurrency)
+        try:
+            while not self._stopping:
+                await semaphore.acquire()
+                item = await redis.blmove(QUEUE_KEY, processing, 1, "RIGHT", "LEFT")
+                if item is None:
+                    semaphore.release()
+                    # blmove이 기다리지 않고 바로 None을 주는 서버(fakeredis 등)에서도 루프를 독점하지 않도록
+                    await asyncio.sleep(0.05)
+                    continue
+                task = asyncio.create_task(self._run_item(redis, processing, item, semaphore))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        finally:
+            promoter.cancel()
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _promote_delayed(self, redis) -> None:
+        """Move due throttled jobs from the delay zset back to the queue."""
+        while True:
+            try:
+                due = await redis.zrangebyscore(DELAYED_KEY, "-inf", time.time(), start=0, num=100)
+                for item in due:
+                    # zrem이 1을 돌려준 러너만 큐에 넣는다 (여러 러너가 동시에 돌아도 중복 없음)
+                    if await redis.zrem(DELAYED_KEY, item):
+                        await redis.lpush(QUEUE_KEY, item)
+            except Exception:
+                logger.exception("AsyncAIRunner: failed to promote delayed jobs")
+            await asyncio.sleep(0.5)
+
+    async def _run_item(self, redis, processing: str, item: str, semaphore: asyncio.Semaphore) -> None:
+        ai_job_id, attempt = _decode(item)
+        try:
+            await run_ai_pipeline(ai_job_id, attempt)
+        except Exception:
+            # run_ai_pipeline이 실패를 직접 기록하므로 여기까지 오는 것은 예상 밖의 오류뿐
+            logger.exception("AsyncAIRunner: job %d crashed", ai_job_id)
+        finally:
+            await redis.lrem(processing, 1, item)
+            semaphore.release()
+
+
+async def run_ai_pipeline(ai_job_id: int, attempt: int = 0) -> None:
+    """Async twin of run_ai_generation_task: same stages, async model call.
+
+    Failures are logged and recorded on the job (FAILED + 'failed' event), not raised.
+    """
+    from .tasks import (
+        _as_throttled, _fail_job, _finish_job, _jittered,
+        _mark_waiting_for_capacity, _prepare_job,
+    )
+    from .utils.genai_client import get_genai_client
+    from .utils.ratelimit import Throttled, release, try_acquire
+
+    try:
+        prepared = await _db(_prepare_job)(ai_job_id)
+        if prepared is None:
+            return
+
+        model = prepared.config["model"]
+        request = await asyncio.to_thread(prepared.request)
+        lease_id, retry_after = await asyncio.to_thread(try_acquire, model)
+        try:
+            if lease_id is None:
+                raise Throttled(model, retry_after)
+            try:
+                response = await get_genai_client().aio.models.generate_content(**request)
+            finally:
+                await asyncio.to_thread(release, model, lease_id)
+        except Exception as exc:
+            throttled = _as_throttled(exc, model, attempt)
+            if throttled is None or attempt >= settings.AI_THROTTLE_MAX_RETRIES:
+                raise
+            await _db(_mark_waiting_for_capacity)(prepared.job)
+            delay = _jittered(throttled.retry_after)
+            logger.info("run_ai_pipeline: job %d throttled, retrying in %.1fs", ai_job_id, delay)
+            await asyncio.to_thread(enqueue, ai_job_id, attempt + 1, delay)
+            return
+
+        await _db(_finish_job)(prepared, response)
+    except Exception as e:
+        # 여기서 한 번만 기록하고 작업을 FAILED로 남긴다 (러너로 다시 올리지 않음)
+        logger.exception("run_ai_pipeline: job %d failed: %s", ai_job_id, e)
+        await _db(_fail_job)(ai_job_id, e)
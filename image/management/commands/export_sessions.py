@@ -0,0 +1,48 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from image.serializers import SessionListFilterSerializer
+from image.utils.export import FORMATS, iter_session_rows, render
+
+
+class Command(BaseCommand):
+    help = "Stream every session with its images and AI job status as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", dest="export_format", choices=sorted(FORMATS), default="ndjson")
+        parser.add_argument("--output", "-o", default="-", help="Output file path ('-' for stdout)")
+        parser.add_argument("--chunk-size", type=int, default=settings.EXPORT_CHUNK_SIZE,
+                            help="Rows fetched per server-side cursor round trip")
+        parser.add_argument("--status", help="Comma-separated session statuses")
+        parser.add_argument("--style", help="Style code")
+        parser.add_argument("--updated-after", help="ISO 8601 datetime (inclusive)")
+        parser.add_argument("--updated-before", help="ISO 8601 datetime (exclusive)")
+
+    def handle(self, *args, **options):
+        raw_filters = {
+            key: options[key] for key in ("status", "style", "updated_after", "updated_before")
+            if options[key]
+        }
+        f = SessionListFilterSerializer(data=raw_filters)
+        if not f.is_valid():
+            raise CommandError(f.errors)
+
+        count = 0
+
+        def counted(rows):
+            nonlocal count
+            for row in rows:
+                count += 1
+                yield row
+
+        rows = counted(iter_session_rows(f.validated_data, chunk_size=options["chunk_size"]))
+        out = sys.stdout if options["output"] == "-" else open(options["output"], "w", encoding="utf-8", newline="")
+        try:
+            for chunk in render(rows, options["export_format"]):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        self.stderr.write(f"exported {count} sessions")
@@ -0,0 +1,34 @@
+import asyncio
+import signal
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from image.async_runner import AsyncAIRunner
+from image.utils.genai_client import init_worker
+
+
+class Command(BaseCommand):
+    help = "Run AI generation jobs concurrently in one asyncio event loop (AI_EXECUTOR=asyncio)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=settings.AI_ASYNC_CONCURRENCY,
+                            help="Max in-flight jobs in this process")
+        parser.add_argument("--name", default=None,
+                            help="Stable runner name (defaults to hostname); used to recover in-flight jobs")
+
+    def handle(self, *args, **options):
+        concurrency = options["concurrency"]
+        runner = AsyncAIRunner(concurrency=concurrency, name=options["name"])
+        init_worker()
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            # DB/GCS 단계용 스레드 풀은 동시 작업 수에 맞춘다
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency + 4))
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, runner.stop)
+            await runner.run()
+
+        asyncio.run(main())
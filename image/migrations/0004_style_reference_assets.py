@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+ANIMAL_CROSSING_STYLE_IMAGE_URL = "https://file.horangprint.site/ref/animal_crossing_ref_2.png"
+
+
+def move_animal_crossing_reference(apps, schema_editor):
+    """Carry the previously hardcoded animal-crossing branch over to style data."""
+    Style = apps.get_model("image", "Style")
+    for style in Style.objects.filter(code__contains="animal-crossing"):
+        style.reference_image_url = ANIMAL_CROSSING_STYLE_IMAGE_URL
+        style.reference_instruction = "Use the second image as the style reference (Animal Crossing style)."
+        style.generation_options = {**(style.generation_options or {}), "top_p": 0.8}
+        style.save(update_fields=["reference_image_url", "reference_instruction", "generation_options"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image', '0003_style_prompt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='style',
+            name='reference_image_url',
+            field=models.URLField(blank=True, max_length=1024),
+        ),
+        migrations.AddField(
+            model_name='style',
+            name='reference_instruction',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='style',
+            name='generation_options',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(move_animal_crossing_reference, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-17 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image', '0004_style_reference_assets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='qrcode',
+            name='is_pooled',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='qrcode',
+            index=models.Index(condition=models.Q(('is_pooled', True), ('status', 'READY')), fields=['id'], name='qr_pool_available_idx'),
+        ),
+    ]
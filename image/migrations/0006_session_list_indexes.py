@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-17 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image', '0005_qrcode_is_pooled'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['-updated_at', '-id'], name='session_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['status', '-updated_at', '-id'], name='session_status_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['style', '-updated_at', '-id'], name='session_style_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image', '0006_session_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageasset',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='imageasset',
+            name='orientation',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
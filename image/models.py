@@ -8,6 +8,11 @@ class Style(models.Model):
     prompt = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
     thumbnail_url = models.URLField(max_length=1024, blank=True)
+    # 스타일 참조 이미지(있으면 사용자 사진과 함께 모델에 전달)와 그 앞에 붙일 지시문
+    reference_image_url = models.URLField(max_length=1024, blank=True)
+    reference_instruction = models.TextField(blank=True)
+    # 모델 호출 옵션 (예: {"top_p": 0.8})
+    generation_options = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     def __str__(self): return f"{self.name}({self.code})"
@@ -24,10 +29,21 @@ class QRCode(models.Model):
     target_url = models.URLField(max_length=1024, null=True, blank=True)
     status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING, db_index=True)
     error_message = models.CharField(max_length=512, blank=True)
+    # 미리 렌더링/업로드해 둔 QR 풀 항목 (세션 생성 시 claim 되면 False)
+    is_pooled = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     def __str__(self): return f"QR[{self.slug}] {self.status}"
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['id'],
+                name='qr_pool_available_idx',
+                condition=models.Q(is_pooled=True, status='READY')
+            )
+        ]
+
 class Session(models.Model):
     class Status(models.TextChoices):
         CREATED="CREATED","CREATED"
@@ -47,6 +63,14 @@ class Session(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     def __str__(self): return f"Session[{self.uuid}] {self.status}"
 
+    class Meta:
+        # 세션 목록 커서 페이지네이션 (updated_at, id) + 필터별 인덱스
+        indexes = [
+            models.Index(fields=['-updated_at', '-id'], name='session_updated_idx'),
+            models.Index(fields=['status', '-updated_at', '-id'], name='session_status_updated_idx'),
+            models.Index(fields=['style', '-updated_at', '-id'], name='session_style_updated_idx'),
+        ]
+
 class ImageAsset(models.Model):
     class Kind(models.TextChoices):
         ORIGINAL="ORIGINAL","ORIGINAL"
@@ -61,6 +85,10 @@ class ImageAsset(models.Model):
     height = models.IntegerField(null=True, blank=True)
     mime = models.CharField(max_length=64, null=True, blank=True)
     size_bytes = models.BigIntegerField(null=True, blank=True)
+    # 업로드 시 한 번의 패스로 계산 (서명 URL 업로드는 바이트를 거치지 않으므로 비어 있음)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    # EXIF Orientation (1-8). width/height는 이 회전을 반영한 표시 기준 크기
+    orientation = models.PositiveSmallIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -0,0 +1,46 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class SessionCursorPagination(CursorPagination):
+    """Keyset pagination over (updated_at, id), newest first.
+
+    Each page is an index range scan from the cursor position, so response time
+    does not depend on how many sessions exist. ``?include_count=true`` adds a
+    total that is cached per filter set for SESSION_LIST_COUNT_TTL seconds.
+    """
+    ordering = ("-updated_at", "-id")
+    page_size = settings.SESSION_LIST_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.total_count = None
+        if request.query_params.get("include_count", "").lower() in ("true", "1", "yes"):
+            self.total_count = self._cached_count(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def _cached_count(self, queryset, request):
+        # 커서/페이지 크기를 뺀 필터 조합별로 캐싱
+        params = sorted(
+            (k, v) for k, v in request.query_params.items()
+            if k not in (self.cursor_query_param, self.page_size_query_param, "include_count")
+        )
+        key = "sessions:count:" + hashlib.sha1(json.dumps(params).encode("utf-8")).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, settings.SESSION_LIST_COUNT_TTL)
+        return count
+
+    def get_paginated_response(self, data):
+        payload = {"next": self.get_next_link(), "previous": self.get_previous_link()}
+        if self.total_count is not None:
+            payload["count"] = self.total_count
+        payload["results"] = data
+        return Response(payload)
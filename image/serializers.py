@@ -1,16 +1,61 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Session, Style, QRCode
 
 class SessionCreateSerializer(serializers.Serializer):
     style_id = serializers.IntegerField()
 
+class SessionBulkCreateSerializer(serializers.Serializer):
+    style_id = serializers.IntegerField()
+    count = serializers.IntegerField(min_value=1)
+
+    def validate_count(self, value):
+        if value > settings.SESSION_BULK_MAX:
+            raise serializers.ValidationError(f"At most {settings.SESSION_BULK_MAX} sessions per request")
+        return value
+
 class ImageUploadSerializer(serializers.Serializer):
     session_uuid = serializers.UUIDField()
-    image_file = serializers.ImageField()
+    # 이미지 검증은 업로드 시 헤더 한 번 읽기로 처리 (utils/ingest), ImageField의 재디코딩 생략
+    image_file = serializers.FileField()
 
 class FinalizeSerializer(serializers.Serializer):
     session_uuid = serializers.UUIDField()
-    edited_image = serializers.ImageField()
+    edited_image = serializers.FileField()
+
+class UploadURLSerializer(serializers.Serializer):
+    session_uuid = serializers.UUIDField()
+    kind = serializers.ChoiceField(choices=["ORIGINAL", "FINAL"])
+    filename = serializers.CharField(max_length=255)
+    content_type = serializers.RegexField(r"^image/[-+.\w]+$", max_length=64)
+
+class ChunkedUploadInitSerializer(serializers.Serializer):
+    session_uuid = serializers.UUIDField()
+    filename = serializers.CharField(max_length=255)
+    content_type = serializers.RegexField(r"^image/[-+.\w]+$", max_length=64)
+    total_size = serializers.IntegerField(min_value=1)
+
+    def validate_total_size(self, value):
+        if value > settings.UPLOAD_MAX_BYTES:
+            raise serializers.ValidationError(f"File exceeds {settings.UPLOAD_MAX_BYTES} bytes")
+        return value
+
+class UploadCommitSerializer(serializers.Serializer):
+    session_uuid = serializers.UUIDField()
+    object_name = serializers.CharField(max_length=512)
+
+class SessionListFilterSerializer(serializers.Serializer):
+    status = serializers.CharField(required=False, help_text="쉼표로 구분한 세션 상태 (예: AI_READY,FINALIZED)")
+    style = serializers.SlugField(required=False, help_text="스타일 코드")
+    updated_after = serializers.DateTimeField(required=False)
+    updated_before = serializers.DateTimeField(required=False)
+
+    def validate_status(self, value):
+        statuses = [s.strip() for s in value.split(",") if s.strip()]
+        invalid = [s for s in statuses if s not in Session.Status.values]
+        if invalid:
+            raise serializers.ValidationError(f"Unknown status: {', '.join(invalid)}")
+        return statuses
 
 class AIWebhookSerializer(serializers.Serializer):
     request_id = serializers.CharField()
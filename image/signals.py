@@ -0,0 +1,96 @@
+import threading
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import QRCode, Session, Style
+
+# 이 필드가 바뀌면 같은 입력이라도 생성 결과가 달라진다
+_RESULT_AFFECTING_FIELDS = ("prompt", "description", "name", "reference_image_url", "reference_instruction", "generation_options")
+
+
+@receiver(pre_save, sender=Style)
+def invalidate_ai_results_on_style_change(sender, instance, **kwargs):
+    if not instance.pk:
+        return
+    previous = Style.objects.filter(pk=instance.pk).values(*_RESULT_AFFECTING_FIELDS).first()
+    if previous is None:
+        return
+    if any(previous[field] != getattr(instance, field) for field in _RESULT_AFFECTING_FIELDS):
+        from .utils.result_cache import invalidate_style
+        style_id = instance.pk
+        transaction.on_commit(lambda: invalidate_style(style_id))
+
+
+@receiver(post_save, sender=QRCode)
+def invalidate_redirect_on_target_change(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "target_url" not in update_fields:
+        return
+    from .utils.redirect_cache import invalidate
+    slug = instance.slug
+    transaction.on_commit(lambda: invalidate(slug))
+
+
+# 한 트랜잭션에서 같은 세션이 여러 번 저장돼도 스냅샷은 커밋 후 한 번만 다시 만든다.
+# 저장마다 on_commit 훅을 걸되(롤백된 저장의 훅은 Django가 버린다) 훅들이 스레드별
+# 배치를 공유해서, 이미 갱신한 세션은 같은 커밋의 다음 훅에서 건너뛴다.
+# 훅이 한 번이라도 돌면 그 배치는 끝난 것이고 다음 저장부터 새 배치를 쓴다.
+_pending_snapshots = threading.local()
+
+
+def _refresh_snapshots_on_commit(session_uuids) -> None:
+    session_uuids = {str(u) for u in session_uuids}
+    if not session_uuids:
+        return
+    batch = getattr(_pending_snapshots, "batch", None)
+    if batch is None or batch.started:
+        _pending_snapshots.batch = batch = _SnapshotBatch()
+    transaction.on_commit(partial(batch.flush, session_uuids))
+
+
+class _SnapshotBatch:
+    def __init__(self):
+        self.refreshed = set()
+        self.started = False
+
+    def flush(self, session_uuids):
+        from .utils.session_snapshot import refresh_snapshot
+        self.started = True
+        for session_uuid in session_uuids - self.refreshed:
+            self.refreshed.add(session_uuid)
+            refresh_snapshot(session_uuid)
+
+
+@receiver(post_save, sender=QRCode)
+def refresh_session_snapshot_on_qr_change(sender, instance, created=False, **kwargs):
+    if created or instance.is_pooled:
+        return
+    _refresh_snapshots_on_commit(Session.objects.filter(qr_id=instance.pk).values_list("uuid", flat=True))
+
+
+@receiver(post_save, sender=Session)
+def refresh_session_snapshot(sender, instance, **kwargs):
+    _refresh_snapshots_on_commit([instance.uuid])
+
+
+@receiver(post_delete, sender=Session)
+def delete_session_snapshot(sender, instance, **kwargs):
+    from .utils.session_snapshot import delete_snapshot
+    session_uuid = str(instance.uuid)
+    transaction.on_commit(lambda: delete_snapshot(session_uuid))
+
+
+@receiver(post_delete, sender=QRCode)
+def invalidate_redirect_on_delete(sender, instance, **kwargs):
+    from .utils.redirect_cache import invalidate
+    slug = instance.slug
+    transaction.on_commit(lambda: invalidate(slug))
+
+
+@receiver(post_save, sender=Style)
+@receiver(post_delete, sender=Style)
+def bump_style_list_version(sender, instance, **kwargs):
+    from .utils.style_cache import bump_version
+    transaction.on_commit(bump_version)
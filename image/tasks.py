@@ -1,11 +1,31 @@
 import logging
 from celery import shared_task
+from celery.exceptions import Retry
+from celery.signals import worker_process_init
 from django.db import transaction
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
 
+def _consumes_ai_queue() -> bool:
+    """Whether this worker consumes the queue run_ai_generation_task is routed to."""
+    from celery import current_app
+    ai_queue = settings.CELERY_TASK_ROUTES["image.tasks.run_ai_generation_task"]["queue"]
+    # -Q 또는 CELERY_WORKER_PROFILE로 고른 큐 (고르지 않았으면 task_queues 전체)
+    return ai_queue in current_app.amqp.queues.consume_from
+
+
+@worker_process_init.connect
+def _init_ai_worker(**kwargs):
+    """Build the per-process genai client (and warm up) right after an AI worker forks."""
+    # QR 전용 워커는 genai 클라이언트/참조 이미지가 필요 없으므로 기동 비용을 들이지 않는다
+    if not _consumes_ai_queue():
+        return
+    from .utils.genai_client import init_worker
+    init_worker()
+
+
 @shared_task(bind=True, max_retries=3, default_retry_delay=5)
 def generate_qr_task(self, qr_id: int):
     print(f"generate_qr_task: {qr_id}")
@@ -55,203 +75,395 @@ def generate_qr_task(self, qr_id: int):
         raise
 
 
-def _generate_content_default(client, image, prompt: str):
-    """Default image generation with a simple prompt."""
+@shared_task(bind=True, max_retries=0)
+def generate_qr_batch_task(self, qr_ids):
+    """Render and upload a chunk of QR codes in one pass (bulk provisioning)."""
+    from .models import QRCode
+    from .utils.qr_pool import render_and_store
+
+    pending = list(QRCode.objects.filter(id__in=qr_ids, status=QRCode.Status.PENDING).order_by("id"))
+    failed = render_and_store(pending)
+    for qr, error in failed:
+        qr.status = QRCode.Status.FAILED
+        qr.error_message = str(error)[:500]
+        qr.save(update_fields=["status", "error_message", "updated_at"])
+    return len(pending) - len(failed)
+
+
+def dispatch_qr_batches(qr_ids):
+    """Queue QR rendering for many codes as one Celery group of fixed-size chunks."""
+    from celery import group
+
+    if not qr_ids:
+        return None
+    size = settings.QR_BATCH_SIZE
+    chunks = [qr_ids[i:i + size] for i in range(0, len(qr_ids), size)]
+    return group(generate_qr_batch_task.s(chunk) for chunk in chunks).apply_async()
+
+
+@shared_task(bind=True, max_retries=0)
+def replenish_qr_pool(self):
+    """Top up the pre-rendered QR pool (one replenisher at a time across the cluster)."""
+    from .utils.qr_pool import replenish
+    from .utils.redis_pool import get_redis_client
+
+    if not settings.QR_POOL_ENABLED:
+        return 0
+    lock = get_redis_client().lock("qr:pool:replenish", timeout=300, blocking=False)
+    if not lock.acquire():
+        return 0
+    try:
+        added = replenish()
+        if added:
+            logger.info("replenish_qr_pool: added %d QR codes", added)
+        return added
+    finally:
+        lock.release()
+
+
+def _generation_config(style) -> dict:
+    """Everything besides the input photo and prompt that shapes the result.
+
+    Also the material for the result cache key, so keep it complete.
+    """
+    options = style.generation_options or {}
+    return {
+        "model": settings.GOOGLE_GENAI_IMAGE_MODEL,
+        "top_p": options.get("top_p", 0.95),
+        "aspect_ratio": "1:1",
+        "image_size": "1K",
+        "reference_image_url": style.reference_image_url,
+        "reference_instruction": style.reference_instruction,
+    }
+
+def _content_config(config: dict):
     from google.genai import types
-    generate_content_config = types.GenerateContentConfig(
-        top_p=0.95,
+    return types.GenerateContentConfig(
+        top_p=config["top_p"],
         response_modalities=[
             "IMAGE",
         ],
         image_config=types.ImageConfig(
-            aspect_ratio="1:1",
-            image_size="1K",
+            aspect_ratio=config["aspect_ratio"],
+            image_size=config["image_size"],
         ),
     )
-    return client.models.generate_content(
-        model="gemini-3.1-flash-image-preview",
-        contents=[image, prompt],
-        config=generate_content_config,
+
+def _build_request(image_bytes: bytes, image_mime: str, prompt: str, config: dict) -> dict:
+    """generate_content kwargs, shared by the sync task and the asyncio runner."""
+    from google.genai import types
+
+    if not config["reference_image_url"]:
+        # Default image generation with a simple prompt
+        contents = [types.Part.from_bytes(data=image_bytes, mime_type=image_mime), prompt]
+    else:
+        # Image generation with the style's reference image (cached, pre-encoded PNG)
+        from .utils.style_assets import get_reference_png
+
+        style_img_bytes = get_reference_png(config["reference_image_url"])
+        instruction = config["reference_instruction"] or "Use the second image as the style reference."
+
+        # Build multi-part content
+        contents = [
+            {
+                "role": "user",
+                "parts": [
+                    {
+                        "text": f"{instruction} {prompt}"
+                    },
+                    {
+                        "inline_data": {
+                            "mime_type": "image/png",
+                            "data": style_img_bytes,
+                        }
+                    },
+                    {
+                        "inline_data": {
+                            "mime_type": image_mime,
+                            "data": image_bytes,
+                        }
+                    },
+                ],
+            }
+        ]
+
+    return {
+        "model": config["model"],
+        "contents": contents,
+        "config": _content_config(config),
+    }
+
+
+def _extract_image_bytes(response) -> bytes:
+    image_bytes_list = []
+    if response and getattr(response, "candidates", None):
+        first = response.candidates[0]
+        for part in getattr(first.content, "parts", []) or []:
+            if getattr(part, "inline_data", None):
+                image_bytes_list.append(part.inline_data.data)
+
+    if not image_bytes_list:
+        raise ValueError("No image returned from AI")
+    return image_bytes_list[0]
+
+
+def _complete_job(job, *, gcs_path: str, public_url: str, mime: str, size_bytes: int, cached: bool = False):
+    """Create the AI ImageAsset, mark job/session done and publish completion."""
+    from .models import AIJob, ImageAsset, Session
+    from .utils.events import publish_session_events
+
+    asset = ImageAsset.objects.create(
+        session=job.session,
+        kind=ImageAsset.Kind.AI,
+        gcs_path=gcs_path,
+        public_url=public_url,
+        mime=mime,
+        size_bytes=size_bytes,
     )
 
-def pil_to_bytes(img) -> bytes:
-    import io
-    from PIL import Image
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    return buf.getvalue()
+    # Update job and session
+    with transaction.atomic():
+        job.ai_image = asset
+        job.status = AIJob.Status.SUCCEEDED
+        if cached:
+            job.response_payload = {"cache": "hit"}
+        job.save(update_fields=["ai_image", "status", "response_payload", "updated_at"])
+
+        job.session.status = Session.Status.AI_READY
+        job.session.save(update_fields=["status", "updated_at"])
+
+    # Publish completion event (cache hits also announce the start, in the same round trip)
+    events = []
+    if cached:
+        events.append(("progress", {"status": AIJob.Status.RUNNING, "message": "AI result served from cache"}))
+    events.append(("completed", {
+        "status": job.status,
+        "ai_image_url": asset.public_url,
+    }))
+    publish_session_events(str(job.session.uuid), events)
+    return asset
+
+
+def _load_original_bytes(session) -> bytes:
+    """Original photo bytes: upload hand-off first, then GCS by object name, then public URL."""
+    from .models import ImageAsset
+    from .utils.handoff import fetch_original
+    from .utils.gcs import download_bytes, object_name_from_gcs_path
+
+    data = fetch_original(str(session.uuid))
+    if data:
+        return data
+
+    original = ImageAsset.objects.filter(
+        session=session,
+        kind=ImageAsset.Kind.ORIGINAL
+    ).order_by("-id").first()
+    if not original:
+        raise ValueError("Original image not found for session")
+
+    try:
+        return download_bytes(object_name_from_gcs_path(original.gcs_path))
+    except Exception:
+        logger.warning("Direct GCS read failed for %s, falling back to public URL", original.gcs_path, exc_info=True)
 
-def _generate_content_animal_crossing(client, user_image, prompt: str):
-    """Image generation for Animal Crossing with a style reference image."""
-    import io
+    if not original.public_url:
+        raise ValueError("Original image not found for session")
     import requests
-    from PIL import Image
-    from google.genai import types
+    resp = requests.get(original.public_url, timeout=20)
+    resp.raise_for_status()
+    return resp.content
 
-    ANIMAL_CROSSING_STYLE_IMAGE_URL = "https://file.horangprint.site/ref/animal_crossing_ref_2.png"
 
-    resp = requests.get(ANIMAL_CROSSING_STYLE_IMAGE_URL, timeout=20)
-    resp.raise_for_status()
-    style_image = Image.open(io.BytesIO(resp.content)).convert("RGBA")
+def _as_throttled(exc, model: str, retries: int):
+    """Map limiter denials and model 429s to Throttled (with backoff); None otherwise."""
+    from .utils.ratelimit import Throttled
+    if isinstance(exc, Throttled):
+        return exc
+    if getattr(exc, "code", None) == 429:
+        # 쿼터 초과: 지수 백오프 (최대 60초)
+        return Throttled(model, min(60.0, settings.AI_THROTTLE_BUSY_RETRY_SECONDS * (2 ** retries)))
+    return None
 
-    user_img_bytes = pil_to_bytes(user_image.convert("RGBA"))
-    style_img_bytes = pil_to_bytes(style_image)
 
-    generate_content_config = types.GenerateContentConfig(
-        top_p=0.8,
-        response_modalities=["IMAGE"],
-        image_config=types.ImageConfig(
-            aspect_ratio="1:1",
-            image_size="1K",
-        ),
-    )
+def _mark_waiting_for_capacity(job) -> None:
+    from .models import AIJob
+    from .utils.events import publish_session_event
 
-    # Build multi-part content
-    contents = [
-        {
-            "role": "user",
-            "parts": [
-                {
-                    "text": "Use the second image as the style reference (Animal Crossing style). "
-                    + prompt
-                },
-                {
-                    "inline_data": {
-                        "mime_type": "image/png",
-                        "data": style_img_bytes,
-                    }
-                },
-                {
-                    "inline_data": {
-                        "mime_type": "image/png",
-                        "data": user_img_bytes,
-                    }
-                },
-            ],
-        }
-    ]
-
-    return client.models.generate_content(
-        model="gemini-3.1-flash-image-preview",
-        contents=contents,
-        config=generate_content_config,
-    )
+    job.status = AIJob.Status.PENDING
+    job.save(update_fields=["status", "updated_at"])
+    publish_session_event(str(job.session.uuid), "progress", {
+        "status": job.status,
+        "message": "Waiting for AI capacity"
+    })
 
 
-@shared_task(bind=True, max_retries=0)
-def run_ai_generation_task(self, ai_job_id: int):
-    """Run Gemini-based image generation for a given AIJob."""
-    # Lazy imports to avoid Django app loading issues
-    from django.db import transaction
-    from .models import AIJob, ImageAsset, Session
-    from .utils.gcs import upload_bytes
+def _jittered(delay: float) -> float:
+    # 같은 시점에 몰려 다시 들어오지 않도록 지터 추가
+    import random
+    return delay * (1 + random.random() * 0.2)
+
+
+def _requeue_throttled(task, job, throttled):
+    """Put the job back in the queue instead of failing it."""
+    _mark_waiting_for_capacity(job)
+    countdown = _jittered(throttled.retry_after)
+    logger.info("run_ai_generation_task: job %d throttled, retrying in %.1fs", job.id, countdown)
+    raise task.retry(countdown=countdown, exc=throttled, max_retries=settings.AI_THROTTLE_MAX_RETRIES)
+
+
+class _PreparedJob:
+    """State carried from _prepare_job to the model call and _finish_job."""
+
+    def __init__(self, job, image_bytes, image_mime, prompt, config, cache_key):
+        self.job = job
+        self.image_bytes = image_bytes
+        self.image_mime = image_mime
+        self.prompt = prompt
+        self.config = config
+        self.cache_key = cache_key
+
+    @property
+    def session_uuid(self) -> str:
+        return str(self.job.session.uuid)
+
+    def request(self) -> dict:
+        return _build_request(self.image_bytes, self.image_mime, self.prompt, self.config)
+
+
+def _prepare_job(ai_job_id: int):
+    """Mark RUNNING, load and preprocess the photo, resolve prompt/config.
+
+    Returns None when the result cache already completed the job.
+    """
+    from .models import AIJob
     from .utils.events import publish_session_event
-    from django.conf import settings
-    import io
-    import requests
-    from PIL import Image
+    from .utils.handoff import discard_original
+    from .utils.preprocess import preprocess_for_model, resolve_preprocess_options
+    from .utils.result_cache import build_cache_key, get_cached_result
+
+    # Mark job as RUNNING
+    with transaction.atomic():
+        job = AIJob.objects.select_for_update(of=("self",)).select_related("session__style").get(id=ai_job_id)
+        job.status = AIJob.Status.RUNNING
+        job.save(update_fields=["status", "updated_at"])
+
+    # Fetch original image bytes and shrink them to the model's working size
+    session_uuid = str(job.session.uuid)
+    style = job.session.style
+    image_bytes, image_mime = preprocess_for_model(
+        _load_original_bytes(job.session),
+        resolve_preprocess_options(style),
+    )
 
+    # Build prompt from Style.prompt (fallback to description/name)
+    prompt = (getattr(style, "prompt", None) or style.description or style.name or "Transform the photo")[:4000]
+    #prompt = prompt.encode("ascii", "ignore").decode("ascii")
+    config = _generation_config(style)
+
+    # Same photo + prompt + config already generated: reuse the stored result
+    cache_key = build_cache_key(image_bytes, prompt, config)
+    cached = get_cached_result(cache_key)
+    if cached:
+        logger.info("AI result cache hit for job %d", ai_job_id)
+        _complete_job(job, cached=True, **cached)
+        discard_original(session_uuid)
+        return None
+
+    # Notify clients that AI generation has started
+    publish_session_event(session_uuid, "progress", {
+        "status": job.status,
+        "message": "AI generation started"
+    })
+    return _PreparedJob(job, image_bytes, image_mime, prompt, config, cache_key)
+
+
+def _finish_job(prepared: _PreparedJob, response) -> None:
+    """Upload the generated image, complete the job and remember the result."""
+    from .utils.gcs import upload_bytes
+    from .utils.handoff import discard_original
+    from .utils.result_cache import store_result
+
+    # Extract resulting image bytes
+    result_bytes = _extract_image_bytes(response)
+
+    # Upload result to GCS and create ImageAsset. The object is content-addressed by the
+    # cache key, so a re-shoot never overwrites a result that cache entries still point at
+    object_name = f"ai/cache/{prepared.cache_key}.png"
+    gcs_path, public_url = upload_bytes(result_bytes, object_name, "image/png")
+    result = {
+        "gcs_path": gcs_path,
+        "public_url": public_url,
+        "mime": "image/png",
+        "size_bytes": len(result_bytes),
+    }
+    _complete_job(prepared.job, **result)
+    store_result(prepared.cache_key, prepared.job.session.style_id, result)
+    discard_original(prepared.session_uuid)
+
+
+def _fail_job(ai_job_id: int, error: Exception) -> None:
+    """Best-effort FAILED transition for job and session, with a 'failed' event."""
+    from .models import AIJob, Session
+    from .utils.events import publish_session_event
+    from .utils.handoff import discard_original
     try:
-        # Mark job as RUNNING
-        with transaction.atomic():
-            job = AIJob.objects.select_for_update().get(id=ai_job_id)
-            job.status = AIJob.Status.RUNNING
-            job.save(update_fields=["status", "updated_at"])
+        job = AIJob.objects.get(id=ai_job_id)
+        # 실패한 작업의 원본(개인 사진)을 핸드오프에 남겨두지 않는다
+        discard_original(str(job.session.uuid))
+        job.status = AIJob.Status.FAILED
+        job.save(update_fields=["status", "updated_at"])
+
+        job.session.status = Session.Status.FAILED
+        job.session.save(update_fields=["status", "updated_at"])
 
-        # Notify clients that AI generation has started
-        publish_session_event(str(job.session.uuid), "progress", {
+        publish_session_event(str(job.session.uuid), "failed", {
             "status": job.status,
-            "message": "AI generation started"
+            "message": str(error),
         })
+    except Exception:
+        # best-effort update
+        pass
 
-        # Fetch original image bytes
-        original = ImageAsset.objects.filter(
-            session=job.session,
-            kind=ImageAsset.Kind.ORIGINAL
-        ).order_by("-id").first()
-        if not original or not original.public_url:
-            raise ValueError("Original image not found for session")
-
-        resp = requests.get(original.public_url, timeout=20)
-        resp.raise_for_status()
-        image = Image.open(io.BytesIO(resp.content))
-
-        # Build prompt from Style.prompt (fallback to description/name)
-        style = job.session.style
-        prompt = (getattr(style, "prompt", None) or style.description or style.name or "Transform the photo")[:4000]
-        #prompt = prompt.encode("ascii", "ignore").decode("ascii")
-
-        # Call Gemini to generate content
-        from google import genai
-        api_key = getattr(settings, "GOOGLE_GENAI_API_KEY", None)
-        if not api_key:
-            raise ValueError("GOOGLE_GENAI_API_KEY not configured")
-
-        client = genai.Client(api_key=api_key)
-
-        # Choose generation function based on style
-        if style and style.code and "animal-crossing" in style.code:
-            logger.info("Using Animal Crossing style generation for job %d", ai_job_id)
-            response = _generate_content_animal_crossing(client, image, prompt)
-        else:
-            logger.info("Using default style generation for job %d", ai_job_id)
-            response = _generate_content_default(client, image, prompt)
-
-        # Extract resulting image bytes
-        image_bytes_list = []
-        if response and getattr(response, "candidates", None):
-            first = response.candidates[0]
-            for part in getattr(first.content, "parts", []) or []:
-                if getattr(part, "inline_data", None):
-                    image_bytes_list.append(part.inline_data.data)
-
-        if not image_bytes_list:
-            raise ValueError("No image returned from AI")
-
-        result_bytes = image_bytes_list[0]
-
-        # Upload result to GCS and create ImageAsset
-        object_name = f"ai/{job.session.uuid}.png"
-        gcs_path, public_url = upload_bytes(result_bytes, object_name, "image/png")
-        asset = ImageAsset.objects.create(
-            session=job.session,
-            kind=ImageAsset.Kind.AI,
-            gcs_path=gcs_path,
-            public_url=public_url,
-            mime="image/png",
-            size_bytes=len(result_bytes),
-        )
-
-        # Update job and session
-        with transaction.atomic():
-            job.ai_image = asset
-            job.status = AIJob.Status.SUCCEEDED
-            job.save(update_fields=["ai_image", "status", "updated_at"])
 
-            job.session.status = Session.Status.AI_READY
-            job.session.save(update_fields=["status", "updated_at"])
+def dispatch_ai_job(ai_job_id: int) -> None:
+    """Hand a new AIJob to the configured executor (Celery prefork or asyncio runner)."""
+    if settings.AI_EXECUTOR == "asyncio":
+        from .async_runner import enqueue
+        enqueue(ai_job_id)
+    else:
+        run_ai_generation_task.delay(ai_job_id)
 
-        # Publish completion event
-        publish_session_event(str(job.session.uuid), "completed", {
-            "status": job.status,
-            "ai_image_url": asset.public_url,
-        })
 
-    except Exception as e:
-        logger.exception("run_ai_generation_task failed: %s", e)
-        try:
-            job = AIJob.objects.get(id=ai_job_id)
-            job.status = AIJob.Status.FAILED
-            job.save(update_fields=["status", "updated_at"])
+@shared_task(bind=True, max_retries=0)
+def run_ai_generation_task(self, ai_job_id: int):
+    """Run Gemini-based image generation for a given AIJob."""
+    # Lazy imports to avoid Django app loading issues
+    from .utils.genai_client import get_genai_client
+    from .utils.ratelimit import model_slot
 
-            job.session.status = Session.Status.FAILED
-            job.session.save(update_fields=["status", "updated_at"])
+    try:
+        prepared = _prepare_job(ai_job_id)
+        if prepared is None:
+            return
 
-            publish_session_event(str(job.session.uuid), "failed", {
-                "status": job.status,
-                "message": str(e),
-            })
-        except Exception:
-            # best-effort update
-            pass
+        # Call Gemini to generate content (client is reused across jobs in this process)
+        client = get_genai_client()
+        model = prepared.config["model"]
+        try:
+            with model_slot(model):
+                logger.info("Generating image (reference=%s) for job %d", bool(prepared.config["reference_image_url"]), ai_job_id)
+                response = client.models.generate_content(**prepared.request())
+        except Exception as exc:
+            throttled = _as_throttled(exc, model, self.request.retries)
+            if throttled is None or self.request.retries >= settings.AI_THROTTLE_MAX_RETRIES:
+                raise
+            _requeue_throttled(self, prepared.job, throttled)
+
+        _finish_job(prepared, response)
+
+    except Retry:
+        raise
+    except Exception as e:
+        logger.exception("run_ai_generation_task failed: %s", e)
+        _fail_job(ai_job_id, e)
         raise
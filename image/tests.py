@@ -1,3 +1,1459 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import io
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import fakeredis
+import redis
+import requests
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from benchmarks.fakes import FakeGCSServer, FakeModelServer, peak_rss, use_fake_redis
+
+from .models import AIJob, ImageAsset, QRCode, Session, Style
+from .utils import gcs, genai_client, handoff, redis_pool, style_assets
+from .utils.events import (
+    format_sse_message,
+    parse_last_event_id,
+    publish_session_event,
+    read_session_backlog,
+    session_log_key,
+    stream_session_events,
+)
+from .utils.preprocess import preprocess_for_model
+from .utils.sse_hub import SessionEventHub
+
+TEST_BUCKET = "test-bucket"
+
+# 테스트는 Redis/GCS/HTTPS 없이 돈다 (Redis는 FakeRedisMixin, GCS는 FakeGCSMixin)
+BASE_SETTINGS = {
+    "CACHES": {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    "SECURE_SSL_REDIRECT": False,
+}
+GCS_SETTINGS = {
+    **BASE_SETTINGS,
+    "GCS_BUCKET_NAME": TEST_BUCKET,
+    "GCS_PUBLIC_URL_PREFIX": f"https://cdn.example.com/{TEST_BUCKET}",
+}
+
+
+def make_png(size=(64, 48), color=(200, 80, 40)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def make_jpeg(size=(64, 48), color=(200, 80, 40), **save_kwargs) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, format="JPEG", **save_kwargs)
+    return buf.getvalue()
+
+
+class FakeRedisMixin:
+    """utils/redis_pool의 프로세스 풀을 테스트마다 새 fakeredis 서버로 교체."""
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(use_fake_redis())
+        self.redis = redis_pool.get_redis_client()
+
+
+class FakeGCSMixin:
+    """STORAGE_EMULATOR_HOST를 스레드로 띄운 fake GCS 서버로 돌리고 gcs 클라이언트를 새로 만든다."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.gcs_server = FakeGCSServer().start()
+        cls.gcs_host = cls.gcs_server.url
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gcs_server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.gcs_server.objects.clear()
+        env = mock.patch.dict(os.environ, {"STORAGE_EMULATOR_HOST": self.gcs_host})
+        env.start()
+        self.addCleanup(env.stop)
+        gcs._reset_client()
+        self.addCleanup(gcs._reset_client)
+
+    def put_object(self, name, data, content_type):
+        self.gcs_server.put(TEST_BUCKET, name, data, content_type)
+
+
+@override_settings(**GCS_SETTINGS, GCS_STREAMING_THRESHOLD=1024, GCS_UPLOAD_CHUNK_SIZE=256 * 1024)
+class GCSEmulatorTests(FakeGCSMixin, TestCase):
+    def test_upload_url_is_unsigned_emulator_put(self):
+        url, headers = gcs.generate_upload_url("original/abc/x y.jpg", "image/jpeg", max_bytes=1000, expires_seconds=60)
+        self.assertEqual(url, f"{self.gcs_host}/{TEST_BUCKET}/original/abc/x%20y.jpg")
+        self.assertEqual(headers["Content-Type"], "image/jpeg")
+
+        requests.put(url, data=b"jpegbytes", headers=headers).raise_for_status()
+        info = gcs.get_object_info("original/abc/x y.jpg")
+        self.assertEqual(info["size"], 9)
+        self.assertEqual(info["content_type"], "image/jpeg")
+
+    def test_upload_stream_multipart_and_resumable(self):
+        for size in (100, 600 * 1024):
+            data = os.urandom(size)
+            result = gcs.upload_stream(io.BytesIO(data), f"final/{size}.bin", "application/octet-stream", size=size)
+            self.assertEqual(result.size, size)
+            self.assertEqual(result.sha256, hashlib.sha256(data).hexdigest())
+            self.assertEqual(gcs.download_bytes(f"final/{size}.bin", start=0, end=9), data[:10])
+
+
+    @override_settings(GCS_HTTP_POOL_MAXSIZE=4)
+    def test_client_is_reused_and_pool_stats_report_the_adapter(self):
+        self.assertFalse(gcs.pool_stats()["initialized"])
+        client = gcs._get_client()
+        threads = [threading.Thread(target=lambda: [gcs._get_client() for _ in range(200)]) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertIs(gcs._get_client(), client)
+        self.assertEqual(gcs.pool_stats()["checkouts"], 1 + 4 * 200 + 1)
+
+        gcs.upload_bytes(b"x" * 10, "final/a.bin", "application/octet-stream")
+        gcs.upload_bytes(b"y" * 10, "final/b.bin", "application/octet-stream")
+        stats = gcs.pool_stats()
+        self.assertTrue(stats["initialized"])
+        self.assertGreater(stats["checkouts"], 1 + 4 * 200 + 1)
+        [pool] = stats["pools"]
+        self.assertEqual(pool["host"], self.gcs_host)
+        self.assertEqual(pool["maxsize"], 4)
+        # 두 번의 업로드가 keep-alive 커넥션 하나를 같이 쓴다
+        self.assertEqual(pool["connections_opened"], 1)
+        self.assertGreaterEqual(pool["requests"], 2)
+
+    def test_forked_child_gets_a_fresh_client(self):
+        gcs._get_client()
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # 자식: register_at_fork 훅이 부모의 클라이언트와 카운터를 버렸는지만 알려준다
+            try:
+                os.close(read_fd)
+                fresh = gcs._client is None and gcs._checkouts == 0 and not gcs.pool_stats()["initialized"]
+                os.write(write_fd, b"1" if fresh else b"0")
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd, "rb") as f:
+            result = f.read()
+        os.waitpid(pid, 0)
+        self.assertEqual(result, b"1")
+        self.assertIsNotNone(gcs._client)
+
+
+@override_settings(**GCS_SETTINGS, GCS_STREAMING_THRESHOLD=1024 * 1024, GCS_UPLOAD_CHUNK_SIZE=1024 * 1024)
+class StreamingUploadMemoryTests(FakeGCSMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # 수신한 바이트를 쌓아 두면 같은 프로세스의 RSS에 섞이므로 해시만 남기는 서버를 쓴다
+        server = FakeGCSServer(keep_data=False).start()
+        self.addCleanup(server.stop)
+        env = mock.patch.dict(os.environ, {"STORAGE_EMULATOR_HOST": server.url})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def test_20mb_upload_keeps_rss_flat(self):
+        size = 20 * 1024 * 1024
+        upload = TemporaryUploadedFile("big.bin", "application/octet-stream", size, None)
+        self.addCleanup(upload.close)
+        block = os.urandom(1024 * 1024)
+        for _ in range(size // len(block)):
+            upload.write(block)
+        upload.flush()
+        gcs.upload_bytes(b"warm-up", "bench/warm-up", "application/octet-stream")
+
+        with peak_rss() as rss:
+            result = gcs.upload_stream(upload, "bench/big.bin", "application/octet-stream", size=size)
+
+        self.assertEqual(result.size, size)
+        # 청크(1MB) 몇 개 수준이어야 하고 파일 크기만큼 늘면 안 된다
+        self.assertLess(rss["peak"], 8 * 1024 * 1024)
+
+    def test_bench_command_runs(self):
+        out = io.StringIO()
+        call_command("bench_upload_rss", "--size-mb", "2", "--repeat", "1", "--emulator", os.environ["STORAGE_EMULATOR_HOST"], stdout=out)
+        self.assertIn("streaming", out.getvalue())
+        self.assertIn("buffered", out.getvalue())
+
+
+@override_settings(**GCS_SETTINGS)
+class UploadCommitTests(FakeRedisMixin, FakeGCSMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        style = Style.objects.create(code="toon", name="Toon", prompt="cartoon")
+        self.session = Session.objects.create(style=style)
+        dispatch = mock.patch("image.views.dispatch_ai_job")
+        self.dispatch = dispatch.start()
+        self.addCleanup(dispatch.stop)
+
+    def _upload(self, kind, data, content_type="image/png"):
+        r = self.client.post("/api/image/upload-url", {
+            "session_uuid": str(self.session.uuid),
+            "kind": kind,
+            "filename": "photo.png",
+            "content_type": content_type,
+        }, format="json")
+        self.assertEqual(r.status_code, 201, r.content)
+        requests.put(r.data["upload_url"], data=data, headers=r.data["headers"]).raise_for_status()
+        return r.data["object_name"]
+
+    def _commit(self, path, object_name):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(path, {
+                "session_uuid": str(self.session.uuid),
+                "object_name": object_name,
+            }, format="json")
+
+    def test_original_commit_retry_is_idempotent(self):
+        object_name = self._upload("ORIGINAL", make_png((64, 48)))
+        first = self._commit("/api/image/upload/commit", object_name)
+        second = self._commit("/api/image/upload/commit", object_name)
+
+        self.assertEqual(first.status_code, 201, first.content)
+        self.assertEqual(second.status_code, 200, second.content)
+        self.assertEqual(second.data["original_image_url"], first.data["original_image_url"])
+        asset = ImageAsset.objects.get(session=self.session, kind=ImageAsset.Kind.ORIGINAL)
+        self.assertEqual((asset.width, asset.height, asset.mime), (64, 48, "image/png"))
+        self.assertEqual(AIJob.objects.filter(session=self.session).count(), 1)
+        self.dispatch.assert_called_once()
+
+    def test_final_commit_retry_is_idempotent(self):
+        object_name = self._upload("FINAL", make_png())
+        first = self._commit("/api/image/finalize/commit", object_name)
+        second = self._commit("/api/image/finalize/commit", object_name)
+
+        self.assertEqual(first.status_code, 201, first.content)
+        self.assertEqual(second.status_code, 200, second.content)
+        self.assertEqual(ImageAsset.objects.filter(session=self.session, kind=ImageAsset.Kind.FINAL).count(), 1)
+
+        other = self._upload("FINAL", make_png())
+        self.assertEqual(self._commit("/api/image/finalize/commit", other).status_code, 409)
+
+    def test_commit_rejects_truncated_upload(self):
+        from benchmarks.management.commands.bench_preprocess import synthetic_photo
+        photo = synthetic_photo(800, 600)
+        self.assertGreater(len(photo), 64 * 1024)
+        object_name = self._upload("ORIGINAL", photo[:-4096], content_type="image/jpeg")
+        r = self._commit("/api/image/upload/commit", object_name)
+
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.data["object_name"], "이미지 파일이 아닙니다.")
+        self.dispatch.assert_not_called()
+
+        object_name = self._upload("ORIGINAL", photo, content_type="image/jpeg")
+        self.assertEqual(self._commit("/api/image/upload/commit", object_name).status_code, 201)
+
+    def test_direct_upload_rejects_truncated_with_fixed_message(self):
+        r = self.client.post("/api/image/upload", {
+            "session_uuid": str(self.session.uuid),
+            "image_file": SimpleUploadedFile("photo.png", make_png()[:-20], content_type="image/png"),
+        }, format="multipart")
+
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.data["image_file"], "이미지 파일이 아닙니다.")
+
+    def test_ingest_hands_off_the_bytes_it_uploaded_without_rereading(self):
+        from django.core.files import File
+        from benchmarks.management.commands.bench_probe import _CountingReader
+        from .views import _ingest_original
+
+        photo = make_jpeg((640, 480))
+        fobj = File(_CountingReader(photo), name="photo.jpg")
+        with tempfile.TemporaryDirectory() as spool, \
+                override_settings(HANDOFF_BACKEND="spool", HANDOFF_SPOOL_DIR=spool):
+            _ingest_original(self.session, fobj, "photo.jpg")
+            self.assertEqual(handoff.fetch_original(str(self.session.uuid)), photo)
+        # 업로드 한 번 + 헤더/꼬리 확인만
+        self.assertLess(fobj.file.bytes_read, len(photo) + 4096)
+
+    def test_commit_rejects_non_image(self):
+        object_name = self._upload("ORIGINAL", b"definitely not an image")
+        r = self._commit("/api/image/upload/commit", object_name)
+
+        self.assertEqual(r.status_code, 400)
+        self.assertFalse(ImageAsset.objects.filter(session=self.session).exists())
+        self.dispatch.assert_not_called()
+
+
+@override_settings(**BASE_SETTINGS)
+class SessionEventHubTests(FakeRedisMixin, SimpleTestCase):
+    def test_one_frame_per_message_shared_by_subscribers(self):
+        async def run():
+            hub = SessionEventHub()
+            first = await hub.subscribe("s1")
+            second = await hub.subscribe("s1")
+            other = await hub.subscribe("s2")
+            with mock.patch("image.utils.sse_hub.format_sse_message", wraps=format_sse_message) as fmt:
+                await asyncio.to_thread(publish_session_event, "s1", "progress", {"n": 1})
+                a = await asyncio.wait_for(first.get(), 5)
+                b = await asyncio.wait_for(second.get(), 5)
+            hub._task.cancel()
+            return a, b, other.qsize(), fmt.call_count
+
+        a, b, other_pending, format_calls = asyncio.run(run())
+        self.assertIs(a[1], b[1])
+        self.assertIn('"n": 1', a[1])
+        self.assertEqual(other_pending, 0)
+        self.assertEqual(format_calls, 1)
+
+    def test_subscribe_fails_fast_and_ready_clears_when_subscription_is_lost(self):
+        class FlakyPubSub:
+            def __init__(self, fail_subscribe):
+                self.fail_subscribe = fail_subscribe
+
+            async def psubscribe(self, pattern):
+                if self.fail_subscribe:
+                    raise redis.ConnectionError("down")
+
+            async def listen(self):
+                await asyncio.sleep(0.02)
+                raise redis.ConnectionError("lost")
+                yield
+
+            async def aclose(self):
+                pass
+
+        # 첫 연결은 구독까지 되고 곧 끊긴다. 그 뒤로 Redis는 계속 죽어 있다
+        pubsubs = iter([FlakyPubSub(False)])
+        client = SimpleNamespace(pubsub=lambda: next(pubsubs, FlakyPubSub(True)))
+
+        async def run():
+            hub = SessionEventHub(reconnect_delay=0.01, ready_timeout=0.2)
+            await hub.subscribe("s1")
+            await asyncio.sleep(0.1)
+            ready_after_loss = hub._ready.is_set()
+            with self.assertRaises(asyncio.TimeoutError):
+                await hub.subscribe("s2")
+            hub._task.cancel()
+            return ready_after_loss, set(hub._subscribers)
+
+        with mock.patch("image.utils.sse_hub.get_async_redis_client", return_value=client), \
+                self.assertLogs("image.utils.sse_hub", "ERROR"):
+            ready_after_loss, sessions = asyncio.run(run())
+        self.assertFalse(ready_after_loss)
+        # 타임아웃 난 구독자는 남지 않는다
+        self.assertEqual(sessions, {"s1"})
+
+    def test_bench_command_runs(self):
+        out = io.StringIO()
+        call_command("bench_sse_clients", "--fake-redis", "--clients", "20", "--sessions", "5", "--events", "2", stdout=out)
+        self.assertIn("frames delivered: 40 (expected 40)", out.getvalue())
+
+
+@override_settings(SESSION_EVENT_LOG_MAXLEN=5, SESSION_EVENT_LOG_TTL=600)
+class SessionEventLogTests(FakeRedisMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        # 이벤트 로그 payload는 str로 읽는다
+        self.client = redis_pool.get_redis_client(decode_responses=True)
+
+    def _publish(self, count, session="s1"):
+        return [publish_session_event(session, "progress", {"n": n}) for n in range(count)]
+
+    def _take(self, stream, count):
+        frames = [next(stream) for _ in range(count)]
+        stream.close()
+        return frames
+
+    def test_resume_replays_only_events_after_last_event_id(self):
+        ids = self._publish(4)
+        backlog = read_session_backlog(self.client, "s1", ids[1])
+        self.assertEqual([json.loads(raw)["id"] for raw in backlog], ids[2:])
+        self.assertEqual([json.loads(raw)["data"]["n"] for raw in backlog], [2, 3])
+
+        frames = self._take(stream_session_events("s1", last_event_id=ids[1]), 3)
+        self.assertEqual(frames[0], "retry: 3000\n\n")
+        self.assertTrue(frames[1].startswith(f"id: {ids[2]}\nevent: progress\n"))
+        self.assertTrue(frames[2].startswith(f"id: {ids[3]}\n"))
+
+    def test_new_client_gets_latest_event_only(self):
+        ids = self._publish(3)
+        backlog = read_session_backlog(self.client, "s1", None)
+        self.assertEqual([json.loads(raw)["id"] for raw in backlog], [ids[-1]])
+        self.assertEqual(read_session_backlog(self.client, "other", None), [])
+
+    def test_malformed_last_event_id_is_treated_as_new_client(self):
+        ids = self._publish(3)
+        for value in ("garbage", "123", "1-2-3", "'; DROP", ""):
+            self.assertIsNone(parse_last_event_id(value))
+        self.assertEqual(parse_last_event_id(f" {ids[0]} "), ids[0])
+
+        frames = self._take(stream_session_events("s1", last_event_id=parse_last_event_id("garbage")), 2)
+        self.assertTrue(frames[1].startswith(f"id: {ids[-1]}\n"))
+        self.assertIn('"n": 2', frames[1])
+
+    def test_batch_is_one_round_trip_with_stream_ids(self):
+        from .utils.events import publish_session_events
+
+        pubsub = self.client.pubsub()
+        pubsub.subscribe("session:s1")
+        pubsub.get_message(timeout=1)
+        # 스크립트가 아직 없는 서버(NOSCRIPT)에서도 배치가 그대로 나간다 (풀 커넥션도 여기서 연결)
+        self.assertEqual(len(publish_session_events("s0", [("a", {}), ("b", {})])), 2)
+        sent = []
+        send = redis.connection.AbstractConnection.send_packed_command
+
+        def spy(conn, command, check_health=True):
+            sent.append(command)
+            return send(conn, command, check_health)
+
+        with mock.patch.object(redis.connection.AbstractConnection, "send_packed_command", spy):
+            ids = publish_session_events("s1", [("progress", {"n": n}) for n in range(3)])
+        self.assertEqual(len(sent), 1)
+
+        self.assertEqual(ids, [entry_id for entry_id, _ in self.client.xrange(session_log_key("s1"))])
+        live = [json.loads(pubsub.get_message(timeout=1)["data"]) for _ in ids]
+        pubsub.close()
+        # Lua가 스트림 id를 payload 앞에 붙여 발행한다
+        self.assertEqual([(p["id"], p["data"]["n"]) for p in live], list(zip(ids, range(3))))
+
+    def test_log_is_capped_and_expires(self):
+        ids = self._publish(8)
+        key = session_log_key("s1")
+        self.assertEqual(self.client.xlen(key), 5)
+        self.assertEqual([entry_id for entry_id, _ in self.client.xrange(key)], ids[3:])
+        self.assertTrue(0 < self.client.ttl(key) <= 600)
+
+
+class StyleAssetTests(SimpleTestCase):
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        overrides = override_settings(STYLE_ASSET_CACHE_DIR=cache_dir.name, STYLE_ASSET_TTL=3600, STYLE_ASSET_MEMORY_ITEMS=8)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        style_assets._memory = None
+        style_assets._url_locks.clear()
+
+    def test_slow_fetch_does_not_block_other_urls_and_is_single_flight(self):
+        release = threading.Event()
+        calls = []
+
+        def fake_get(url, headers=None, timeout=None):
+            calls.append(url)
+            if url.endswith("slow.png"):
+                release.wait(5)
+            return mock.Mock(status_code=200, content=make_png(), headers={})
+
+        with mock.patch("requests.get", side_effect=fake_get):
+            style_assets.get_reference_png("https://ref/fast.png")
+            results = []
+            slow = [threading.Thread(target=lambda: results.append(style_assets.get_reference_png("https://ref/slow.png")))
+                    for _ in range(3)]
+            for t in slow:
+                t.start()
+            # 느린 fetch가 진행 중이어도 캐시된 URL은 바로 돌아온다
+            fast = threading.Thread(target=style_assets.get_reference_png, args=("https://ref/fast.png",))
+            fast.start()
+            fast.join(1)
+            self.assertFalse(fast.is_alive())
+            release.set()
+            for t in slow:
+                t.join(5)
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(calls.count("https://ref/slow.png"), 1)
+        self.assertEqual(calls.count("https://ref/fast.png"), 1)
+
+
+@override_settings(**BASE_SETTINGS)
+class HandoffTests(FakeRedisMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        spool = tempfile.TemporaryDirectory()
+        self.addCleanup(spool.cleanup)
+        overrides = override_settings(HANDOFF_SPOOL_DIR=spool.name, HANDOFF_TTL=300, HANDOFF_MAX_BYTES=1024)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # 핸드오프 전용 Redis는 브로커(redis_pool)와 다른 서버
+        self.handoff_server = fakeredis.FakeServer()
+        handoff._pool = redis.ConnectionPool(connection_class=fakeredis.FakeConnection, server=self.handoff_server)
+        self.addCleanup(setattr, handoff, "_pool", None)
+
+    def test_default_backend_is_disabled_without_dedicated_redis(self):
+        from django.conf import settings
+        if not os.environ.get("HANDOFF_REDIS_URL") and not os.environ.get("HANDOFF_BACKEND"):
+            self.assertEqual(settings.HANDOFF_BACKEND, "")
+        self.assertLessEqual(settings.HANDOFF_MAX_BYTES, 8 * 1024 * 1024)
+
+    def test_stale_spool_files_are_swept(self):
+        with override_settings(HANDOFF_BACKEND="spool"):
+            handoff.stash_original("orphan", b"photo-bytes")
+            orphan = handoff._spool_path("orphan")
+            os.utime(orphan, (os.path.getmtime(orphan) - 301,) * 2)
+            handoff.stash_original("fresh", b"photo-bytes")
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(handoff._spool_path("fresh")))
+
+    def test_failed_job_discards_its_original(self):
+        from .tasks import _fail_job
+        style = Style.objects.create(code="toon", name="Toon")
+        session = Session.objects.create(style=style)
+        job = AIJob.objects.create(session=session, request_payload={})
+        with override_settings(HANDOFF_BACKEND="spool"):
+            handoff.stash_original(str(session.uuid), b"photo-bytes")
+            _fail_job(job.id, RuntimeError("boom"))
+            self.assertIsNone(handoff.fetch_original(str(session.uuid)))
+        self.assertFalse(os.path.exists(handoff._spool_path(str(session.uuid))))
+
+    def test_round_trip_per_backend(self):
+        for backend in ("spool", "redis"):
+            with self.subTest(backend=backend), override_settings(HANDOFF_BACKEND=backend, HANDOFF_REDIS_URL="redis://handoff/1"):
+                self.assertTrue(handoff.stash_original("s1", b"photo-bytes"))
+                self.assertEqual(handoff.fetch_original("s1"), b"photo-bytes")
+                handoff.discard_original("s1")
+                self.assertIsNone(handoff.fetch_original("s1"))
+
+    def test_redis_backend_never_touches_broker(self):
+        with override_settings(HANDOFF_BACKEND="redis", HANDOFF_REDIS_URL="redis://handoff/1"):
+            handoff.stash_original("s1", b"photo-bytes")
+        dedicated = fakeredis.FakeStrictRedis(server=self.handoff_server)
+        self.assertLessEqual(dedicated.ttl("handoff:original:s1"), 300)
+        self.assertEqual(self.redis.keys("handoff:*"), [])
+
+    def test_oversized_and_expired_are_skipped(self):
+        with override_settings(HANDOFF_BACKEND="spool"):
+            self.assertFalse(handoff.stash_original("big", b"x" * 2048))
+            self.assertIsNone(handoff.fetch_original("big"))
+
+            handoff.stash_original("old", b"photo-bytes")
+            path = handoff._spool_path("old")
+            os.utime(path, (os.path.getmtime(path) - 301,) * 2)
+            self.assertIsNone(handoff.fetch_original("old"))
+
+    def test_ai_task_reads_handoff_instead_of_storage(self):
+        from .tasks import _load_original_bytes
+        style = Style.objects.create(code="toon", name="Toon")
+        session = Session.objects.create(style=style)
+        with override_settings(HANDOFF_BACKEND="spool"), mock.patch("image.utils.gcs.download_bytes") as download:
+            handoff.stash_original(str(session.uuid), b"photo-bytes")
+            self.assertEqual(_load_original_bytes(session), b"photo-bytes")
+        download.assert_not_called()
+
+
+class PreprocessTests(SimpleTestCase):
+    def test_orients_downscales_and_shrinks_payload(self):
+        from benchmarks.management.commands.bench_preprocess import _legacy_payload, synthetic_photo
+        with Image.open(io.BytesIO(synthetic_photo(2000, 1000))) as img:
+            exif = img.getexif()
+            exif[0x0112] = 6  # 90° 회전
+            buf = io.BytesIO()
+            img.save(buf, format="JPEG", quality=92, exif=exif)
+        data = buf.getvalue()
+
+        payload, mime = preprocess_for_model(data, {"max_side": 1024, "format": "JPEG", "quality": 85})
+
+        self.assertEqual(mime, "image/jpeg")
+        with Image.open(io.BytesIO(payload)) as out:
+            self.assertEqual(out.size, (512, 1024))
+        self.assertLess(len(payload) * 10, len(_legacy_payload(data)))
+
+    def test_bench_command_runs(self):
+        out = io.StringIO()
+        call_command("bench_preprocess", "--width", "800", "--height", "600", "--repeat", "1", stdout=out)
+        self.assertIn("legacy RGBA PNG", out.getvalue())
+        self.assertIn("WEBP", out.getvalue())
+
+
+class GenaiClientTests(SimpleTestCase):
+    def setUp(self):
+        self.model = FakeModelServer().start()
+        self.addCleanup(self.model.stop)
+        overrides = override_settings(GOOGLE_GENAI_API_KEY="test-key", GOOGLE_GENAI_BASE_URL=self.model.url)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        genai_client._reset_client()
+        self.addCleanup(genai_client._reset_client)
+
+    def test_jobs_share_one_client_and_connection(self):
+        from .tasks import _extract_image_bytes
+        for _ in range(3):
+            response = genai_client.get_genai_client().models.generate_content(model="fake-model", contents=["hi"])
+            self.assertEqual(_extract_image_bytes(response), self.model.image)
+
+        self.assertIs(genai_client.get_genai_client(), genai_client.get_genai_client())
+        self.assertEqual(self.model.requests, 3)
+        self.assertEqual(self.model.connections, 1)
+
+    def test_worker_init_only_on_ai_queue_consumers(self):
+        from celery import current_app
+        from .tasks import _init_ai_worker
+        for consume_from, expected in (({"qr": None, "default": None}, 0), ({"ai": None}, 1)):
+            with self.subTest(consume_from=sorted(consume_from)), \
+                    mock.patch.object(type(current_app.amqp.queues), "consume_from", new=consume_from), \
+                    mock.patch("image.utils.genai_client.init_worker") as init_worker:
+                _init_ai_worker()
+            self.assertEqual(init_worker.call_count, expected)
+
+
+def model_response(image: bytes):
+    part = SimpleNamespace(inline_data=SimpleNamespace(data=image))
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+@override_settings(**GCS_SETTINGS, AI_RESULT_CACHE_ENABLED=True)
+class ResultCacheTests(FakeRedisMixin, FakeGCSMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        spool = tempfile.TemporaryDirectory()
+        self.addCleanup(spool.cleanup)
+        overrides = override_settings(HANDOFF_BACKEND="spool", HANDOFF_SPOOL_DIR=spool.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.style = Style.objects.create(code="toon", name="Toon", prompt="cartoon")
+
+    def _run_job(self, session, photo, result):
+        """사진을 핸드오프에 두고 준비 -> (캐시 미스면) 모델 응답으로 완료. 생성된 AI 자산을 반환."""
+        from .tasks import _finish_job, _prepare_job
+        handoff.stash_original(str(session.uuid), photo)
+        job = AIJob.objects.create(session=session, request_payload={})
+        prepared = _prepare_job(job.id)
+        if prepared is not None:
+            _finish_job(prepared, model_response(result))
+        return ImageAsset.objects.filter(session=session, kind=ImageAsset.Kind.AI).latest("id")
+
+    def test_reshoot_does_not_overwrite_cached_result(self):
+        first_photo, second_photo = make_png(color=(10, 20, 30)), make_png(color=(200, 100, 0))
+        session = Session.objects.create(style=self.style)
+        first = self._run_job(session, first_photo, b"result-1")
+        # 같은 세션에서 다른 사진으로 다시 찍어도 첫 결과 오브젝트는 그대로
+        second = self._run_job(session, second_photo, b"result-2")
+        self.assertRegex(first.gcs_path, r"/ai/cache/[0-9a-f]{64}\.png$")
+        self.assertNotEqual(first.gcs_path, second.gcs_path)
+
+        other = self._run_job(Session.objects.create(style=self.style), first_photo, b"never-called")
+        self.assertEqual(other.gcs_path, first.gcs_path)
+        self.assertEqual(gcs.download_bytes(gcs.object_name_from_gcs_path(other.gcs_path)), b"result-1")
+
+
+    def _store(self, key, style_id=None):
+        from .utils.result_cache import store_result
+        store_result(key, style_id or self.style.id, {"gcs_path": f"gs://b/ai/cache/{key}.png"})
+
+    def test_prompt_change_invalidates_style_entries(self):
+        from .utils.result_cache import cache_stats, get_cached_result
+
+        other = Style.objects.create(code="sketch", name="Sketch", prompt="pencil")
+        for key in ("a", "b"):
+            self._store(key)
+        self._store("c", other.id)
+        # 결과에 영향 없는 저장(is_active)은 캐시를 그대로 둔다
+        with self.captureOnCommitCallbacks(execute=True):
+            self.style.is_active = False
+            self.style.save()
+        self.assertIsNotNone(get_cached_result("a"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.style.prompt = "watercolor"
+            self.style.save()
+        self.assertIsNone(get_cached_result("a"))
+        self.assertIsNone(get_cached_result("b"))
+        self.assertIsNotNone(get_cached_result("c"))
+        stats = cache_stats()
+        self.assertEqual((stats["invalidations"], stats["entries"]), (2, 1))
+
+    def test_invalidation_swallows_redis_errors(self):
+        from .utils.result_cache import invalidate_style
+
+        with mock.patch("image.utils.result_cache.get_redis_client", side_effect=redis.ConnectionError("down")), \
+                self.assertLogs("image.utils.result_cache", "WARNING"):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.style.prompt = "watercolor"
+                self.style.save()
+            self.assertEqual(invalidate_style(self.style.id), 0)
+
+    @override_settings(AI_RESULT_CACHE_MAX_ENTRIES=2)
+    def test_size_cap_evicts_oldest(self):
+        from .utils.result_cache import cache_stats, get_cached_result
+
+        now = time.time()
+        for n, key in enumerate(("old", "mid", "new")):
+            with mock.patch("time.time", return_value=now + n):
+                self._store(key)
+        self.assertEqual(self.redis.zrange("aicache:index", 0, -1), ["mid", "new"])
+        self.assertIsNone(get_cached_result("old"))
+        self.assertIsNotNone(get_cached_result("new"))
+        self.assertEqual(cache_stats()["evictions"], 1)
+
+    def test_hit_and_miss_counters(self):
+        from .utils.result_cache import cache_stats, get_cached_result
+
+        self._store("a")
+        self.assertEqual(get_cached_result("a"), {"gcs_path": "gs://b/ai/cache/a.png"})
+        get_cached_result("a")
+        self.assertIsNone(get_cached_result("nope"))
+        stats = cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (2, 1, 1))
+        with override_settings(AI_RESULT_CACHE_ENABLED=False):
+            self.assertIsNone(get_cached_result("a"))
+        self.assertEqual(cache_stats()["hits"], 2)
+
+
+class ThrottledTests(SimpleTestCase):
+    def test_pickle_round_trip(self):
+        from .utils.ratelimit import Throttled
+        restored = pickle.loads(pickle.dumps(Throttled("gemini", 2.5)))
+        self.assertEqual((restored.model, restored.retry_after), ("gemini", 2.5))
+        self.assertEqual(str(restored), "gemini throttled, retry after 2.5s")
+
+
+@override_settings(**BASE_SETTINGS, AI_MODEL_LEASE_SECONDS=180, AI_THROTTLE_BUSY_RETRY_SECONDS=3, AI_THROTTLE_MAX_RETRIES=40,
+                   AI_MODEL_LIMITS={"default": {"rpm": 6, "burst": 2, "concurrency": 0},
+                                    "busy": {"rpm": 0, "concurrency": 1}})
+class RateLimitTests(FakeRedisMixin, TestCase):
+    def test_token_bucket_runs_dry(self):
+        from .utils.ratelimit import try_acquire
+
+        self.assertIsNotNone(try_acquire("gemini")[0])
+        self.assertIsNotNone(try_acquire("gemini")[0])
+        lease_id, retry_after = try_acquire("gemini")
+        self.assertIsNone(lease_id)
+        # 6 rpm → 토큰 하나가 차는 데 약 10초
+        self.assertTrue(9 < retry_after <= 10, retry_after)
+        self.assertEqual(self.redis.zcard("ai:limit:gemini:leases"), 2)
+
+    def test_expired_leases_free_concurrency(self):
+        from .utils.ratelimit import try_acquire
+
+        lease_id, _ = try_acquire("busy")
+        self.assertIsNotNone(lease_id)
+        self.assertEqual(try_acquire("busy"), (None, 3.0))
+        # 워커가 죽어 release를 못 해도 리스가 만료되면 자리가 난다
+        self.redis.zadd("ai:limit:busy:leases", {lease_id: 0})
+        self.assertIsNotNone(try_acquire("busy")[0])
+        self.assertEqual(self.redis.zcard("ai:limit:busy:leases"), 1)
+
+    def test_model_slot_releases_on_failure(self):
+        from .utils.ratelimit import Throttled, model_slot
+
+        with self.assertRaises(ValueError), model_slot("busy"):
+            self.assertEqual(self.redis.zcard("ai:limit:busy:leases"), 1)
+            raise ValueError("model call failed")
+        self.assertEqual(self.redis.zcard("ai:limit:busy:leases"), 0)
+
+        with model_slot("busy"):
+            with self.assertRaises(Throttled) as ctx, model_slot("busy"):
+                pass
+            self.assertEqual(ctx.exception.retry_after, 3.0)
+        self.assertEqual(self.redis.zcard("ai:limit:busy:leases"), 0)
+
+    def test_requeue_uses_limiter_wait_as_countdown(self):
+        from celery.exceptions import Retry
+
+        from .tasks import _as_throttled, _requeue_throttled
+        from .utils.ratelimit import Throttled, try_acquire
+
+        style = Style.objects.create(code="s", name="S", prompt="p")
+        job = AIJob.objects.create(session=Session.objects.create(style=style), request_payload={},
+                                   status=AIJob.Status.RUNNING)
+        for _ in range(2):
+            try_acquire("gemini")
+        _, retry_after = try_acquire("gemini")
+        throttled = _as_throttled(Throttled("gemini", retry_after), "gemini", retries=0)
+
+        task = mock.Mock()
+        task.retry.return_value = Retry()
+        with mock.patch("random.random", return_value=0.5), self.assertRaises(Retry):
+            _requeue_throttled(task, job, throttled)
+        task.retry.assert_called_once_with(countdown=retry_after * 1.1, exc=throttled, max_retries=40)
+        job.refresh_from_db()
+        self.assertEqual(job.status, AIJob.Status.PENDING)
+
+        # 모델 쪽 429는 재시도 횟수에 따라 지수 백오프
+        quota = SimpleNamespace(code=429)
+        self.assertEqual(_as_throttled(quota, "gemini", retries=2).retry_after, 12.0)
+        self.assertEqual(_as_throttled(quota, "gemini", retries=10).retry_after, 60.0)
+        self.assertIsNone(_as_throttled(ValueError(), "gemini", retries=0))
+
+
+@override_settings(**BASE_SETTINGS)
+class AIUtilizationViewTests(FakeRedisMixin, TestCase):
+    def test_admin_only(self):
+        from django.contrib.auth.models import User
+        client = APIClient()
+        self.assertIn(client.get("/api/ai/utilization").status_code, (401, 403))
+
+        client.force_authenticate(User.objects.create_user("staff", is_staff=True))
+        r = client.get("/api/ai/utilization")
+        self.assertEqual(r.status_code, 200)
+        self.assertIn("result_cache", r.data)
+
+
+class AsyncDBTests(SimpleTestCase):
+    def test_db_closes_stale_connections_around_each_call(self):
+        from .async_runner import _db
+
+        def boom():
+            raise RuntimeError("db")
+
+        with mock.patch("image.async_runner.close_old_connections") as close:
+            self.assertEqual(asyncio.run(_db(lambda: 42)()), 42)
+            self.assertEqual(close.call_count, 2)
+            with self.assertRaises(RuntimeError):
+                asyncio.run(_db(boom)())
+            self.assertEqual(close.call_count, 4)
+
+
+@override_settings(**BASE_SETTINGS)
+class AsyncPipelineFailureTests(FakeRedisMixin, TransactionTestCase):
+    # _db는 다른 스레드의 커넥션을 쓰므로 커밋된 데이터가 필요하다
+    def test_failure_is_logged_once_and_recorded(self):
+        from .async_runner import run_ai_pipeline
+
+        style = Style.objects.create(code="s", name="S", prompt="p")
+        job = AIJob.objects.create(session=Session.objects.create(style=style), request_payload={})
+        with mock.patch("image.tasks._prepare_job", side_effect=RuntimeError("boom")), \
+                self.assertLogs("image", level="ERROR") as logs:
+            asyncio.run(run_ai_pipeline(job.id))
+
+        self.assertEqual(len(logs.records), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, AIJob.Status.FAILED)
+        self.assertEqual(job.session.status, Session.Status.FAILED)
+
+
+@override_settings(**BASE_SETTINGS, QR_POOL_ENABLED=True, QR_POOL_LOW_WATER=5, QR_POOL_REPLENISH_REQUEST_TTL=10)
+class QRPoolReplenishRequestTests(FakeRedisMixin, TestCase):
+    def test_burst_of_sessions_counts_and_enqueues_once(self):
+        from .utils.qr_pool import REPLENISH_REQUESTED_KEY, request_replenish_if_low
+
+        with mock.patch("image.tasks.replenish_qr_pool.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(1):
+                for _ in range(10):
+                    request_replenish_if_low()
+            self.assertEqual(delay.call_count, 1)
+
+            # TTL이 지나면 다시 확인한다
+            self.redis.delete(REPLENISH_REQUESTED_KEY)
+            with self.captureOnCommitCallbacks(execute=True):
+                request_replenish_if_low()
+            self.assertEqual(delay.call_count, 2)
+
+
+@override_settings(**BASE_SETTINGS, QR_IMAGE_MODE="gcs", QR_POOL_ENABLED=True, QR_POOL_LOW_WATER=0,
+                   QR_BATCH_SIZE=2, SESSION_BULK_MAX=10)
+class SessionBulkCreateTests(FakeRedisMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.style = Style.objects.create(code="s", name="S", prompt="p")
+        self.pooled = [
+            QRCode.objects.create(slug=f"pool{i}", status=QRCode.Status.READY, is_pooled=True,
+                                  qr_image_public_url=f"https://cdn.example.com/pool{i}.png")
+            for i in range(4)
+        ]
+        self.client = APIClient()
+
+    def _bulk_create(self, count):
+        return self.client.post("/api/session/bulk-create", {"style_id": self.style.id, "count": count}, format="json")
+
+    def test_claims_pool_then_renders_rest_after_commit(self):
+        with mock.patch("image.views.dispatch_qr_batches") as dispatch:
+            # 쿼리 수는 세션 개수와 무관: 스타일, 풀 claim/update, 슬러그 확인, QR/세션 bulk_create, 풀 잔량
+            with self.assertNumQueries(9), self.captureOnCommitCallbacks() as callbacks:
+                r = self._bulk_create(7)
+            self.assertEqual(r.status_code, 201)
+            dispatch.assert_not_called()
+            for callback in callbacks:
+                callback()
+
+        sessions = r.json()["sessions"]
+        self.assertEqual(r.json()["count"], 7)
+        self.assertEqual(Session.objects.count(), 7)
+        # 풀에 있던 4개를 먼저 쓰고 나머지 3개만 새로 만든다
+        claimed = [s["qr"]["slug"] for s in sessions[:4]]
+        self.assertEqual(claimed, [qr.slug for qr in self.pooled])
+        self.assertFalse(QRCode.objects.filter(is_pooled=True).exists())
+        pending = list(QRCode.objects.filter(status=QRCode.Status.PENDING).order_by("id").values_list("id", flat=True))
+        self.assertEqual(len(pending), 3)
+        dispatch.assert_called_once_with(pending)
+
+    def test_dispatch_one_task_per_batch(self):
+        from .tasks import dispatch_qr_batches
+
+        grouped = []
+        result = mock.Mock()
+        with mock.patch("image.tasks.generate_qr_batch_task.s", side_effect=lambda ids: ids), \
+                mock.patch("celery.group", side_effect=lambda sigs: grouped.append(list(sigs)) or result):
+            dispatch_qr_batches([1, 2, 3, 4, 5])
+            self.assertIsNone(dispatch_qr_batches([]))
+        # 그룹 하나에 묶음(QR_BATCH_SIZE)마다 태스크 하나
+        self.assertEqual(grouped, [[[1, 2], [3, 4], [5]]])
+        result.apply_async.assert_called_once_with()
+
+    def test_rejects_more_than_bulk_max(self):
+        with mock.patch("image.views.dispatch_qr_batches") as dispatch:
+            r = self._bulk_create(11)
+        self.assertEqual(r.status_code, 400)
+        self.assertIn("count", r.json())
+        self.assertEqual(Session.objects.count(), 0)
+        self.assertEqual(QRCode.objects.filter(is_pooled=True).count(), 4)
+        dispatch.assert_not_called()
+
+
+@override_settings(**BASE_SETTINGS)
+class SessionListPaginationTests(FakeRedisMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.cartoon = Style.objects.create(code="cartoon", name="Cartoon", prompt="p")
+        self.sketch = Style.objects.create(code="sketch", name="Sketch", prompt="p")
+        self.base = timezone.now() - timedelta(hours=1)
+
+    def _session(self, minutes, style=None, status=Session.Status.CREATED):
+        session = Session.objects.create(style=style or self.cartoon, status=status)
+        # auto_now를 피해 updated_at을 직접 맞춘다
+        Session.objects.filter(pk=session.pk).update(updated_at=self.base + timedelta(minutes=minutes))
+        return session
+
+    def _pages(self, url):
+        pages = []
+        while url:
+            r = self.client.get(url)
+            self.assertEqual(r.status_code, 200)
+            pages.append([row["uuid"] for row in r.json()["results"]])
+            url = r.json()["next"]
+        return pages
+
+    def test_ties_on_updated_at_are_ordered_by_id(self):
+        # 같은 updated_at 5개가 페이지 경계를 넘어도 빠지거나 겹치지 않는다
+        tied = [self._session(10) for _ in range(5)]
+        newest = self._session(20)
+        oldest = self._session(0)
+        pages = self._pages("/api/sessions?page_size=3")
+        expected = [str(s.uuid) for s in [newest] + sorted(tied, key=lambda s: -s.id) + [oldest]]
+        self.assertEqual([uuid for page in pages for uuid in page], expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+
+    def test_pages_stay_stable_across_inserts(self):
+        sessions = [self._session(m) for m in range(6)]
+        r = self.client.get("/api/sessions?page_size=3")
+        first = [row["uuid"] for row in r.json()["results"]]
+        # 첫 페이지를 본 뒤 새 세션이 생겨도 다음 페이지는 밀리지 않는다
+        self._session(30)
+        rest = self._pages(r.json()["next"])
+        self.assertEqual(first + [uuid for page in rest for uuid in page],
+                         [str(s.uuid) for s in reversed(sessions)])
+
+    def test_filters_combine_with_cursor(self):
+        wanted = [self._session(m, status=Session.Status.FINALIZED) for m in range(0, 10, 2)]
+        self._session(1, status=Session.Status.CREATED)
+        self._session(3, style=self.sketch, status=Session.Status.FINALIZED)
+        after = (self.base + timedelta(minutes=2)).isoformat().replace("+00:00", "Z")
+        url = f"/api/sessions?page_size=2&status=FINALIZED,AI_READY&style=cartoon&updated_after={after}"
+        pages = self._pages(url)
+        self.assertEqual([uuid for page in pages for uuid in page],
+                         [str(s.uuid) for s in reversed(wanted[1:])])
+        self.assertEqual(self.client.get("/api/sessions?status=NOPE").status_code, 400)
+
+    def test_count_cache_key_ignores_cursor_and_page_size(self):
+        for m in range(4):
+            self._session(m)
+        with self.assertNumQueries(2):
+            r = self.client.get("/api/sessions?include_count=true&page_size=2")
+        self.assertEqual(r.json()["count"], 4)
+        # 다음 페이지, 다른 페이지 크기는 캐시된 개수를 쓴다 (COUNT 쿼리 없음)
+        self._session(10)
+        with self.assertNumQueries(1):
+            r = self.client.get(r.json()["next"])
+        self.assertEqual(r.json()["count"], 4)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/api/sessions?include_count=1&page_size=5").json()["count"], 4)
+        # 필터가 다르면 따로 센다
+        with self.assertNumQueries(2):
+            r = self.client.get("/api/sessions?include_count=true&style=cartoon")
+        self.assertEqual(r.json()["count"], 5)
+        self.assertNotIn("count", self.client.get("/api/sessions").json())
+
+
+@override_settings(**BASE_SETTINGS)
+class SessionExportTests(FakeRedisMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        from django.contrib.auth.models import User
+
+        style = Style.objects.create(code="cartoon", name="Cartoon", prompt="p")
+        self.done = Session.objects.create(style=style, status=Session.Status.FINALIZED)
+        ImageAsset.objects.create(session=self.done, kind=ImageAsset.Kind.ORIGINAL, gcs_path="o.jpg",
+                                  public_url="https://cdn.example.com/o.jpg", size_bytes=1234)
+        ImageAsset.objects.create(session=self.done, kind=ImageAsset.Kind.FINAL, gcs_path="f.png",
+                                  public_url="https://cdn.example.com/f.png", size_bytes=99)
+        AIJob.objects.create(session=self.done, request_payload={}, status=AIJob.Status.FAILED)
+        AIJob.objects.create(session=self.done, request_payload={}, status=AIJob.Status.SUCCEEDED)
+        self.fresh = Session.objects.create(style=style, status=Session.Status.CREATED)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", is_staff=True))
+
+    def _get(self, query=""):
+        r = self.client.get("/api/sessions/export" + query)
+        self.assertEqual(r.status_code, 200)
+        return r, b"".join(r.streaming_content).decode("utf-8")
+
+    def test_ndjson_one_row_per_session(self):
+        from .utils.export import EXPORT_FIELDS
+
+        r, body = self._get()
+        self.assertEqual(r["Content-Type"], "application/x-ndjson")
+        self.assertIn('filename="sessions.ndjson"', r["Content-Disposition"])
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row["session_uuid"] for row in rows], [str(self.done.uuid), str(self.fresh.uuid)])
+        self.assertEqual(set(rows[0]), set(EXPORT_FIELDS))
+        self.assertEqual((rows[0]["original_bytes"], rows[0]["final_url"], rows[0]["ai_url"]),
+                         (1234, "https://cdn.example.com/f.png", None))
+        self.assertEqual((rows[0]["ai_job_status"], rows[0]["ai_job_count"]), ("SUCCEEDED", 2))
+        self.assertEqual((rows[1]["ai_job_status"], rows[1]["ai_job_count"]), (None, 0))
+
+    def test_csv_with_filters(self):
+        import csv
+        from .utils.export import EXPORT_FIELDS
+
+        r, body = self._get("?export_format=csv&status=FINALIZED&style=cartoon")
+        self.assertEqual(r["Content-Type"], "text/csv; charset=utf-8")
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], list(EXPORT_FIELDS))
+        self.assertEqual([row[0] for row in rows[1:]], [str(self.done.uuid)])
+
+    def test_admin_only_and_validates_params(self):
+        from django.contrib.auth.models import User
+
+        self.assertIn(APIClient().get("/api/sessions/export").status_code, (401, 403))
+        user = APIClient()
+        user.force_authenticate(User.objects.create_user("booth"))
+        self.assertEqual(user.get("/api/sessions/export").status_code, 403)
+        self.assertEqual(self.client.get("/api/sessions/export?export_format=xml").status_code, 400)
+        self.assertEqual(self.client.get("/api/sessions/export?status=NOPE").status_code, 400)
+
+    def test_management_command_filters_and_counts_rows(self):
+        from django.core.management.base import CommandError
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out.csv")
+            err = io.StringIO()
+            call_command("export_sessions", "--format", "csv", "--status", "FINALIZED", "-o", path, stderr=err)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(len(f.read().splitlines()), 2)
+            self.assertIn("exported 1 sessions", err.getvalue())
+
+            path = os.path.join(tmp, "out.ndjson")
+            err = io.StringIO()
+            call_command("export_sessions", "--chunk-size", "1", "-o", path, stderr=err)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(len(f.read().splitlines()), 2)
+            self.assertIn("exported 2 sessions", err.getvalue())
+
+            err = io.StringIO()
+            call_command("export_sessions", "--style", "nope", "-o", path, stderr=err)
+            self.assertIn("exported 0 sessions", err.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("export_sessions", "--status", "NOPE")
+
+
+@override_settings(**BASE_SETTINGS, REDIRECT_CACHE_TTL=3600, REDIRECT_NEGATIVE_TTL=5, REDIRECT_LOCAL_TTL=60,
+                   REDIRECT_MAX_AGE=300)
+class RedirectCacheTests(FakeRedisMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        from .utils import redirect_cache
+
+        self.cache = redirect_cache
+        self.now = 1000.0
+        # 프로세스 로컬 캐시를 테스트마다 새로 만들고 시계를 직접 돌린다
+        patcher = mock.patch.object(redirect_cache, "time", SimpleNamespace(monotonic=lambda: self.now))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        redirect_cache._local = None
+        self.addCleanup(setattr, redirect_cache, "_local", None)
+        self.qr = QRCode.objects.create(slug="ready1", status=QRCode.Status.READY, target_url="https://cdn.example.com/a.png")
+
+    def test_local_hit_then_redis_then_db(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.cache.resolve_target("ready1"), (True, "https://cdn.example.com/a.png"))
+        self.assertEqual(self.redis.get("redirect:slug:ready1"), "https://cdn.example.com/a.png")
+        self.assertTrue(3500 < self.redis.ttl("redirect:slug:ready1") <= 3600)
+
+        # L1: Redis도 DB도 안 본다
+        with self.assertNumQueries(0), mock.patch.object(self.cache, "_redis", side_effect=AssertionError):
+            self.assertEqual(self.cache.resolve_target("ready1"), (True, "https://cdn.example.com/a.png"))
+
+        # 다른 프로세스(빈 L1)는 Redis에서 읽고 L1을 채운다
+        self.cache._local = None
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cache.resolve_target("ready1"), (True, "https://cdn.example.com/a.png"))
+        self.assertIn("ready1", self.cache._get_local())
+
+        # L1 항목은 REDIRECT_LOCAL_TTL 뒤에 만료되고 다시 Redis에서 읽는다
+        self.now += 61
+        self.assertNotIn("ready1", self.cache._get_local())
+
+    def test_unknown_and_not_ready_slugs_are_cached_briefly(self):
+        QRCode.objects.create(slug="pending1")
+        with self.assertNumQueries(2):
+            self.assertEqual(self.cache.resolve_target("nope"), (False, None))
+            self.assertEqual(self.cache.resolve_target("pending1"), (True, None))
+        for slug in ("nope", "pending1"):
+            self.assertTrue(0 < self.redis.ttl(f"redirect:slug:{slug}") <= 5)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cache.resolve_target("nope"), (False, None))
+
+        # 짧은 TTL이 지나면 새로 만든 QR이 바로 보인다
+        QRCode.objects.create(slug="nope", target_url="https://cdn.example.com/late.png")
+        self.now += 6
+        self.redis.delete("redirect:slug:nope")
+        self.assertEqual(self.cache.resolve_target("nope"), (True, "https://cdn.example.com/late.png"))
+
+    def test_target_change_invalidates_both_tiers(self):
+        self.cache.resolve_target("ready1")
+        # target_url을 건드리지 않는 저장은 캐시를 그대로 둔다
+        with self.captureOnCommitCallbacks(execute=True):
+            self.qr.status = QRCode.Status.READY
+            self.qr.save(update_fields=["status"])
+        self.assertIsNotNone(self.redis.get("redirect:slug:ready1"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.qr.target_url = "https://cdn.example.com/b.png"
+            self.qr.save()
+        self.assertIsNone(self.redis.get("redirect:slug:ready1"))
+        self.assertNotIn("ready1", self.cache._get_local())
+        self.assertEqual(self.cache.resolve_target("ready1"), (True, "https://cdn.example.com/b.png"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.qr.delete()
+        self.assertEqual(self.cache.resolve_target("ready1"), (False, None))
+
+    def test_redirect_view_sets_cache_control(self):
+        QRCode.objects.create(slug="pending1")
+        r = self.client.head("/s/ready1")
+        self.assertEqual(r.status_code, 302)
+        self.assertEqual(r["Location"], "https://cdn.example.com/a.png")
+        self.assertEqual(r["Cache-Control"], "public, max-age=300")
+        for slug in ("pending1", "nope"):
+            r = self.client.get(f"/s/{slug}")
+            self.assertEqual(r.status_code, 404)
+            self.assertEqual(r["Cache-Control"], "public, max-age=5")
+        self.assertEqual(self.client.post("/s/ready1").status_code, 405)
+
+
+@override_settings(**BASE_SETTINGS, PUBLIC_BASE_URL="https://booth.example.com")
+class QRImageViewTests(FakeRedisMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        from .utils import qr_images, redirect_cache
+
+        for module, attr in ((redirect_cache, "_local"), (qr_images, "_memory")):
+            setattr(module, attr, None)
+            self.addCleanup(setattr, module, attr, None)
+        QRCode.objects.create(slug="abc123XYZ")
+
+    def test_png_and_svg(self):
+        r = self.client.get("/api/qr/abc123XYZ.png")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["Content-Type"], "image/png")
+        self.assertTrue(r.content.startswith(b"\x89PNG"))
+        self.assertIn("immutable", r["Cache-Control"])
+
+        r = self.client.get("/api/qr/abc123XYZ.svg")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["Content-Type"], "image/svg+xml")
+        self.assertIn(b"<svg", r.content)
+        self.assertNotEqual(r["ETag"], self.client.get("/api/qr/abc123XYZ.png")["ETag"])
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self.client.get("/api/qr/abc123XYZ.png")["ETag"]
+        r = self.client.get("/api/qr/abc123XYZ.png", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 304)
+        self.assertEqual(r["ETag"], etag)
+        self.assertEqual(r.content, b"")
+        self.assertEqual(self.client.get("/api/qr/abc123XYZ.png", HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_unknown_slug_is_404_even_with_its_etag(self):
+        from .utils.qr_images import qr_image_etag
+
+        r = self.client.get("/api/qr/missing99.png", HTTP_IF_NONE_MATCH=qr_image_etag("missing99", "png"))
+        self.assertEqual(r.status_code, 404)
+        self.assertEqual(self.client.get("/api/qr/missing99.svg").status_code, 404)
+
+
+@override_settings(**BASE_SETTINGS)
+class SessionSnapshotSignalTests(FakeRedisMixin, TestCase):
+    def test_snapshot_refreshed_once_per_transaction(self):
+        style = Style.objects.create(code="s", name="S", prompt="p")
+        qr = QRCode.objects.create(slug="snap")
+        with mock.patch("image.utils.session_snapshot.refresh_snapshot") as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                session = Session.objects.create(style=style, qr=qr)
+                session.status = Session.Status.UPLOADED
+                session.save(update_fields=["status", "updated_at"])
+                qr.status = QRCode.Status.READY
+                qr.save()
+                session.save()
+            refresh.assert_called_once_with(str(session.uuid))
+
+            # 롤백된 저장은 다음 트랜잭션으로 새지 않는다
+            with self.captureOnCommitCallbacks(execute=True):
+                other = Session.objects.create(style=style)
+            refresh.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        other.save()
+                        raise RuntimeError("rollback")
+                except RuntimeError:
+                    pass
+                session.save()
+            refresh.assert_called_once_with(str(session.uuid))
+
+    def test_deleted_session_drops_snapshot(self):
+        style = Style.objects.create(code="s", name="S", prompt="p")
+        with self.captureOnCommitCallbacks(execute=True):
+            session = Session.objects.create(style=style)
+        key = f"session:{session.uuid}:snapshot"
+        self.assertTrue(self.redis.exists(key))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            session.delete()
+        self.assertFalse(self.redis.exists(key))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Session.objects.create(style=style)
+        with mock.patch("image.utils.session_snapshot.get_redis_client", side_effect=redis.ConnectionError("down")), \
+                self.assertLogs("image.utils.session_snapshot", "WARNING"):
+            with self.captureOnCommitCallbacks(execute=True):
+                other.delete()
+
+
+@override_settings(**BASE_SETTINGS, PUBLIC_BASE_URL="https://photo.example.com")
+class QRBatchRenderTests(SimpleTestCase):
+    def test_short_url_after_long_one_keeps_its_own_size(self):
+        from .utils.qr import make_qr_png, make_qr_pngs
+        short = "https://photo.example.com/s/abcdefghi"
+        long = short + "?" + "utm_campaign=booth&" * 8
+
+        pngs = make_qr_pngs([long, short, short])
+        self.assertEqual(pngs[1], make_qr_png(short))
+        self.assertEqual(pngs[1], pngs[2])
+        with Image.open(io.BytesIO(pngs[1])) as img:
+            self.assertEqual(img.size, (264, 264))
+
+    def test_bench_command_runs(self):
+        out = io.StringIO()
+        call_command("bench_qr", count=12, repeat=1, long_every=3, stdout=out)
+        self.assertIn("identical output: yes", out.getvalue())
+
+
+@override_settings(**BASE_SETTINGS)
+class StyleListCacheTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_back_to_back_bumps_get_distinct_versions(self):
+        from .utils import style_cache
+
+        with mock.patch("image.utils.style_cache.time.time", return_value=1_700_000_000.0):
+            first = style_cache.get_style_list()
+            self.assertEqual(first.last_modified, 1_700_000_000.0)
+            v1 = style_cache.bump_version()
+            v2 = style_cache.bump_version()
+        self.assertEqual(v2, v1 + 1)
+        self.assertGreater(v1, first.version)
+
+        with mock.patch("image.utils.style_cache.time.time", return_value=1_700_000_123.0):
+            Style.objects.create(code="new", name="New", prompt="p")
+            style_cache.bump_version()
+        current = style_cache.get_style_list()
+        self.assertNotEqual(current.etag, first.etag)
+        self.assertEqual(current.last_modified, 1_700_000_123.0)
+        self.assertEqual([s["code"] for s in current.data], ["new"])
+
+
+class ChunkedUploadMetaTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(CHUNKED_UPLOAD_DIR=tmp.name, CHUNKED_UPLOAD_TTL=3600)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_complete_after_expiry_does_not_write_broken_meta(self):
+        from .utils import chunked_upload
+
+        upload = chunked_upload.create_upload("s", "photo.jpg", "image/jpeg", 10)
+        with mock.patch("image.utils.chunked_upload.time.time", return_value=upload["created_at"] + 7200):
+            chunked_upload.mark_completed(upload["upload_id"], {"original_image_url": "x"})
+        part_path, meta_path = chunked_upload._paths(upload["upload_id"])
+        self.assertFalse(os.path.exists(part_path))
+        with open(meta_path) as f:
+            self.assertIn("created_at", json.load(f))
+
+    def test_meta_without_created_at_reads_as_expired(self):
+        from .utils import chunked_upload
+
+        upload_id = "0" * 32
+        chunked_upload._write_meta(upload_id, {"result": {"original_image_url": "x"}})
+        self.assertIsNone(chunked_upload.get_upload(upload_id))
+
+
+@override_settings(**GCS_SETTINGS, CHUNKED_UPLOAD_TTL=3600, CHUNKED_UPLOAD_MAX_CHUNK=4096)
+class ChunkedUploadProtocolTests(FakeRedisMixin, FakeGCSMixin, TestCase):
+    CHUNK = 1000
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(CHUNKED_UPLOAD_DIR=tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        dispatch = mock.patch("image.views.dispatch_ai_job")
+        self.dispatch = dispatch.start()
+        self.addCleanup(dispatch.stop)
+
+        self.client = APIClient()
+        style = Style.objects.create(code="toon", name="Toon", prompt="cartoon")
+        self.session = Session.objects.create(style=style)
+        self.photo = make_jpeg((400, 300), quality=95)
+        self.assertGreater(len(self.photo), 2 * self.CHUNK)
+        r = self.client.post("/api/image/upload/chunked", {
+            "session_uuid": str(self.session.uuid),
+            "filename": "photo.jpg",
+            "content_type": "image/jpeg",
+            "total_size": len(self.photo),
+        }, format="json")
+        self.assertEqual(r.status_code, 201, r.content)
+        self.url = f"/api/image/upload/chunked/{r.data['upload_id']}"
+
+    def _put(self, offset, chunk, checksum=None, **extra):
+        return self.client.put(
+            f"{self.url}?offset={offset}", chunk, content_type="application/octet-stream",
+            HTTP_X_CHUNK_SHA256=hashlib.sha256(chunk).hexdigest() if checksum is None else checksum, **extra,
+        )
+
+    def _send_all(self, start=0):
+        for offset in range(start, len(self.photo), self.CHUNK):
+            r = self._put(offset, self.photo[offset:offset + self.CHUNK])
+            self.assertEqual(r.status_code, 200, r.content)
+
+    def _complete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f"{self.url}/complete")
+
+    def test_offset_mismatch_returns_server_offset(self):
+        self.assertEqual(self._put(0, self.photo[:self.CHUNK]).data["offset"], self.CHUNK)
+        # 응답을 못 받은 클라이언트가 같은 청크를 다시 보내거나 건너뛰면 409와 현재 위치
+        for offset in (0, 2 * self.CHUNK):
+            r = self._put(offset, self.photo[offset:offset + self.CHUNK])
+            self.assertEqual(r.status_code, 409)
+            self.assertEqual(r.data["offset"], self.CHUNK)
+        self.assertEqual(self.client.get(self.url).data["offset"], self.CHUNK)
+
+    def test_checksum_mismatch_keeps_offset(self):
+        r = self._put(0, self.photo[:self.CHUNK], checksum="0" * 64)
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.data["offset"], 0)
+        self.assertEqual(self.client.get(self.url).data["offset"], 0)
+        self.assertEqual(self._put(0, self.photo[:self.CHUNK], checksum="").status_code, 400)
+
+    def test_truncated_final_chunk_is_discarded(self):
+        last = (len(self.photo) - 1) // self.CHUNK * self.CHUNK
+        for offset in range(0, last, self.CHUNK):
+            self._put(offset, self.photo[offset:offset + self.CHUNK])
+        # 마지막 청크 본문이 Content-Length보다 짧게 끊긴 경우
+        chunk = self.photo[last:]
+        r = self._put(last, chunk, CONTENT_LENGTH=str(len(chunk)), **{"wsgi.input": io.BytesIO(chunk[:-10])})
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.data["offset"], last)
+        self.assertEqual(self.client.get(self.url).data["offset"], last)
+        r = self._complete()
+        self.assertEqual(r.status_code, 409)
+        self.assertEqual(r.data["offset"], last)
+
+        # 같은 청크만 다시 보내면 된다
+        self.assertEqual(self._put(last, chunk).status_code, 200)
+        self.assertEqual(self._complete().status_code, 201)
+
+    def test_complete_is_idempotent(self):
+        self._send_all()
+        first = self._complete()
+        second = self._complete()
+        self.assertEqual(first.status_code, 201, first.content)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(ImageAsset.objects.filter(session=self.session, kind=ImageAsset.Kind.ORIGINAL).count(), 1)
+        self.dispatch.assert_called_once()
+        status_after = self.client.get(self.url).data
+        self.assertTrue(status_after["completed"])
+        self.assertEqual(status_after["offset"], len(self.photo))
+        self.assertEqual(self._put(0, self.photo[:self.CHUNK]).status_code, 409)
+
+    def test_expired_upload_is_rejected(self):
+        self._put(0, self.photo[:self.CHUNK])
+        with override_settings(CHUNKED_UPLOAD_TTL=-1):
+            self.assertEqual(self.client.get(self.url).status_code, 404)
+            self.assertEqual(self._put(self.CHUNK, self.photo[self.CHUNK:2 * self.CHUNK]).status_code, 404)
+            self.assertEqual(self._complete().status_code, 404)
+        self.assertEqual(self.client.get("/api/image/upload/chunked/not-an-id").status_code, 404)
+
+
+class ImageProbeTests(SimpleTestCase):
+    def probe(self, data, **kwargs):
+        from .utils.images import probe_image
+        return probe_image(io.BytesIO(data), **kwargs)
+
+    def test_mpo_is_stored_as_jpeg(self):
+        buf = io.BytesIO()
+        first, second = Image.new("RGB", (64, 48), "red"), Image.new("RGB", (64, 48), "blue")
+        first.save(buf, format="MPO", save_all=True, append_images=[second])
+        probe = self.probe(buf.getvalue())
+        self.assertEqual((probe.format, probe.mime), ("MPO", "image/jpeg"))
+
+    def test_only_allowed_formats(self):
+        buf = io.BytesIO()
+        Image.new("RGB", (8, 8)).save(buf, format="GIF")
+        with self.assertRaisesMessage(ValueError, "Unsupported image format: GIF"):
+            self.probe(buf.getvalue())
+
+    def test_truncated_files_are_rejected(self):
+        for data in (make_jpeg(), make_png()):
+            self.assertEqual(self.probe(data).width, 64)
+            with self.assertRaisesMessage(ValueError, "Truncated image"):
+                self.probe(data[:-8])
+            # 헤더만 볼 때는 잘림을 따지지 않는다 (커밋 경로는 꼬리를 따로 확인)
+            self.assertEqual(self.probe(data[:-8], complete=False).width, 64)
+
+        webp = io.BytesIO()
+        Image.new("RGB", (64, 48), "green").save(webp, format="WEBP")
+        self.assertEqual(self.probe(webp.getvalue()).mime, "image/webp")
+        with self.assertRaises(ValueError):
+            self.probe(webp.getvalue()[:-8])
+
+    def test_zero_padding_after_end_marker_is_accepted(self):
+        self.assertEqual(self.probe(make_jpeg() + b"\0" * 32).mime, "image/jpeg")
+
+    def test_bench_command_runs(self):
+        out = io.StringIO()
+        call_command("bench_probe", width=320, height=240, repeat=1, stdout=out)
+        self.assertIn("probe_image", out.getvalue())
@@ -1,17 +1,33 @@
-from django.urls import path
+from django.conf import settings
+from django.urls import path, re_path
 from .views import (
     SessionCreateView, ImageUploadView, FinalizeView,
     SessionDetailView, QRStatusView, StyleListView,
-    SessionEventsView, SessionListView
+    SessionEventsView, SessionListView,
+    ImageUploadURLView, ImageUploadCommitView, FinalizeCommitView,
+    session_events_async, AIUtilizationView, qr_image, SessionExportView,
+    SessionBulkCreateView, ChunkedUploadInitView, ChunkedUploadView, ChunkedUploadCompleteView
 )
 
 urlpatterns = [
     path("session/create", SessionCreateView.as_view()),
+    path("session/bulk-create", SessionBulkCreateView.as_view()),
     path("sessions", SessionListView.as_view()),
+    path("sessions/export", SessionExportView.as_view()),
     path("session/<uuid:session_uuid>", SessionDetailView.as_view()),
-    path("session/<uuid:session_uuid>/events", SessionEventsView.as_view()),
+    # ASGI(uvicorn)로 띄우면 async 버전, WSGI(gunicorn sync)면 기존 뷰
+    path("session/<uuid:session_uuid>/events", session_events_async if settings.SSE_ASYNC else SessionEventsView.as_view()),
+    # QR 이미지 직접 렌더링 (QR_IMAGE_MODE=endpoint), 상태 조회보다 먼저 매칭
+    re_path(r"^qr/(?P<slug>[-a-zA-Z0-9_]+)\.(?P<fmt>png|svg)$", qr_image),
     path("qr/<slug:slug>", QRStatusView.as_view()),
     path("image/upload", ImageUploadView.as_view()),
+    path("image/upload/chunked", ChunkedUploadInitView.as_view()),
+    path("image/upload/chunked/<str:upload_id>", ChunkedUploadView.as_view()),
+    path("image/upload/chunked/<str:upload_id>/complete", ChunkedUploadCompleteView.as_view()),
     path("image/finalize", FinalizeView.as_view()),
+    path("image/upload-url", ImageUploadURLView.as_view()),
+    path("image/upload/commit", ImageUploadCommitView.as_view()),
+    path("image/finalize/commit", FinalizeCommitView.as_view()),
     path("styles", StyleListView.as_view()),
+    path("ai/utilization", AIUtilizationView.as_view()),
 ]
@@ -0,0 +1,174 @@
+"""Resumable chunked uploads for booths on flaky networks.
+
+Protocol (see ChunkedUpload* views):
+
+1. ``POST   /api/image/upload/chunked``                → upload_id, chunk_size
+2. ``PUT    /api/image/upload/chunked/<id>?offset=N``  raw bytes + X-Chunk-SHA256
+3. ``GET    /api/image/upload/chunked/<id>``           → current offset (resume point)
+4. ``POST   /api/image/upload/chunked/<id>/complete``  → same result as ImageUploadView
+
+Chunks are appended to a spool file in CHUNKED_UPLOAD_DIR; the file size is
+the resume offset, so a chunk that was cut off or fails its checksum is
+truncated away and only that chunk is resent. The spool is host-local, so
+run the web tier with sticky routing or a shared volume for this directory.
+"""
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from typing import Dict, Optional
+
+from django.conf import settings
+
+_READ_BLOCK = 64 * 1024
+
+
+class ChunkError(Exception):
+    """A chunk was rejected; ``status_code`` says how and ``offset`` where to resume."""
+
+    def __init__(self, message: str, status_code: int, offset: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
+
+
+def _paths(upload_id: str):
+    base = os.path.join(settings.CHUNKED_UPLOAD_DIR, upload_id)
+    return f"{base}.part", f"{base}.json"
+
+
+def _write_meta(upload_id: str, meta: Dict) -> None:
+    _, meta_path = _paths(upload_id)
+    tmp_path = f"{meta_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def _sweep_expired() -> None:
+    # 별도 정리 작업 없이, 새 업로드를 시작할 때 만료된 스풀 파일을 치운다
+    cutoff = time.time() - settings.CHUNKED_UPLOAD_TTL
+    with contextlib.suppress(FileNotFoundError):
+        for entry in os.scandir(settings.CHUNKED_UPLOAD_DIR):
+            with contextlib.suppress(OSError):
+                if entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+
+
+def create_upload(session_uuid: str, filename: str, content_type: str, total_size: int) -> Dict:
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    _sweep_expired()
+    upload_id = uuid.uuid4().hex
+    meta = {
+        "upload_id": upload_id,
+        "session_uuid": session_uuid,
+        "filename": filename,
+        "content_type": content_type,
+        "total_size": total_size,
+        "created_at": time.time(),
+        "result": None,
+    }
+    part_path, _ = _paths(upload_id)
+    open(part_path, "wb").close()
+    _write_meta(upload_id, meta)
+    return meta
+
+
+def get_upload(upload_id: str) -> Optional[Dict]:
+    """Return the upload's metadata plus its current ``offset``, or None if unknown/expired."""
+    if not re.fullmatch(r"[0-9a-f]{32}", upload_id):
+        return None
+    part_path, meta_path = _paths(upload_id)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # created_at이 없는 메타는 만료된 것으로 본다
+    if time.time() - meta.get("created_at", 0) > settings.CHUNKED_UPLOAD_TTL:
+        return None
+    try:
+        meta["offset"] = os.path.getsize(part_path)
+    except FileNotFoundError:
+        # complete 이후에는 스풀 파일이 없고 결과만 남는다
+        meta["offset"] = meta["total_size"] if meta.get("result") else 0
+    return meta
+
+
+def append_chunk(upload_id: str, offset: int, stream, length: int, sha256_hex: str) -> int:
+    """Append one chunk at ``offset`` after checking it against its SHA-256. Returns the new offset."""
+    meta = get_upload(upload_id)
+    if meta is None:
+        raise ChunkError("Upload not found or expired", 404)
+    if meta.get("result"):
+        raise ChunkError("Upload already completed", 409, meta["total_size"])
+    if length <= 0 or length > settings.CHUNKED_UPLOAD_MAX_CHUNK:
+        raise ChunkError(f"Chunk must be 1..{settings.CHUNKED_UPLOAD_MAX_CHUNK} bytes", 400, meta["offset"])
+    if offset + length > meta["total_size"]:
+        raise ChunkError("Chunk runs past total_size", 400, meta["offset"])
+
+    part_path, _ = _paths(upload_id)
+    with open(part_path, "r+b") as f:
+        # 같은 업로드에 동시에 들어온 재전송끼리 겹치지 않도록 잠근다
+        fcntl.flock(f, fcntl.LOCK_EX)
+        current = os.fstat(f.fileno()).st_size
+        if offset != current:
+            raise ChunkError("Offset mismatch", 409, current)
+
+        f.seek(offset)
+        digest = hashlib.sha256()
+        remaining = length
+        try:
+            while remaining > 0:
+                block = stream.read(min(_READ_BLOCK, remaining))
+                if not block:
+                    break
+                digest.update(block)
+                f.write(block)
+                remaining -= len(block)
+            if remaining or digest.hexdigest() != sha256_hex.lower():
+                raise ChunkError("Chunk incomplete or checksum mismatch", 400, offset)
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            # 잘린/손상된 청크는 버리고 직전 오프셋에서 이어받는다
+            f.truncate(offset)
+            raise
+        return offset + length
+
+
+@contextlib.contextmanager
+def open_assembled(upload_id: str):
+    """Open the assembled spool file, locked against concurrent chunks and completes.
+
+    Yields None when another request already completed the upload.
+    """
+    part_path, _ = _paths(upload_id)
+    try:
+        f = open(part_path, "rb")
+    except FileNotFoundError:
+        yield None
+        return
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        meta = get_upload(upload_id)
+        yield None if meta is None or meta.get("result") else f
+
+
+def mark_completed(upload_id: str, result: Dict) -> None:
+    """Remember the commit result (so a retried complete is idempotent) and drop the data.
+
+    If the upload expired meanwhile only the data is dropped; a retry then gets 404.
+    """
+    meta = get_upload(upload_id)
+    if meta is not None:
+        meta.pop("offset", None)
+        meta["result"] = result
+        _write_meta(upload_id, meta)
+    part_path, _ = _paths(upload_id)
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(part_path)
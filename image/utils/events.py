@@ -1,62 +1,190 @@
 import json
+import re
 import time
 import contextlib
-from typing import Generator, Optional
+from typing import Generator, Iterable, List, Optional, Tuple
 from django.conf import settings
 import redis
+from .redis_pool import get_redis_client
 
 
 def _get_redis_client() -> redis.Redis:
-    """Return a Redis client using REDIS_URL or fall back to CELERY_BROKER_URL."""
-    url = getattr(settings, "REDIS_URL", None) or getattr(settings, "CELERY_BROKER_URL", "redis://localhost:6379/0")
-    # decode_responses=True -> pubsub payloads are str instead of bytes
-    return redis.Redis.from_url(url, decode_responses=True)
+    """Return a pooled Redis client (decode_responses=True -> pubsub payloads are str)."""
+    return get_redis_client(decode_responses=True)
 
 
 def _session_channel(session_uuid: str) -> str:
     return f"session:{session_uuid}"
 
 
-def publish_session_event(session_uuid: str, event: str, data: dict) -> None:
-    """Publish a JSON payload to the session channel.
+def session_log_key(session_uuid: str) -> str:
+    return f"session:{session_uuid}:log"
 
-    Payload schema: {"event": str, "data": object}
+
+# XADD to the capped per-session log, refresh its TTL and PUBLISH the payload
+# with the stream id prepended, atomically and in one round trip.
+# The log is small, so MAXLEN trims exactly ('~' only drops whole nodes of
+# ~100 entries and would let the log grow to twice the cap).
+# KEYS[1]=log key, ARGV=[maxlen, ttl, payload json, channel]
+_PUBLISH_LUA = """
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', ARGV[1], '*', 'payload', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('PUBLISH', ARGV[4], '{"id":"' .. id .. '",' .. string.sub(ARGV[3], 2))
+return id
+"""
+_publish_script = None
+
+_EVENT_ID_RE = re.compile(r"^\d+-\d+$")
+
+
+def _get_publish_script(client: redis.Redis):
+    global _publish_script
+    if _publish_script is None:
+        _publish_script = client.register_script(_PUBLISH_LUA)
+    return _publish_script
+
+
+def _encode_event(event: str, data: dict) -> str:
+    return json.dumps({"event": event, "data": data}, ensure_ascii=False)
+
+
+def _publish_args(session_uuid: str, event: str, data: dict):
+    return (
+        [session_log_key(session_uuid)],
+        [settings.SESSION_EVENT_LOG_MAXLEN, settings.SESSION_EVENT_LOG_TTL,
+         _encode_event(event, data), _session_channel(session_uuid)],
+    )
+
+
+def publish_session_event(session_uuid: str, event: str, data: dict) -> str:
+    """Append an event to the session log and publish it to live subscribers.
+
+    Payload schema: {"event": str, "data": object}. Returns the stream id,
+    which clients see as the SSE ``id:`` and send back as Last-Event-ID.
     """
-    payload = json.dumps({"event": event, "data": data}, ensure_ascii=False)
-    _get_redis_client().publish(_session_channel(session_uuid), payload)
+    client = _get_redis_client()
+    keys, args = _publish_args(session_uuid, event, data)
+    return _get_publish_script(client)(keys=keys, args=args, client=client)
+
+
+def publish_session_events(session_uuid: str, events: Iterable[Tuple[str, dict]]) -> List[str]:
+    """Publish several events for one session in a single round trip (pipelined, in order).
+
+    EVALSHA is queued directly: a Script called on a pipeline sends
+    SCRIPT EXISTS ahead of every batch, which is a second round trip.
+    """
+    client = _get_redis_client()
+    sha = _get_publish_script(client).sha
+    calls = [_publish_args(session_uuid, event, data) for event, data in events]
+
+    def send() -> List[str]:
+        with client.pipeline(transaction=False) as pipe:
+            for keys, args in calls:
+                pipe.evalsha(sha, len(keys), *keys, *args)
+            return pipe.execute()
+
+    try:
+        return send()
+    except redis.exceptions.NoScriptError:
+        # 스크립트 캐시가 비었으면(재시작/SCRIPT FLUSH) 배치 전체가 실행되지 않았다: 올리고 다시 보낸다
+        client.script_load(_PUBLISH_LUA)
+        return send()
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[str]:
+    """Return a valid stream id from a Last-Event-ID header/query value, else None."""
+    value = (value or "").strip()
+    return value if _EVENT_ID_RE.match(value) else None
+
 
+def _event_id_key(event_id: str) -> Tuple[int, int]:
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq or 0)
 
-def stream_session_events(session_uuid: str, keepalive_seconds: int = 15) -> Generator[str, None, None]:
+
+def log_entries_to_payloads(entries) -> List[str]:
+    """XRANGE entries -> payload strings in the same shape as live pubsub messages."""
+    payloads = []
+    for entry_id, fields in entries:
+        raw = fields.get("payload") or "{}"
+        payloads.append('{"id":"' + entry_id + '",' + raw[1:])
+    return payloads
+
+
+def read_session_backlog(client: redis.Redis, session_uuid: str, last_event_id: Optional[str]) -> List[str]:
+    """Events a (re)connecting client has not seen yet.
+
+    With a Last-Event-ID everything after it is replayed; a late joiner without
+    one gets only the latest event, i.e. the current state of the session.
+    """
+    key = session_log_key(session_uuid)
+    if last_event_id:
+        entries = client.xrange(key, min=f"({last_event_id}", max="+")
+    else:
+        entries = list(reversed(client.xrevrange(key, max="+", min="-", count=1)))
+    return log_entries_to_payloads(entries)
+
+
+def payload_event_id(raw: Optional[str]) -> Optional[str]:
+    try:
+        event_id = json.loads(raw or "{}").get("id")
+    except (json.JSONDecodeError, AttributeError):
+        return None
+    return event_id if isinstance(event_id, str) and _EVENT_ID_RE.match(event_id) else None
+
+
+def is_newer_event(raw: Optional[str], last_event_id: Optional[str]) -> bool:
+    """False for live messages already delivered through the backlog replay."""
+    if not last_event_id:
+        return True
+    event_id = payload_event_id(raw)
+    return event_id is None or _event_id_key(event_id) > _event_id_key(last_event_id)
+
+
+def format_sse_message(raw: Optional[str]) -> str:
+    """Turn a published payload into one complete SSE frame."""
+    try:
+        payload = json.loads(raw or "{}")
+    except json.JSONDecodeError:
+        payload = {"event": "unknown", "data": {"raw": raw}}
+
+    event_type = payload.get("event") or "message"
+    data_obj = payload.get("data") if isinstance(payload.get("data"), (dict, list, str, int, float, bool, type(None))) else {}
+    data_str = json.dumps(data_obj, ensure_ascii=False)
+    event_id = payload.get("id")
+    id_line = f"id: {event_id}\n" if isinstance(event_id, str) and _EVENT_ID_RE.match(event_id) else ""
+    return f"{id_line}event: {event_type}\ndata: {data_str}\n\n"
+
+
+def stream_session_events(session_uuid: str, keepalive_seconds: int = 15, last_event_id: Optional[str] = None) -> Generator[str, None, None]:
     """SSE generator that subscribes to a session channel and yields events.
 
-    Yields Server-Sent Events formatted messages. Sends periodic keepalive comments.
+    Missed events are replayed from the session log first (see
+    read_session_backlog), then live events follow. Sends periodic keepalive comments.
     """
     client = _get_redis_client()
     pubsub = client.pubsub()
     channel = _session_channel(session_uuid)
+    # Subscribe before reading the backlog so nothing falls in between
     pubsub.subscribe(channel)
 
     last_ping = time.monotonic()
     try:
         # Initial retry hint for proxies
         yield "retry: 3000\n\n"
+        for raw in read_session_backlog(client, session_uuid, last_event_id):
+            last_event_id = payload_event_id(raw) or last_event_id
+            yield format_sse_message(raw)
+
         while True:
             message: Optional[dict] = pubsub.get_message(timeout=1.0)
             now = time.monotonic()
 
             if message and message.get("type") == "message":
-                try:
-                    payload = json.loads(message.get("data") or "{}")
-                except json.JSONDecodeError:
-                    payload = {"event": "unknown", "data": {"raw": message.get("data")}}
-
-                event_type = payload.get("event") or "message"
-                data_obj = payload.get("data") if isinstance(payload.get("data"), (dict, list, str, int, float, bool, type(None))) else {}
-                data_str = json.dumps(data_obj, ensure_ascii=False)
-
-                yield f"event: {event_type}\n"
-                yield f"data: {data_str}\n\n"
-                last_ping = now
+                raw = message.get("data")
+                if is_newer_event(raw, last_event_id):
+                    yield format_sse_message(raw)
+                    last_ping = now
 
             # keepalive
             if now - last_ping >= keepalive_seconds:
@@ -67,5 +195,3 @@ def stream_session_events(session_uuid: str, keepalive_seconds: int = 15) -> Gen
         with contextlib.suppress(Exception):
             pubsub.unsubscribe(channel)
             pubsub.close()
-
-
@@ -0,0 +1,107 @@
+"""Streaming export of sessions with their images and AI job status.
+
+Rows are produced from a server-side cursor (``.iterator(chunk_size=...)``)
+with images/AI jobs prefetched per chunk, and written out by generators, so
+memory stays flat regardless of how many sessions are exported. Used by
+SessionExportView and ``manage.py export_sessions``.
+"""
+import csv
+import json
+from typing import Dict, Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from ..models import AIJob, ImageAsset, Session
+
+EXPORT_FIELDS = (
+    "session_uuid", "style", "status", "created_at", "updated_at",
+    "qr_slug", "qr_status", "target_url",
+    "original_url", "original_bytes", "ai_url", "ai_bytes", "final_url", "final_bytes",
+    "ai_job_status", "ai_job_count", "ai_job_updated_at",
+)
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def export_queryset(filters: Optional[Dict] = None):
+    filters = filters or {}
+    qs = Session.objects.select_related("style", "qr").prefetch_related(
+        Prefetch("images", queryset=ImageAsset.objects.only(
+            "session_id", "kind", "public_url", "size_bytes", "created_at"
+        )),
+        Prefetch("ai_jobs", queryset=AIJob.objects.only(
+            "session_id", "status", "updated_at"
+        ).order_by("updated_at")),
+    )
+    if filters.get("status"):
+        qs = qs.filter(status__in=filters["status"])
+    if filters.get("style"):
+        qs = qs.filter(style__code=filters["style"])
+    if filters.get("updated_after"):
+        qs = qs.filter(updated_at__gte=filters["updated_after"])
+    if filters.get("updated_before"):
+        qs = qs.filter(updated_at__lt=filters["updated_before"])
+    return qs.order_by("id")
+
+
+def _isoformat(value) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def session_row(session: Session) -> Dict:
+    images = {img.kind: img for img in session.images.all()}
+    jobs = list(session.ai_jobs.all())
+    latest_job = jobs[-1] if jobs else None
+    row = {
+        "session_uuid": str(session.uuid),
+        "style": session.style.code,
+        "status": session.status,
+        "created_at": _isoformat(session.created_at),
+        "updated_at": _isoformat(session.updated_at),
+        "qr_slug": session.qr.slug if session.qr else None,
+        "qr_status": session.qr.status if session.qr else None,
+        "target_url": session.qr.target_url if session.qr else None,
+        "ai_job_status": latest_job.status if latest_job else None,
+        "ai_job_count": len(jobs),
+        "ai_job_updated_at": _isoformat(latest_job.updated_at) if latest_job else None,
+    }
+    for kind, prefix in ((ImageAsset.Kind.ORIGINAL, "original"), (ImageAsset.Kind.AI, "ai"), (ImageAsset.Kind.FINAL, "final")):
+        img = images.get(kind)
+        row[f"{prefix}_url"] = img.public_url if img else None
+        row[f"{prefix}_bytes"] = img.size_bytes if img else None
+    return row
+
+
+def iter_session_rows(filters: Optional[Dict] = None, chunk_size: Optional[int] = None) -> Iterator[Dict]:
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    for session in export_queryset(filters).iterator(chunk_size=chunk_size):
+        yield session_row(session)
+
+
+class _Echo:
+    """csv.writer target that hands each formatted line back instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def render_ndjson(rows: Iterable[Dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+def render_csv(rows: Iterable[Dict]) -> Iterator[str]:
+    writer = csv.DictWriter(_Echo(), fieldnames=EXPORT_FIELDS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def render(rows: Iterable[Dict], fmt: str) -> Iterator[str]:
+    if fmt == "csv":
+        return render_csv(rows)
+    return render_ndjson(rows)
@@ -1,8 +1,40 @@
+import base64
+import hashlib
+import io
 import os
+import threading
+import time
 import uuid
-from typing import Tuple
+from datetime import timedelta
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import quote
 
-def _get_client():
+# 프로세스별 캐시된 클라이언트/버킷 핸들. fork 후 자식에서는 다시 만든다.
+_lock = threading.Lock()
+_pid: Optional[int] = None
+_client = None
+_bucket = None
+_created_at: Optional[float] = None
+_checkouts = 0
+
+
+def _reset_client() -> None:
+    """fork 직후 자식 프로세스에서 부모의 커넥션/락을 버린다."""
+    global _lock, _pid, _client, _bucket, _created_at, _checkouts
+    _lock = threading.Lock()
+    _pid = None
+    _client = None
+    _bucket = None
+    _created_at = None
+    _checkouts = 0
+
+
+if hasattr(os, "register_at_fork"):
+    # gunicorn/Celery prefork 모두 os.fork()를 거치므로 여기서 한 번에 처리
+    os.register_at_fork(after_in_child=_reset_client)
+
+
+def _create_client():
     """Create a GCS client with fork-safe, pure-Python CRC32C/protobuf.
 
     Some native C extensions (crc32c/protobuf) can cause instability when used
@@ -15,33 +47,274 @@ def _get_client():
     os.environ.setdefault("PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION", "python")
 
     # Lazy import to avoid importing C extensions in the parent before fork
+    from django.conf import settings
     from google.cloud import storage  # type: ignore
+    from requests.adapters import HTTPAdapter
+
+    client = storage.Client()  # GOOGLE_APPLICATION_CREDENTIALS 환경변수 사용
+
+    # keep-alive 커넥션 풀 크기 지정 (재시도는 google 라이브러리가 담당)
+    pool_size = settings.GCS_HTTP_POOL_MAXSIZE
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    client._http.mount("https://", adapter)
+    client._http.mount("http://", adapter)  # STORAGE_EMULATOR_HOST
+    return client
+
+
+def _get_client():
+    """현재 프로세스의 GCS 클라이언트를 반환(없거나 fork 이후면 생성)."""
+    global _pid, _client, _bucket, _created_at, _checkouts
+    pid = os.getpid()
+    with _lock:
+        if _client is None or _pid != pid:
+            _client = _create_client()
+            _bucket = None
+            _pid = pid
+            _created_at = time.time()
+            _checkouts = 0
+        # 스레드 간 카운트가 빠지지 않도록 락 안에서 센다
+        _checkouts += 1
+        return _client
+
+
+def _get_bucket():
+    global _bucket
+    client = _get_client()
+    if _bucket is None:
+        _bucket = client.bucket(_bucket_name())
+    return _bucket
 
-    return storage.Client()  # GOOGLE_APPLICATION_CREDENTIALS 환경변수 사용
+
+def pool_stats() -> Dict[str, Any]:
+    """현재 프로세스의 GCS 클라이언트/커넥션 풀 상태."""
+    stats: Dict[str, Any] = {
+        "pid": os.getpid(),
+        "initialized": _client is not None and _pid == os.getpid(),
+        "created_at": _created_at,
+        "checkouts": _checkouts,
+        "pools": [],
+    }
+    if not stats["initialized"]:
+        return stats
+    seen = set()
+    for adapter in _client._http.adapters.values():
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            stats["pools"].append({
+                "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle": pool.pool.qsize() if pool.pool is not None else 0,
+                "maxsize": adapter._pool_maxsize,
+            })
+    return stats
+
+def _bucket_name() -> str:
+    from django.conf import settings
+    return settings.GCS_BUCKET_NAME
+
+def build_public_url(object_name: str) -> str:
+    from django.conf import settings
+    bucket_name = _bucket_name()
+    # Use custom domain if configured, otherwise fall back to default GCS URL
+    prefix = getattr(settings, "GCS_PUBLIC_URL_PREFIX", f"https://storage.googleapis.com/{bucket_name}").rstrip("/")
+    return f"{prefix}/{object_name}"
+
+def build_gcs_path(object_name: str) -> str:
+    return f"gs://{_bucket_name()}/{object_name}"
+
+def object_name_from_gcs_path(gcs_path: str) -> str:
+    """gs://bucket/a/b.png -> a/b.png"""
+    prefix = f"gs://{_bucket_name()}/"
+    if not gcs_path.startswith(prefix):
+        raise ValueError(f"Not an object in bucket {_bucket_name()}: {gcs_path}")
+    return gcs_path[len(prefix):]
 
 def upload_bytes(data: bytes, object_name: str, content_type: str) -> Tuple[str, str]:
     """
     data를 GCS에 업로드.
     return: (gcs_path, public_url)
     """
-    # Local import to avoid touching Django settings at module import time
-    from django.conf import settings
-    bucket_name = settings.GCS_BUCKET_NAME
-    client = _get_client()
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(object_name)
+    blob = _get_bucket().blob(object_name)
     blob.upload_from_string(data, content_type=content_type)
-    
-    # Use custom domain if configured, otherwise fall back to default GCS URL
-    prefix = getattr(settings, "GCS_PUBLIC_URL_PREFIX", f"https://storage.googleapis.com/{bucket_name}").rstrip("/")
-    public_url = f"{prefix}/{object_name}"
-    
-    gcs_path = f"gs://{bucket_name}/{object_name}"
-    return gcs_path, public_url
+
+    return build_gcs_path(object_name), build_public_url(object_name)
+
+class UploadResult(NamedTuple):
+    gcs_path: str
+    public_url: str
+    size: int
+    md5_hash: str   # base64, GCS 메타데이터와 같은 형식
+    crc32c: str     # base64, GCS 메타데이터와 같은 형식
+    sha256: str = ""  # hex, ImageAsset.sha256 용
+    data: Optional[bytes] = None  # keep_data=True일 때 업로드하며 읽은 바이트
+
+
+class _HashingReader:
+    """read() 호출마다 크기/MD5/CRC32C/SHA-256을 누적하는 파일 래퍼.
+
+    업로드 스트림을 한 번만 읽으면서 무결성 값을 함께 계산한다.
+    """
+
+    def __init__(self, fobj, keep_data: bool = False):
+        import google_crc32c  # type: ignore
+        self._fobj = fobj
+        self._chunks = [] if keep_data else None
+        self._md5 = hashlib.md5()
+        self._sha256 = hashlib.sha256()
+        self._crc = google_crc32c.Checksum()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._fobj.read(size)
+        if chunk:
+            self._md5.update(chunk)
+            self._sha256.update(chunk)
+            self._crc.update(chunk)
+            self.size += len(chunk)
+            if self._chunks is not None:
+                self._chunks.append(chunk)
+        return chunk
+
+    def tell(self) -> int:
+        return self.size
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        # resumable 업로드가 현재 위치를 확인하는 용도로만 허용(되감기는 해시를 깨뜨림)
+        if whence == 0 and offset == self.size:
+            return self.size
+        raise io.UnsupportedOperation("_HashingReader is forward-only")
+
+    @property
+    def data(self) -> Optional[bytes]:
+        return b"".join(self._chunks) if self._chunks is not None else None
+
+    @property
+    def md5_b64(self) -> str:
+        return base64.b64encode(self._md5.digest()).decode("ascii")
+
+    @property
+    def sha256_hex(self) -> str:
+        return self._sha256.hexdigest()
+
+    @property
+    def crc32c_b64(self) -> str:
+        return base64.b64encode(self._crc.digest()).decode("ascii")
+
+
+def upload_stream(fobj, object_name: str, content_type: str, size: Optional[int] = None,
+                  keep_data: bool = False) -> UploadResult:
+    """
+    파일 객체를 메모리에 모으지 않고 GCS로 스트리밍 업로드.
+
+    Django의 TemporaryUploadedFile/InMemoryUploadedFile을 그대로 넘기면 되며,
+    GCS_UPLOAD_CHUNK_SIZE 단위 resumable 업로드로 전송하므로 요청당 메모리는
+    청크 크기로 고정된다. 같은 패스에서 크기와 MD5/CRC32C를 계산하고
+    업로드 후 서버가 돌려준 CRC32C와 비교한다.
+    keep_data=True면 읽은 바이트를 모아 결과의 data로 돌려준다 (다시 읽지 않고 재사용할 때).
+    """
+    from django.conf import settings
+    if hasattr(fobj, "seek"):
+        fobj.seek(0)
+
+    streaming = size is None or size > settings.GCS_STREAMING_THRESHOLD
+    bucket = _get_bucket()
+    reader = _HashingReader(fobj, keep_data=keep_data)
+    if streaming:
+        # size를 넘기면 8MB 이하는 multipart(전체를 read)로 가므로 생략하고
+        # chunk_size 단위 resumable 업로드로 보낸다
+        blob = bucket.blob(object_name, chunk_size=settings.GCS_UPLOAD_CHUNK_SIZE)
+        blob.upload_from_file(reader, content_type=content_type, rewind=False)
+    else:
+        blob = bucket.blob(object_name)
+        blob.upload_from_file(reader, size=size, content_type=content_type, rewind=False)
+
+    if blob.crc32c and blob.crc32c != reader.crc32c_b64:
+        raise IOError(f"CRC32C mismatch after upload: {object_name}")
+
+    return UploadResult(
+        gcs_path=build_gcs_path(object_name),
+        public_url=build_public_url(object_name),
+        size=reader.size,
+        md5_hash=reader.md5_b64,
+        crc32c=reader.crc32c_b64,
+        sha256=reader.sha256_hex,
+        data=reader.data,
+    )
+
 
 def upload_fileobj(fobj, object_name: str, content_type: str) -> Tuple[str, str]:
-    data = fobj.read()
-    return upload_bytes(data, object_name, content_type)
+    result = upload_stream(fobj, object_name, content_type, size=getattr(fobj, "size", None))
+    return result.gcs_path, result.public_url
+
+def _is_anonymous(credentials) -> bool:
+    from google.auth.credentials import AnonymousCredentials  # type: ignore
+    return isinstance(credentials, AnonymousCredentials)
+
+def generate_upload_url(object_name: str, content_type: str, max_bytes: int, expires_seconds: int) -> Tuple[str, Dict[str, str]]:
+    """
+    클라이언트가 GCS에 직접 PUT 할 수 있는 V4 서명 URL 발급.
+    return: (upload_url, 업로드 시 반드시 함께 보내야 하는 헤더)
+    """
+    client = _get_client()
+    blob = _get_bucket().blob(object_name)
+    headers = {
+        "Content-Type": content_type,
+        # GCS가 업로드 크기를 서버 측에서 제한
+        "x-goog-content-length-range": f"0,{max_bytes}",
+    }
+
+    credentials = client._credentials
+    emulator_host = os.environ.get("STORAGE_EMULATOR_HOST")
+    if emulator_host or _is_anonymous(credentials):
+        # 에뮬레이터(fake-gcs-server)는 서명 검사를 하지 않고 익명 자격증명으로는 서명할 수 없으므로
+        # 서명 URL과 같은 경로 형식의 무서명 URL을 돌려준다
+        base = (emulator_host or client._connection.API_BASE_URL).rstrip("/")
+        if "://" not in base:
+            base = f"http://{base}"
+        return f"{base}/{_bucket_name()}/{quote(object_name, safe='/')}", headers
+
+    signing_kwargs = {}
+    if not hasattr(credentials, "sign_bytes"):
+        # GCE 메타데이터 자격증명은 private key가 없으므로 IAM signBlob 경유로 서명
+        from google.auth.transport.requests import Request  # type: ignore
+        if not credentials.valid:
+            credentials.refresh(Request())
+        signing_kwargs = {
+            "service_account_email": credentials.service_account_email,
+            "access_token": credentials.token,
+        }
+
+    url = blob.generate_signed_url(
+        version="v4",
+        expiration=timedelta(seconds=expires_seconds),
+        method="PUT",
+        content_type=content_type,
+        headers={"x-goog-content-length-range": headers["x-goog-content-length-range"]},
+        **signing_kwargs,
+    )
+    return url, headers
+
+def get_object_info(object_name: str) -> Optional[Dict[str, Any]]:
+    """업로드된 오브젝트의 메타데이터 조회. 없으면 None."""
+    blob = _get_bucket().get_blob(object_name)
+    if blob is None:
+        return None
+    return {
+        "size": blob.size,
+        "content_type": blob.content_type,
+        "crc32c": blob.crc32c,
+        "md5_hash": blob.md5_hash,
+    }
+
+def download_bytes(object_name: str, start: Optional[int] = None, end: Optional[int] = None) -> bytes:
+    """오브젝트(또는 start~end 바이트 범위)를 다운로드."""
+    blob = _get_bucket().blob(object_name)
+    return blob.download_as_bytes(start=start, end=end)
 
 def build_object_name(prefix: str, filename: str) -> str:
     ext = filename.split(".")[-1].lower() if "." in filename else "bin"
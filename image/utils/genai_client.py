@@ -0,0 +1,89 @@
+"""Per-process google-genai client.
+
+The client (and the HTTP connection pool inside it) is built once per worker
+process, normally from Celery's worker_process_init hook, and reused by every
+job. GOOGLE_GENAI_BASE_URL can point it at a local fake model server.
+"""
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pid = None
+_client = None
+
+
+def _reset_client() -> None:
+    global _lock, _pid, _client
+    _lock = threading.Lock()
+    _pid = None
+    _client = None
+
+
+if hasattr(os, "register_at_fork"):
+    # 부모의 HTTP 커넥션을 자식이 공유하지 않도록 fork 후 버린다
+    os.register_at_fork(after_in_child=_reset_client)
+
+
+def _create_client():
+    from django.conf import settings
+    from google import genai
+    from google.genai import types
+
+    api_key = getattr(settings, "GOOGLE_GENAI_API_KEY", None)
+    if not api_key:
+        raise ValueError("GOOGLE_GENAI_API_KEY not configured")
+
+    http_options = types.HttpOptions(
+        base_url=settings.GOOGLE_GENAI_BASE_URL or None,
+        timeout=settings.GOOGLE_GENAI_TIMEOUT_MS,
+    )
+    return genai.Client(api_key=api_key, http_options=http_options)
+
+
+def get_genai_client():
+    """Return this process's genai client, creating it on first use (or after fork)."""
+    global _pid, _client
+    pid = os.getpid()
+    if _client is None or _pid != pid:
+        with _lock:
+            if _client is None or _pid != pid:
+                _client = _create_client()
+                _pid = pid
+    return _client
+
+
+def warm_up() -> None:
+    """Pre-import heavy modules and pre-load style reference images."""
+    # 사용하지 않는 import가 아니라 의도된 선(先)로딩: 첫 작업이 모듈 로딩 비용을 치르지 않게 한다
+    import PIL.Image  # noqa: F401
+    import PIL.ImageOps  # noqa: F401
+    import requests  # noqa: F401
+    from google.genai import types  # noqa: F401
+
+    from ..models import Style
+    from .style_assets import preload
+
+    urls = (
+        Style.objects.filter(is_active=True)
+        .exclude(reference_image_url="")
+        .values_list("reference_image_url", flat=True)
+    )
+    preload(set(urls))
+
+
+def init_worker() -> None:
+    """worker_process_init hook: build the client and optionally warm up."""
+    from django.conf import settings
+    try:
+        get_genai_client()
+    except Exception:
+        # 설정 누락 등은 첫 작업에서 다시 드러나므로 워커 기동은 막지 않는다
+        logger.exception("genai client init failed; will retry on first job")
+    if settings.AI_WORKER_WARMUP:
+        try:
+            warm_up()
+        except Exception:
+            logger.exception("AI worker warm-up failed")
@@ -0,0 +1,120 @@
+"""업로드 뷰에서 AI 작업으로 원본 사진 바이트를 잠깐 넘겨 둔다 (hand-off).
+
+업로드 요청은 이미 사진을 들고 있으므로 여기에 사본을 두고,
+run_ai_generation_task는 공개 URL에서 다시 내려받는 대신 이것을 가져간다.
+백엔드 (HANDOFF_BACKEND):
+
+- ``redis``: HANDOFF_REDIS_URL에 짧은 TTL로 SETEX (모든 웹/워커 호스트가 공유).
+  브로커/캐시 Redis는 쓰지 않으므로 수 MB짜리 바이트가 태스크 메시지와
+  메모리를 다투지 않는다.
+- ``spool``: HANDOFF_SPOOL_DIR의 파일 (단일 호스트용). 새 파일을 쓸 때마다
+  HANDOFF_TTL보다 오래된 파일을 치운다.
+- ``""``: 사용 안 함, 작업은 항상 스토리지에서 읽는다 (HANDOFF_REDIS_URL이
+  없을 때 기본값)
+"""
+import contextlib
+import logging
+import os
+import tempfile
+import time
+from typing import Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+
+
+def _get_redis():
+    # 브로커와 분리된 전용 Redis (HANDOFF_REDIS_URL). 프로세스당 풀 하나
+    global _pool
+    import redis
+    if _pool is None:
+        if not settings.HANDOFF_REDIS_URL:
+            raise ValueError("HANDOFF_BACKEND=redis requires HANDOFF_REDIS_URL")
+        _pool = redis.ConnectionPool.from_url(
+            settings.HANDOFF_REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            health_check_interval=30,
+        )
+    return redis.Redis(connection_pool=_pool)
+
+
+def _key(session_uuid: str) -> str:
+    return f"handoff:original:{session_uuid}"
+
+
+def _spool_path(session_uuid: str) -> str:
+    return os.path.join(settings.HANDOFF_SPOOL_DIR, f"{session_uuid}.bin")
+
+
+def _sweep_expired() -> None:
+    # 별도 정리 작업 없이, 새 원본을 넘길 때 만료된 스풀 파일(실패/다른 호스트 작업의 잔여물)을 치운다
+    cutoff = time.time() - settings.HANDOFF_TTL
+    with contextlib.suppress(FileNotFoundError):
+        for entry in os.scandir(settings.HANDOFF_SPOOL_DIR):
+            with contextlib.suppress(OSError):
+                if entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+
+
+def accepts(size: Optional[int]) -> bool:
+    """이 크기의 원본을 넘겨둘지. 업로드 전에 물어 보고, 그때만 업로드하며 바이트를 모은다."""
+    return bool(settings.HANDOFF_BACKEND) and size is not None and size <= settings.HANDOFF_MAX_BYTES
+
+
+def stash_original(session_uuid: str, data: bytes) -> bool:
+    """업로드하며 모은 원본 바이트를 AI 작업용으로 넘겨둔다. 건너뛰면 False."""
+    backend = settings.HANDOFF_BACKEND
+    if not accepts(len(data)):
+        return False
+
+    try:
+        if backend == "redis":
+            _get_redis().set(_key(session_uuid), data, ex=settings.HANDOFF_TTL)
+        elif backend == "spool":
+            os.makedirs(settings.HANDOFF_SPOOL_DIR, exist_ok=True)
+            _sweep_expired()
+            fd, tmp_path = tempfile.mkstemp(dir=settings.HANDOFF_SPOOL_DIR, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, _spool_path(session_uuid))
+        else:
+            raise ValueError(f"Unknown HANDOFF_BACKEND: {backend}")
+    except Exception:
+        # 핸드오프는 최적화일 뿐. 실패하면 워커가 스토리지에서 읽는다
+        logger.warning("handoff: failed to stash original for session %s", session_uuid, exc_info=True)
+        return False
+    return True
+
+
+def fetch_original(session_uuid: str) -> Optional[bytes]:
+    """넘겨둔 바이트. 없거나 만료/비활성이면 None."""
+    backend = settings.HANDOFF_BACKEND
+    try:
+        if backend == "redis":
+            return _get_redis().get(_key(session_uuid))
+        if backend == "spool":
+            path = _spool_path(session_uuid)
+            if time.time() - os.path.getmtime(path) > settings.HANDOFF_TTL:
+                with contextlib.suppress(OSError):
+                    os.unlink(path)
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.warning("handoff: failed to read original for session %s", session_uuid, exc_info=True)
+    return None
+
+
+def discard_original(session_uuid: str) -> None:
+    """AI 작업이 더 이상 필요 없을 때 넘겨둔 바이트를 지운다."""
+    backend = settings.HANDOFF_BACKEND
+    with contextlib.suppress(Exception):
+        if backend == "redis":
+            _get_redis().delete(_key(session_uuid))
+        elif backend == "spool":
+            os.unlink(_spool_path(session_uuid))
@@ -1,7 +1,93 @@
 from PIL import Image
-from typing import Tuple
+from typing import NamedTuple, Optional
 
-def get_image_size(image_file) -> Tuple[int,int]:
+# EXIF Orientation 값 중 90°/270° 회전이 들어가 가로/세로가 바뀌는 경우
+_SWAPPED_ORIENTATIONS = {5, 6, 7, 8}
+
+# 받는 포맷과 저장할 MIME. MPO(듀얼 카메라/연사 JPEG)는 첫 프레임이 일반 JPEG이고
+# Image.MIME에는 image/mpo로 올라 있어 브라우저/모델이 못 읽으므로 image/jpeg로 저장
+ALLOWED_FORMATS = {
+    "JPEG": "image/jpeg",
+    "MPO": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp",
+}
+
+# 끝 표식 확인에 읽는 꼬리 크기 (뒤에 0으로 채운 패딩이 붙는 카메라가 있다)
+TAIL_BYTES = 1024
+_PNG_IEND = b"IEND\xaeB`\x82"
+
+
+class ImageProbe(NamedTuple):
+    format: str                 # PIL 포맷 이름 (JPEG, PNG, WEBP, ...)
+    mime: str
+    width: int                  # EXIF 회전을 반영한 표시 기준 크기
+    height: int
+    orientation: Optional[int]  # EXIF Orientation (1-8), 없으면 None
+
+
+def _exif_orientation(img) -> Optional[int]:
+    if img.format == "PNG":
+        # PNG.getexif()는 IDAT 뒤의 eXIf 청크를 찾으려고 픽셀을 전부 디코딩하므로
+        # 헤더에서 이미 읽힌 EXIF만 사용
+        raw = img.info.get("exif")
+        if not raw:
+            return None
+        exif = Image.Exif()
+        exif.load(raw)
+        return exif.get(0x0112)
+    return img.getexif().get(0x0112)
+
+
+def check_complete(fmt: str, head: bytes, tail: bytes, size: int) -> None:
+    """앞/뒤 몇 바이트로 파일이 끝까지 올라왔는지 확인 (픽셀 디코딩 없음). 잘렸으면 ValueError.
+
+    JPEG/MPO는 EOI 마커, PNG는 IEND 청크로 끝나야 하고, WEBP는 RIFF 헤더의
+    길이만큼 데이터가 있어야 한다.
+    """
+    tail = tail.rstrip(b"\x00")
+    if fmt in ("JPEG", "MPO"):
+        complete = tail.endswith(b"\xff\xd9")
+    elif fmt == "PNG":
+        complete = tail.endswith(_PNG_IEND)
+    elif fmt == "WEBP":
+        complete = len(head) >= 8 and int.from_bytes(head[4:8], "little") + 8 <= size
+    else:
+        complete = True
+    if not complete:
+        raise ValueError("Truncated image")
+
+
+def probe_image(image_file, complete: bool = True) -> ImageProbe:
+    """헤더만 읽어 포맷/크기/EXIF 방향을 확인 (픽셀 디코딩 없음).
+
+    complete=True면 파일 끝도 읽어 잘린 업로드를 거른다 (check_complete).
+    파일 앞부분만 넘길 때는 False로 하고 꼬리를 따로 check_complete에 넘긴다.
+    이미지가 아니거나 허용하지 않는 포맷, 잘린 파일이면 ValueError
+    (메시지는 고정 문구이고 PIL 오류는 원인으로만 남긴다).
+    """
     image_file.seek(0)
-    with Image.open(image_file) as img:
-        return img.width, img.height
+    try:
+        try:
+            with Image.open(image_file) as img:
+                fmt = img.format or ""
+                width, height = img.size
+                orientation = _exif_orientation(img) if fmt in ALLOWED_FORMATS else None
+        except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+            raise ValueError("Not a valid image") from e
+        mime = ALLOWED_FORMATS.get(fmt)
+        if mime is None:
+            raise ValueError(f"Unsupported image format: {fmt}")
+        if complete:
+            image_file.seek(0)
+            head = image_file.read(12)
+            size = image_file.seek(0, 2)
+            image_file.seek(max(0, size - TAIL_BYTES))
+            check_complete(fmt, head, image_file.read(TAIL_BYTES), size)
+    finally:
+        image_file.seek(0)
+    if orientation not in range(1, 9):
+        orientation = None
+    if orientation in _SWAPPED_ORIENTATIONS:
+        width, height = height, width
+    return ImageProbe(fmt, mime, width, height, orientation)
@@ -0,0 +1,43 @@
+"""업로드 이미지를 한 번에 받아들인다 (single-pass ingest).
+
+헤더와 파일 끝 몇 바이트만 한 번 확인하고(포맷, 크기, EXIF 방향, 잘림 여부;
+픽셀 디코드 없음) 바이트 전체는 GCS 업로드가 딱 한 번 더 읽는다. 업로드하면서
+크기와 SHA-256/MD5/CRC32C를 계산하고, AI 핸드오프용으로 바이트를 남겨 둘 수도
+있다. DRF ImageField 검증 + get_image_size + 업로드용 read()를 대신한다.
+"""
+from typing import NamedTuple, Optional
+
+from .gcs import upload_stream
+from .images import probe_image
+
+
+class IngestResult(NamedTuple):
+    gcs_path: str
+    public_url: str
+    mime: str
+    width: int
+    height: int
+    orientation: Optional[int]
+    size_bytes: int
+    sha256: str
+    data: Optional[bytes] = None  # keep_data=True일 때 업로드하며 읽은 원본 바이트
+
+
+def ingest_image(fobj, object_name: str, keep_data: bool = False) -> IngestResult:
+    """이미지 확인, 크기 측정, 업로드, 해시를 한 번에 한다. 이미지가 아니면 ValueError.
+
+    keep_data=True면 업로드하며 읽은 바이트를 data로 돌려준다 (핸드오프용, 파일을 다시 읽지 않는다).
+    """
+    probe = probe_image(fobj)
+    uploaded = upload_stream(fobj, object_name, probe.mime, size=getattr(fobj, "size", None), keep_data=keep_data)
+    return IngestResult(
+        gcs_path=uploaded.gcs_path,
+        public_url=uploaded.public_url,
+        mime=probe.mime,
+        width=probe.width,
+        height=probe.height,
+        orientation=probe.orientation,
+        size_bytes=uploaded.size,
+        sha256=uploaded.sha256,
+        data=uploaded.data,
+    )
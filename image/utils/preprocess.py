@@ -0,0 +1,51 @@
+import io
+from typing import Tuple
+from django.conf import settings
+from PIL import Image, ImageOps
+
+# 포맷별 MIME. RGBA PNG 대신 손실 압축으로 요청 본문을 줄인다
+_MIME = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+
+def resolve_preprocess_options(style) -> dict:
+    """AI_PREPROCESS 기본값 위에 Style.generation_options["preprocess"]를 덮어쓴다."""
+    options = dict(settings.AI_PREPROCESS)
+    options.update((style.generation_options or {}).get("preprocess") or {})
+    return options
+
+
+def preprocess_for_model(data: bytes, options: dict) -> Tuple[bytes, str]:
+    """
+    모델 입력용 이미지 준비: EXIF 회전 보정 -> 작업 해상도로 축소 -> 압축 인코딩.
+    return: (encoded bytes, mime type)
+    """
+    fmt = str(options.get("format", "JPEG")).upper()
+    if fmt not in _MIME:
+        raise ValueError(f"Unsupported preprocess format: {fmt}")
+    max_side = int(options.get("max_side", 1024))
+    quality = int(options.get("quality", 90))
+
+    with Image.open(io.BytesIO(data)) as img:
+        # JPEG은 디코딩 단계에서 1/2, 1/4, 1/8로 줄여 읽을 수 있다(회전 전이므로 정사각형 요청)
+        img.draft("RGB", (max_side, max_side))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+        if fmt == "PNG":
+            out = img if img.mode in ("RGB", "RGBA", "L") else img.convert("RGBA")
+        elif img.mode in ("RGBA", "LA", "P"):
+            # 투명 영역은 흰 배경으로 합성
+            rgba = img.convert("RGBA")
+            out = Image.new("RGB", rgba.size, (255, 255, 255))
+            out.paste(rgba, mask=rgba.getchannel("A"))
+        else:
+            out = img.convert("RGB")
+
+        buf = io.BytesIO()
+        if fmt == "PNG":
+            out.save(buf, format="PNG", optimize=False)
+        elif fmt == "WEBP":
+            out.save(buf, format="WEBP", quality=quality, method=4)
+        else:
+            out.save(buf, format="JPEG", quality=quality, optimize=True)
+    return buf.getvalue(), _MIME[fmt]
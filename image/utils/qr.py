@@ -1,18 +1,99 @@
-import io, qrcode
+import io, qrcode, secrets, string
+from typing import Dict, Iterable, List, Optional, Sequence
 from django.conf import settings
 
-def make_qr_png(redirect_url: str) -> bytes:
-    qr = qrcode.QRCode(
+BOX_SIZE = 8
+BORDER = 2
+
+
+def _build_matrix(qr: qrcode.QRCode, data: str) -> List[List[bool]]:
+    # 같은 QRCode 인스턴스를 재사용 (배치 렌더링용). make(fit=True)가 정한 버전이 남아 있으면
+    # 다음 URL도 그 크기 이상으로 그려지므로 URL마다 가장 작은 버전부터 다시 찾는다
+    qr.clear()
+    qr.version = None
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()  # border 포함, True = 검은 모듈
+
+
+def _new_qr() -> qrcode.QRCode:
+    # 마스크 8종 평가가 렌더링 시간의 대부분. QR_MASK_PATTERN(0-7)을 주면 평가를 건너뛴다
+    mask_pattern: Optional[int] = getattr(settings, "QR_MASK_PATTERN", None)
+    return qrcode.QRCode(
         version=1, error_correction=qrcode.constants.ERROR_CORRECT_M,
-        box_size=8, border=2
+        box_size=BOX_SIZE, border=BORDER, mask_pattern=mask_pattern
     )
-    qr.add_data(redirect_url)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
+
+
+def _packed_row(modules: Sequence[bool], box_size: int) -> bytes:
+    # 1-bit 그레이스케일 행: 0 = 검정, 1 = 흰색, 모듈 하나를 box_size 비트로 확장
+    bits = "".join(("0" if m else "1") * box_size for m in modules)
+    pad = -len(bits) % 8
+    return int(bits + "1" * pad, 2).to_bytes((len(bits) + pad) // 8, "big")
+
+
+def _encode_png(matrix: List[List[bool]], box_size: int, row_cache: Dict[tuple, bytes]) -> bytes:
+    import png
+
+    rows = []
+    for modules in matrix:
+        key = tuple(modules)
+        packed = row_cache.get(key)
+        if packed is None:
+            packed = row_cache[key] = _packed_row(modules, box_size)
+        rows.extend([packed] * box_size)
+    size = len(matrix) * box_size
     buf = io.BytesIO()
-    img.save(buf, format="PNG")
+    png.Writer(size, size, greyscale=True, bitdepth=1).write_packed(buf, rows)
     return buf.getvalue()
 
+
+def make_qr_pngs(redirect_urls: Iterable[str], box_size: int = BOX_SIZE) -> List[bytes]:
+    """Render many QR PNGs at once (1-bit greyscale, packed rows written by pypng)."""
+    qr = _new_qr()
+    # 가장자리(border)·finder 패턴 행은 슬러그가 달라도 같으므로 배치 전체에서 공유
+    row_cache: Dict[tuple, bytes] = {}
+    return [_encode_png(_build_matrix(qr, url), box_size, row_cache) for url in redirect_urls]
+
+
+def make_qr_png(redirect_url: str) -> bytes:
+    return make_qr_pngs([redirect_url])[0]
+
+
+def make_qr_svg(redirect_url: str, box_size: int = BOX_SIZE) -> bytes:
+    """Render a QR code as a single-path SVG (one horizontal run per path segment)."""
+    matrix = _build_matrix(_new_qr(), redirect_url)
+    size = len(matrix)
+    segments = []
+    for y, modules in enumerate(matrix):
+        x = 0
+        while x < size:
+            if not modules[x]:
+                x += 1
+                continue
+            start = x
+            while x < size and modules[x]:
+                x += 1
+            segments.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+    px = size * box_size
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{px}" height="{px}" '
+        f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path fill="#000" d="{"".join(segments)}"/></svg>'
+    ).encode("utf-8")
+
+
 def build_redirect_url(slug: str) -> str:
     base = settings.PUBLIC_BASE_URL.rstrip("/")
     return f"{base}/s/{slug}"
+
+def build_qr_image_url(slug: str, fmt: str = "png") -> str:
+    # QR_IMAGE_MODE=endpoint 일 때 GCS 대신 쓰는 렌더링 엔드포인트 주소
+    base = settings.PUBLIC_BASE_URL.rstrip("/")
+    return f"{base}/api/qr/{slug}.{fmt}"
+
+def generate_slug() -> str:
+    # 짧고 URL 친화적인 슬러그
+    alphabet = string.ascii_letters + string.digits + "_"
+    return ''.join(secrets.choice(alphabet) for _ in range(9))
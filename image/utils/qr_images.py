@@ -0,0 +1,63 @@
+"""QR images rendered on request instead of being stored in GCS.
+
+A QR image is a pure function of build_redirect_url(slug) and the render
+options, so it is safe to cache forever: a process-local LRU in front of the
+shared Django cache, a strong ETag derived from the inputs (known before
+rendering, so conditional requests never render), and immutable
+Cache-Control so a CDN absorbs repeat hits.
+"""
+import hashlib
+import threading
+from typing import Optional, Tuple
+
+from cachetools import LRUCache
+from django.conf import settings
+from django.core.cache import cache
+
+from .qr import BORDER, BOX_SIZE, build_redirect_url, make_qr_pngs, make_qr_svg
+
+CONTENT_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+_memory: Optional[LRUCache] = None
+_lock = threading.Lock()
+
+
+def _get_memory() -> LRUCache:
+    global _memory
+    if _memory is None:
+        _memory = LRUCache(maxsize=settings.QR_IMAGE_MEMORY_ITEMS)
+    return _memory
+
+
+def qr_image_etag(slug: str, fmt: str) -> str:
+    # 렌더링 결과를 바꾸는 모든 입력을 포함 (리다이렉트 URL, 포맷, 박스/테두리, 마스크)
+    fingerprint = f"{build_redirect_url(slug)}|{fmt}|{BOX_SIZE}|{BORDER}|{settings.QR_MASK_PATTERN}"
+    return '"' + hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def _render(slug: str, fmt: str) -> bytes:
+    url = build_redirect_url(slug)
+    if fmt == "svg":
+        return make_qr_svg(url)
+    return make_qr_pngs([url])[0]
+
+
+def get_qr_image(slug: str, fmt: str) -> Tuple[bytes, str]:
+    """Return (image bytes, strong ETag) for a slug, rendering at most once per cache miss."""
+    etag = qr_image_etag(slug, fmt)
+    with _lock:
+        data = _get_memory().get(etag)
+    if data is not None:
+        return data, etag
+
+    cache_key = "qrimg:" + etag.strip('"')
+    data = cache.get(cache_key)
+    if data is None:
+        data = _render(slug, fmt)
+        cache.set(cache_key, data, settings.QR_IMAGE_CACHE_TTL)
+    with _lock:
+        _get_memory()[etag] = data
+    return data, etag
@@ -0,0 +1,125 @@
+"""Pool of pre-rendered, pre-uploaded QR codes.
+
+replenish_qr_pool (Celery beat + on demand) keeps at least QR_POOL_LOW_WATER
+READY codes with is_pooled=True; SessionCreateView claims one (and
+SessionBulkCreateView claims many) with SELECT ... FOR UPDATE SKIP LOCKED so
+concurrent booths never wait on each other or on QR rendering.
+"""
+import logging
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import QRCode
+from .gcs import upload_bytes
+from .qr import build_redirect_url, generate_slug, make_qr_pngs
+from .redis_pool import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+REPLENISH_REQUESTED_KEY = "qr:pool:replenish:requested"
+
+
+def claim_pooled_qr() -> Optional[QRCode]:
+    """Take one READY pooled QR code (call inside transaction.atomic)."""
+    if not settings.QR_POOL_ENABLED:
+        return None
+    qr = (
+        QRCode.objects.select_for_update(skip_locked=True)
+        .filter(is_pooled=True, status=QRCode.Status.READY)
+        .order_by("id")
+        .first()
+    )
+    if qr is not None:
+        qr.is_pooled = False
+        qr.save(update_fields=["is_pooled", "updated_at"])
+    return qr
+
+
+def claim_pooled_qrs(count: int) -> List[QRCode]:
+    """Take up to ``count`` READY pooled QR codes at once (call inside transaction.atomic)."""
+    if not settings.QR_POOL_ENABLED or count <= 0:
+        return []
+    qrs = list(
+        QRCode.objects.select_for_update(skip_locked=True)
+        .filter(is_pooled=True, status=QRCode.Status.READY)
+        .order_by("id")[:count]
+    )
+    if qrs:
+        now = timezone.now()
+        QRCode.objects.filter(id__in=[qr.id for qr in qrs]).update(is_pooled=False, updated_at=now)
+        for qr in qrs:
+            qr.is_pooled, qr.updated_at = False, now
+    return qrs
+
+
+def available_count() -> int:
+    return QRCode.objects.filter(is_pooled=True, status=QRCode.Status.READY).count()
+
+
+def request_replenish_if_low() -> None:
+    """Kick the replenisher once the pool drops below the low-water mark.
+
+    At most one session per QR_POOL_REPLENISH_REQUEST_TTL pays for the
+    count query and the enqueue; the rest see the Redis flag and return.
+    """
+    if not settings.QR_POOL_ENABLED:
+        return
+    try:
+        if not get_redis_client().set(REPLENISH_REQUESTED_KEY, 1, nx=True, ex=settings.QR_POOL_REPLENISH_REQUEST_TTL):
+            return
+    except Exception:
+        # 주기 보충(beat)이 있으니 여기서는 건너뛴다
+        logger.warning("qr_pool: replenish flag unavailable", exc_info=True)
+        return
+    if available_count() < settings.QR_POOL_LOW_WATER:
+        from ..tasks import replenish_qr_pool
+        transaction.on_commit(replenish_qr_pool.delay)
+
+
+def unique_slugs(count: int) -> List[str]:
+    """Generate ``count`` slugs that are unused, checking collisions in one query per round."""
+    slugs = set()
+    while len(slugs) < count:
+        candidates = {generate_slug() for _ in range(count - len(slugs))} - slugs
+        taken = set(QRCode.objects.filter(slug__in=candidates).values_list("slug", flat=True))
+        slugs |= candidates - taken
+    return list(slugs)
+
+
+def replenish(target: Optional[int] = None) -> int:
+    """Fill the pool up to ``target`` READY codes. Returns how many were added."""
+    target = settings.QR_POOL_TARGET if target is None else target
+    missing = target - available_count()
+    if missing <= 0:
+        return 0
+
+    pending = QRCode.objects.bulk_create(
+        [QRCode(slug=slug, is_pooled=True) for slug in unique_slugs(missing)]
+    )
+    failed = render_and_store(pending)
+    for qr, _ in failed:
+        qr.delete()
+    return len(pending) - len(failed)
+
+
+def render_and_store(qrs: List[QRCode]) -> List[Tuple[QRCode, Exception]]:
+    """Render a batch of QR codes in one pass, upload each and mark it READY.
+
+    Returns the (qr, error) pairs that failed to upload; the caller decides
+    what to do with them.
+    """
+    pngs = make_qr_pngs(build_redirect_url(qr.slug) for qr in qrs)
+    failed = []
+    for qr, png in zip(qrs, pngs):
+        try:
+            qr.qr_image_gcs_path, qr.qr_image_public_url = upload_bytes(png, f"qr/{qr.slug}.png", "image/png")
+        except Exception as e:
+            logger.exception("qr_pool: failed to upload %s", qr.slug)
+            failed.append((qr, e))
+            continue
+        qr.status = QRCode.Status.READY
+        qr.save(update_fields=["qr_image_gcs_path", "qr_image_public_url", "status", "updated_at"])
+    return failed
@@ -0,0 +1,144 @@
+"""Cluster-wide admission control for model calls.
+
+Every worker goes through the same Redis-side token bucket (requests per
+minute) and concurrency semaphore (in-flight leases in a sorted set scored by
+expiry) for a model name, so the fleet as a whole stays at the quota instead
+of each process guessing. Limits come from AI_MODEL_LIMITS; a denied caller
+gets a retry-after delay to requeue with.
+"""
+import contextlib
+import math
+import uuid
+from typing import Dict, Iterator, Optional, Tuple
+
+from django.conf import settings
+
+from .redis_pool import get_redis_client
+
+# KEYS[1]=bucket hash, KEYS[2]=lease zset
+# ARGV=[tokens per ms, burst, concurrency (0=unlimited), lease ms, lease id, busy retry ms]
+# returns {1, 0} when admitted, {0, retry_after_ms} otherwise
+_ACQUIRE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local lease_ms = tonumber(ARGV[4])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+if limit > 0 and redis.call('ZCARD', KEYS[2]) >= limit then
+  return {0, tonumber(ARGV[6])}
+end
+
+local tokens = burst
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+if state[1] then
+  tokens = math.min(burst, tonumber(state[1]) + (now - tonumber(state[2])) * rate)
+end
+if rate > 0 then
+  if tokens < 1 then
+    return {0, math.ceil((1 - tokens) / rate)}
+  end
+  redis.call('HSET', KEYS[1], 'tokens', tokens - 1, 'ts', now)
+  redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate) * 2 + 1000)
+end
+
+redis.call('ZADD', KEYS[2], now + lease_ms, ARGV[5])
+redis.call('PEXPIRE', KEYS[2], lease_ms)
+return {1, 0}
+"""
+_acquire_script = None
+
+
+class Throttled(Exception):
+    """The model is at its cluster-wide limit; try again after ``retry_after`` seconds."""
+
+    def __init__(self, model: str, retry_after: float):
+        # args가 생성자 인자와 같아야 pickle(Celery 결과 백엔드/재시도)로 되살릴 수 있다
+        super().__init__(model, retry_after)
+        self.model = model
+        self.retry_after = retry_after
+
+    def __str__(self) -> str:
+        return f"{self.model} throttled, retry after {self.retry_after:.1f}s"
+
+
+def _keys(model: str) -> Tuple[str, str]:
+    return f"ai:limit:{model}:bucket", f"ai:limit:{model}:leases"
+
+
+def get_model_limits(model: str) -> Dict[str, int]:
+    limits = dict(settings.AI_MODEL_LIMITS.get("default", {}))
+    limits.update(settings.AI_MODEL_LIMITS.get(model, {}))
+    return limits
+
+
+def try_acquire(model: str) -> Tuple[Optional[str], float]:
+    """Return (lease_id, 0) when admitted, else (None, retry_after_seconds)."""
+    global _acquire_script
+    limits = get_model_limits(model)
+    rpm = int(limits.get("rpm", 0))
+    client = get_redis_client()
+    if _acquire_script is None:
+        _acquire_script = client.register_script(_ACQUIRE_LUA)
+
+    lease_id = uuid.uuid4().hex
+    admitted, retry_ms = _acquire_script(keys=list(_keys(model)), args=[
+        rpm / 60000.0,
+        int(limits.get("burst", max(1, rpm // 6))),
+        int(limits.get("concurrency", 0)),
+        settings.AI_MODEL_LEASE_SECONDS * 1000,
+        lease_id,
+        settings.AI_THROTTLE_BUSY_RETRY_SECONDS * 1000,
+    ], client=client)
+    if int(admitted):
+        return lease_id, 0.0
+    return None, int(retry_ms) / 1000.0
+
+
+def release(model: str, lease_id: str) -> None:
+    get_redis_client().zrem(_keys(model)[1], lease_id)
+
+
+@contextlib.contextmanager
+def model_slot(model: str) -> Iterator[None]:
+    """Hold one admission slot for ``model`` or raise Throttled."""
+    lease_id, retry_after = try_acquire(model)
+    if lease_id is None:
+        raise Throttled(model, retry_after)
+    try:
+        yield
+    finally:
+        with contextlib.suppress(Exception):
+            release(model, lease_id)
+
+
+def utilization() -> Dict[str, Dict[str, float]]:
+    """Live in-flight count / token level for every configured model."""
+    client = get_redis_client()
+    now = client.time()
+    now_ms = now[0] * 1000 + now[1] // 1000
+    stats = {}
+    models = {m for m in settings.AI_MODEL_LIMITS if m != "default"} | {settings.GOOGLE_GENAI_IMAGE_MODEL}
+    for model in sorted(models):
+        limits = get_model_limits(model)
+        bucket_key, lease_key = _keys(model)
+        inflight = client.zcount(lease_key, now_ms, "+inf")
+        tokens, ts = client.hmget(bucket_key, "tokens", "ts")
+        rpm = int(limits.get("rpm", 0))
+        burst = int(limits.get("burst", max(1, rpm // 6)))
+        if tokens is None:
+            available = float(burst)
+        else:
+            available = min(burst, float(tokens) + (now_ms - float(ts)) * rpm / 60000.0)
+        concurrency = int(limits.get("concurrency", 0))
+        stats[model] = {
+            "rpm": rpm,
+            "burst": burst,
+            "tokens_available": math.floor(available * 100) / 100,
+            "concurrency": concurrency,
+            "in_flight": inflight,
+            "concurrency_utilization": round(inflight / concurrency, 3) if concurrency else None,
+        }
+    return stats
@@ -0,0 +1,104 @@
+"""Two-tier cache for the /s/<slug> redirect: slug → target_url.
+
+Printed QR codes keep getting scanned long after an event, so lookups go
+through a process-local TTL cache, then Redis, and only then Postgres.
+Resolved targets are cached for REDIRECT_CACHE_TTL; "not ready yet" and
+unknown slugs get a short REDIRECT_NEGATIVE_TTL so a freshly finalized
+session shows up quickly. _register_final primes the entry and any
+QRCode.target_url change invalidates it (see image.signals).
+"""
+import logging
+import threading
+import time
+from typing import Optional, Tuple
+
+from cachetools import TLRUCache
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Redis 값: 타깃 URL, 아직 준비 안 됨, 존재하지 않는 슬러그
+_NOT_READY = ""
+_MISSING = "-"
+
+_local: Optional[TLRUCache] = None
+_lock = threading.Lock()
+
+
+def _key(slug: str) -> str:
+    return f"redirect:slug:{slug}"
+
+
+def _ttl(value: str) -> int:
+    if value in (_NOT_READY, _MISSING):
+        return settings.REDIRECT_NEGATIVE_TTL
+    return settings.REDIRECT_CACHE_TTL
+
+
+def _get_local() -> TLRUCache:
+    global _local
+    if _local is None:
+        local_ttl = settings.REDIRECT_LOCAL_TTL
+        _local = TLRUCache(
+            maxsize=settings.REDIRECT_LOCAL_ITEMS,
+            ttu=lambda _key, value, now: now + min(_ttl(value), local_ttl),
+            timer=time.monotonic,
+        )
+    return _local
+
+
+def _redis():
+    from .redis_pool import get_redis_client
+    return get_redis_client()
+
+
+def _remember(slug: str, value: str, write_redis: bool = True) -> None:
+    with _lock:
+        _get_local()[slug] = value
+    if write_redis:
+        try:
+            _redis().set(_key(slug), value, ex=_ttl(value))
+        except Exception:
+            logger.warning("redirect_cache: failed to store %s", slug, exc_info=True)
+
+
+def _load(slug: str) -> str:
+    from ..models import QRCode
+    row = QRCode.objects.filter(slug=slug).values("target_url").first()
+    if row is None:
+        return _MISSING
+    return row["target_url"] or _NOT_READY
+
+
+def resolve_target(slug: str) -> Tuple[bool, Optional[str]]:
+    """Return (qr exists, target_url or None if not ready yet)."""
+    with _lock:
+        value = _get_local().get(slug)
+    if value is None:
+        try:
+            value = _redis().get(_key(slug))
+        except Exception:
+            logger.warning("redirect_cache: redis lookup failed for %s", slug, exc_info=True)
+            value = None
+        if value is not None:
+            _remember(slug, value, write_redis=False)
+        else:
+            value = _load(slug)
+            _remember(slug, value)
+    if value == _MISSING:
+        return False, None
+    return True, value or None
+
+
+def prime_target(slug: str, target_url: str) -> None:
+    """Store a freshly finalized target so the first scans skip the DB."""
+    _remember(slug, target_url)
+
+
+def invalidate(slug: str) -> None:
+    with _lock:
+        _get_local().pop(slug, None)
+    try:
+        _redis().delete(_key(slug))
+    except Exception:
+        logger.warning("redirect_cache: failed to invalidate %s", slug, exc_info=True)
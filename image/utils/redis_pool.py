@@ -0,0 +1,51 @@
+import threading
+from typing import Dict
+from django.conf import settings
+import redis
+import redis.asyncio as aioredis
+
+# decode_responses 값별로 프로세스당 하나씩. redis-py 풀은 fork 이후 pid를
+# 확인해 자식에서 커넥션을 새로 만들기 때문에 gunicorn/Celery prefork에서도 안전하다.
+_pools: Dict[bool, redis.ConnectionPool] = {}
+_async_pools: Dict[bool, aioredis.ConnectionPool] = {}
+_lock = threading.Lock()
+
+
+def get_redis_url() -> str:
+    """REDIS_URL or fall back to CELERY_BROKER_URL."""
+    return getattr(settings, "REDIS_URL", None) or getattr(settings, "CELERY_BROKER_URL", "redis://localhost:6379/0")
+
+
+def get_redis_pool(decode_responses: bool = True) -> redis.ConnectionPool:
+    pool = _pools.get(decode_responses)
+    if pool is None:
+        with _lock:
+            pool = _pools.get(decode_responses)
+            if pool is None:
+                pool = redis.ConnectionPool.from_url(
+                    get_redis_url(),
+                    decode_responses=decode_responses,
+                    max_connections=settings.REDIS_MAX_CONNECTIONS,
+                    health_check_interval=30,
+                )
+                _pools[decode_responses] = pool
+    return pool
+
+
+def get_redis_client(decode_responses: bool = True) -> redis.Redis:
+    """Return a Redis client backed by the shared per-process connection pool."""
+    return redis.Redis(connection_pool=get_redis_pool(decode_responses))
+
+
+def get_async_redis_client(decode_responses: bool = True) -> aioredis.Redis:
+    """Async counterpart of get_redis_client() for the ASGI event loop."""
+    pool = _async_pools.get(decode_responses)
+    if pool is None:
+        pool = aioredis.ConnectionPool.from_url(
+            get_redis_url(),
+            decode_responses=decode_responses,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            health_check_interval=30,
+        )
+        _async_pools[decode_responses] = pool
+    return aioredis.Redis(connection_pool=pool)
@@ -0,0 +1,108 @@
+"""Content-addressed cache of AI generation results.
+
+Key = sha256 over the preprocessed input bytes, the resolved prompt and the
+generation config, so a retry or re-shoot of the same photo with the same
+style reuses the stored result instead of calling the model again. Entries
+point at the already-uploaded GCS object, which is stored under the key
+itself (``ai/cache/<key>.png``) and therefore never overwritten by a later
+job for the same session. They expire after
+AI_RESULT_CACHE_TTL, the oldest are evicted beyond AI_RESULT_CACHE_MAX_ENTRIES,
+and all entries of a style are dropped when its prompt/reference changes
+(see image.signals).
+"""
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+from .redis_pool import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+_ENTRY_PREFIX = "aicache:entry:"
+_INDEX_KEY = "aicache:index"
+_STATS_KEY = "aicache:stats"
+
+
+def _style_key(style_id: int) -> str:
+    return f"aicache:style:{style_id}"
+
+
+def build_cache_key(input_bytes: bytes, prompt: str, config: Dict[str, Any]) -> str:
+    material = json.dumps({
+        "input": hashlib.sha256(input_bytes).hexdigest(),
+        "prompt": prompt,
+        "config": config,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def get_cached_result(key: str) -> Optional[Dict[str, Any]]:
+    """Return the stored result ({gcs_path, public_url, mime, size_bytes}) or None."""
+    if not settings.AI_RESULT_CACHE_ENABLED:
+        return None
+    try:
+        client = get_redis_client()
+        raw = client.get(_ENTRY_PREFIX + key)
+        client.hincrby(_STATS_KEY, "hits" if raw else "misses", 1)
+        return json.loads(raw) if raw else None
+    except Exception:
+        logger.warning("result_cache: lookup failed", exc_info=True)
+        return None
+
+
+def store_result(key: str, style_id: int, result: Dict[str, Any]) -> None:
+    if not settings.AI_RESULT_CACHE_ENABLED:
+        return
+    try:
+        client = get_redis_client()
+        with client.pipeline(transaction=False) as pipe:
+            pipe.set(_ENTRY_PREFIX + key, json.dumps(result), ex=settings.AI_RESULT_CACHE_TTL)
+            pipe.zadd(_INDEX_KEY, {key: time.time()})
+            pipe.sadd(_style_key(style_id), key)
+            pipe.expire(_style_key(style_id), settings.AI_RESULT_CACHE_TTL)
+            pipe.execute()
+        _evict_overflow(client)
+    except Exception:
+        logger.warning("result_cache: store failed", exc_info=True)
+
+
+def _evict_overflow(client) -> None:
+    """Drop index entries that already expired, then the oldest beyond the size cap."""
+    client.zremrangebyscore(_INDEX_KEY, "-inf", time.time() - settings.AI_RESULT_CACHE_TTL)
+    overflow = client.zcard(_INDEX_KEY) - settings.AI_RESULT_CACHE_MAX_ENTRIES
+    if overflow <= 0:
+        return
+    evicted = [member for member, _ in client.zpopmin(_INDEX_KEY, overflow)]
+    if evicted:
+        client.delete(*[_ENTRY_PREFIX + key for key in evicted])
+        client.hincrby(_STATS_KEY, "evictions", len(evicted))
+
+
+def invalidate_style(style_id: int) -> int:
+    """Remove every cached result produced for a style. Returns the count removed."""
+    try:
+        client = get_redis_client()
+        keys = list(client.smembers(_style_key(style_id)))
+        with client.pipeline(transaction=False) as pipe:
+            if keys:
+                pipe.delete(*[_ENTRY_PREFIX + key for key in keys])
+                pipe.zrem(_INDEX_KEY, *keys)
+            pipe.delete(_style_key(style_id))
+            pipe.hincrby(_STATS_KEY, "invalidations", len(keys))
+            pipe.execute()
+    except Exception:
+        # on_commit 콜백에서 불리므로 스타일 저장 요청을 실패시키지 않는다 (남은 항목은 TTL로 만료)
+        logger.warning("result_cache: failed to invalidate style %s", style_id, exc_info=True)
+        return 0
+    return len(keys)
+
+
+def cache_stats() -> Dict[str, int]:
+    client = get_redis_client()
+    stats = {k: int(v) for k, v in client.hgetall(_STATS_KEY).items()}
+    stats["entries"] = client.zcard(_INDEX_KEY)
+    return stats
@@ -0,0 +1,113 @@
+"""Materialized session snapshots for SessionDetailView polling.
+
+The detail payload (session status + QR info) is kept in a Redis hash and
+rewritten after every committed Session/QRCode save (see image.signals), so
+a poll is a single HMGET. The version is the newest ``updated_at`` of the
+session and its QR code in microseconds; writes only move it forward, so a
+slow writer can never overwrite a newer snapshot. The version doubles as
+the ETag for conditional GETs.
+"""
+import json
+import logging
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+from .qr import build_redirect_url
+from .redis_pool import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1]=snapshot hash, ARGV=[version, payload json, ttl seconds]
+_WRITE_LUA = """
+local current = tonumber(redis.call('HGET', KEYS[1], 'v') or '0')
+if tonumber(ARGV[1]) >= current then
+  redis.call('HSET', KEYS[1], 'v', ARGV[1], 'data', ARGV[2])
+end
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+return 1
+"""
+_write_script = None
+
+
+def _key(session_uuid: str) -> str:
+    return f"session:{session_uuid}:snapshot"
+
+
+def _micros(dt) -> int:
+    return int(dt.timestamp() * 1_000_000)
+
+
+def build_snapshot(session) -> Tuple[int, Dict]:
+    """Return (version, payload) for a Session loaded with its qr."""
+    qr = session.qr
+    qr_obj = None
+    version = _micros(session.updated_at)
+    if qr:
+        qr_obj = {
+            "slug": qr.slug,
+            "redirect_url": build_redirect_url(qr.slug),
+            "status": qr.status,
+            "qr_image_url": qr.qr_image_public_url or None
+        }
+        version = max(version, _micros(qr.updated_at))
+    return version, {
+        "session_uuid": str(session.uuid),
+        "status": session.status,
+        "qr": qr_obj
+    }
+
+
+def _store(session_uuid: str, version: int, payload: Dict) -> None:
+    global _write_script
+    client = get_redis_client()
+    if _write_script is None:
+        _write_script = client.register_script(_WRITE_LUA)
+    _write_script(
+        keys=[_key(session_uuid)],
+        args=[version, json.dumps(payload, separators=(",", ":")), settings.SESSION_SNAPSHOT_TTL],
+        client=client,
+    )
+
+
+def _load_from_db(session_uuid: str) -> Optional[Tuple[int, Dict]]:
+    from ..models import Session
+    session = Session.objects.select_related("qr").filter(uuid=session_uuid).first()
+    if session is None:
+        return None
+    return build_snapshot(session)
+
+
+def refresh_snapshot(session_uuid: str) -> Optional[Tuple[int, Dict]]:
+    """Rebuild the snapshot from the DB and publish it (call after commit)."""
+    snapshot = _load_from_db(session_uuid)
+    if snapshot is not None:
+        try:
+            _store(session_uuid, *snapshot)
+        except Exception:
+            logger.warning("session_snapshot: failed to store %s", session_uuid, exc_info=True)
+    return snapshot
+
+
+def delete_snapshot(session_uuid: str) -> None:
+    """Drop the snapshot of a deleted session (call after commit)."""
+    try:
+        get_redis_client().delete(_key(session_uuid))
+    except Exception:
+        logger.warning("session_snapshot: failed to delete %s", session_uuid, exc_info=True)
+
+
+def get_snapshot(session_uuid: str) -> Optional[Tuple[int, Dict]]:
+    """Return (version, payload); one Redis read on a hit, the DB on a miss."""
+    try:
+        version, data = get_redis_client().hmget(_key(session_uuid), "v", "data")
+    except Exception:
+        logger.warning("session_snapshot: redis read failed for %s", session_uuid, exc_info=True)
+        return _load_from_db(session_uuid)
+    if data is not None:
+        return int(version), json.loads(data)
+    return refresh_snapshot(session_uuid)
+
+
+def snapshot_etag(session_uuid: str, version: int) -> str:
+    return f'"{session_uuid}-{version}"'
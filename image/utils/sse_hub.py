@@ -0,0 +1,152 @@
+"""Async SSE fan-out for ASGI workers.
+
+Each process keeps a single ``PSUBSCRIBE session:*`` connection and forwards
+messages to in-process subscriber queues, so thousands of open streams share
+one Redis connection. Frames are formatted once per message and the same
+string is handed to every subscriber of that session.
+"""
+import asyncio
+import contextlib
+import logging
+from collections import defaultdict
+from typing import AsyncGenerator, Dict, List, Optional, Set
+
+from django.conf import settings
+
+from .events import (
+    format_sse_message, is_newer_event, log_entries_to_payloads,
+    payload_event_id, session_log_key
+)
+from .redis_pool import get_async_redis_client
+
+logger = logging.getLogger(__name__)
+
+_CHANNEL_PREFIX = "session:"
+
+
+class SessionEventHub:
+    """One pattern subscription per process, many subscriber queues."""
+
+    def __init__(self, queue_size: int = 100, reconnect_delay: float = 1.0, ready_timeout: float = 5.0):
+        self._queue_size = queue_size
+        self._reconnect_delay = reconnect_delay
+        self._ready_timeout = ready_timeout
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    async def wait_ready(self) -> None:
+        """Start the subscription if needed and wait for it; asyncio.TimeoutError if Redis is unreachable."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        await asyncio.wait_for(self._ready.wait(), self._ready_timeout)
+
+    async def subscribe(self, session_uuid: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._queue_size)
+        self._subscribers[session_uuid].add(queue)
+        # 패턴 구독이 잡히기 전에 발행된 이벤트를 놓치지 않도록 대기 (Redis가 죽어 있으면 오래 매달리지 않는다)
+        try:
+            await self.wait_ready()
+        except BaseException:
+            self.unsubscribe(session_uuid, queue)
+            raise
+        return queue
+
+    def unsubscribe(self, session_uuid: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(session_uuid)
+        if not queues:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[session_uuid]
+
+    def dispatch(self, session_uuid: str, raw: str) -> None:
+        # 프레임 직렬화는 메시지당 한 번, 모든 구독자가 같은 문자열을 공유
+        item = (raw, format_sse_message(raw))
+        for queue in list(self._subscribers.get(session_uuid, ())):
+            if queue.full():
+                # 느린 클라이언트는 가장 오래된 프레임을 버린다
+                with contextlib.suppress(asyncio.QueueEmpty):
+                    queue.get_nowait()
+            queue.put_nowait(item)
+
+    async def _run(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                pubsub = get_async_redis_client().pubsub()
+                await pubsub.psubscribe(f"{_CHANNEL_PREFIX}*")
+                self._ready.set()
+                async for message in pubsub.listen():
+                    if message.get("type") != "pmessage":
+                        continue
+                    session_uuid = message["channel"][len(_CHANNEL_PREFIX):]
+                    if session_uuid not in self._subscribers:
+                        continue
+                    self.dispatch(session_uuid, message.get("data"))
+            except asyncio.CancelledError:
+                self._ready.clear()
+                raise
+            except Exception:
+                logger.exception("SessionEventHub: subscription lost, reconnecting")
+                # 다시 붙을 때까지 새 구독자는 wait_ready에서 기다리거나 타임아웃으로 끝난다
+                self._ready.clear()
+                await asyncio.sleep(self._reconnect_delay)
+            finally:
+                if pubsub is not None:
+                    with contextlib.suppress(Exception):
+                        await pubsub.aclose()
+
+
+_hub: Optional[SessionEventHub] = None
+_hub_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_event_hub() -> SessionEventHub:
+    """Return the hub bound to the running event loop (one per process in practice)."""
+    global _hub, _hub_loop
+    loop = asyncio.get_running_loop()
+    if _hub is None or _hub_loop is not loop:
+        _hub = SessionEventHub(ready_timeout=settings.SSE_HUB_READY_TIMEOUT)
+        _hub_loop = loop
+    return _hub
+
+
+async def _read_session_backlog(session_uuid: str, last_event_id: Optional[str]) -> List[str]:
+    """Async twin of events.read_session_backlog."""
+    client = get_async_redis_client()
+    key = session_log_key(session_uuid)
+    if last_event_id:
+        entries = await client.xrange(key, min=f"({last_event_id}", max="+")
+    else:
+        entries = list(reversed(await client.xrevrange(key, max="+", min="-", count=1)))
+    return log_entries_to_payloads(entries)
+
+
+async def astream_session_events(session_uuid: str, keepalive_seconds: int = 15, last_event_id: Optional[str] = None) -> AsyncGenerator[str, None]:
+    """Async SSE generator backed by the shared per-process hub."""
+    hub = get_event_hub()
+    # Subscribe before reading the backlog so nothing falls in between
+    queue = await hub.subscribe(session_uuid)
+    try:
+        # Initial retry hint for proxies
+        yield "retry: 3000\n\n"
+        for raw in await _read_session_backlog(session_uuid, last_event_id):
+            last_event_id = payload_event_id(raw) or last_event_id
+            yield format_sse_message(raw)
+
+        while True:
+            try:
+                raw, frame = await asyncio.wait_for(queue.get(), timeout=keepalive_seconds)
+            except asyncio.TimeoutError:
+                # Comment line to keep the connection alive through proxies
+                yield ": ping\n\n"
+                continue
+            if is_newer_event(raw, last_event_id):
+                yield frame
+    finally:
+        hub.unsubscribe(session_uuid, queue)
@@ -0,0 +1,171 @@
+"""Cache for style reference images.
+
+Reference images are fetched once, converted to RGBA PNG once and kept in a
+process-local LRU backed by an on-disk cache shared by all workers on the
+host. Entries older than STYLE_ASSET_TTL are revalidated with
+If-None-Match/If-Modified-Since; if the origin is unreachable the stale copy
+is used.
+"""
+import contextlib
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from cachetools import LRUCache
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry(NamedTuple):
+    data: bytes               # pre-encoded RGBA PNG
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+
+_memory: Optional[LRUCache] = None
+# _lock은 메모리 캐시 접근에만 잡는다. 네트워크 fetch는 URL별 락으로 한 번만 (single-flight)
+_lock = threading.Lock()
+_url_locks: Dict[str, threading.Lock] = {}
+
+
+def _get_memory() -> LRUCache:
+    global _memory
+    if _memory is None:
+        _memory = LRUCache(maxsize=settings.STYLE_ASSET_MEMORY_ITEMS)
+    return _memory
+
+
+def _disk_paths(url: str):
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    base = os.path.join(settings.STYLE_ASSET_CACHE_DIR, key)
+    return f"{base}.png", f"{base}.json"
+
+
+def _load_disk(url: str) -> Optional[_Entry]:
+    data_path, meta_path = _disk_paths(url)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(data_path, "rb") as f:
+            data = f.read()
+    except (OSError, ValueError):
+        return None
+    return _Entry(data, meta.get("etag"), meta.get("last_modified"), float(meta.get("fetched_at", 0)))
+
+
+def _atomic_write(path: str, payload: bytes) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+def _url_lock(url: str) -> threading.Lock:
+    # 스타일 참조 URL 수만큼만 생기므로 따로 정리하지 않는다
+    with _lock:
+        return _url_locks.setdefault(url, threading.Lock())
+
+
+def _cached(url: str) -> Optional[_Entry]:
+    with _lock:
+        entry = _get_memory().get(url)
+    if entry is None:
+        entry = _load_disk(url)
+        if entry is not None:
+            with _lock:
+                _get_memory()[url] = entry
+    return entry
+
+
+def _store(url: str, entry: _Entry, write_data: bool = True) -> None:
+    with _lock:
+        _get_memory()[url] = entry
+    data_path, meta_path = _disk_paths(url)
+    try:
+        if write_data:
+            _atomic_write(data_path, entry.data)
+        meta = {"url": url, "etag": entry.etag, "last_modified": entry.last_modified, "fetched_at": entry.fetched_at}
+        _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+    except OSError:
+        # 디스크 캐시는 최적화일 뿐, 실패해도 메모리 캐시로 계속 진행
+        logger.warning("style_assets: failed to write disk cache for %s", url, exc_info=True)
+
+
+def _encode_reference(raw: bytes) -> bytes:
+    from PIL import Image
+    with Image.open(io.BytesIO(raw)) as img:
+        buf = io.BytesIO()
+        img.convert("RGBA").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _fetch(url: str, cached: Optional[_Entry]) -> _Entry:
+    import requests
+
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+    try:
+        resp = requests.get(url, headers=headers, timeout=20)
+        if cached is not None and resp.status_code == 304:
+            entry = cached._replace(fetched_at=time.time())
+            _store(url, entry, write_data=False)
+            return entry
+        resp.raise_for_status()
+    except requests.RequestException:
+        if cached is None:
+            raise
+        logger.warning("style_assets: revalidation failed for %s, serving stale copy", url, exc_info=True)
+        return cached
+
+    entry = _Entry(
+        data=_encode_reference(resp.content),
+        etag=resp.headers.get("ETag"),
+        last_modified=resp.headers.get("Last-Modified"),
+        fetched_at=time.time(),
+    )
+    _store(url, entry)
+    return entry
+
+
+def get_reference_png(url: str) -> bytes:
+    """Return the RGBA PNG bytes of a style reference image, using the caches."""
+    ttl = settings.STYLE_ASSET_TTL
+    entry = _cached(url)
+    if entry is not None and time.time() - entry.fetched_at < ttl:
+        return entry.data
+    with _url_lock(url):
+        # 기다리는 동안 다른 스레드가 받아 왔으면 그 결과를 쓴다
+        entry = _cached(url)
+        if entry is not None and time.time() - entry.fetched_at < ttl:
+            return entry.data
+        return _fetch(url, entry).data
+
+
+def preload(urls: Iterable[str]) -> None:
+    """Warm the caches (e.g. at worker start); failures are logged and skipped."""
+    for url in urls:
+        if not url:
+            continue
+        try:
+            get_reference_png(url)
+        except Exception:
+            logger.warning("style_assets: preload failed for %s", url, exc_info=True)
@@ -0,0 +1,87 @@
+"""Versioned cache for the active style list served by StyleListView.
+
+The serialized list lives in the shared cache under ``styles:list:<version>``
+and in a per-process copy keyed the same way; Style save/delete signals bump
+``styles:version`` (see image.signals), which retires both at once. The
+version is an atomic INCR counter (seeded from the clock when the key is
+missing, so it never repeats after a cache flush) and provides the ETag;
+the bump time is stored next to it in ``styles:modified`` for Last-Modified.
+"""
+import threading
+import time
+from typing import List, NamedTuple, Optional, Tuple
+
+from django.core.cache import cache
+
+VERSION_KEY = "styles:version"
+MODIFIED_KEY = "styles:modified"
+
+
+class StyleList(NamedTuple):
+    version: int             # INCR counter bumped on every Style change
+    modified: float          # epoch seconds of the last Style change
+    data: List[dict]
+
+    @property
+    def etag(self) -> str:
+        return f'"styles-{self.version}"'
+
+    @property
+    def last_modified(self) -> float:
+        return self.modified
+
+
+_local: Optional[StyleList] = None
+_lock = threading.Lock()
+
+
+def _seed() -> None:
+    # add()는 이미 다른 프로세스가 정한 값을 덮어쓰지 않는다. 캐시가 비워진 뒤에도
+    # 예전 버전 번호가 다시 나오지 않도록 시계(ms)에서 시작한다
+    now = time.time()
+    cache.add(VERSION_KEY, int(now * 1000), None)
+    cache.add(MODIFIED_KEY, now, None)
+
+
+def bump_version() -> int:
+    # 같은 밀리초에 두 번 바뀌거나 호스트 시계가 어긋나도 버전이 겹치지 않는다
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        _seed()
+        version = cache.incr(VERSION_KEY)
+    cache.set(MODIFIED_KEY, time.time(), None)
+    return version
+
+
+def _current_version() -> Tuple[int, float]:
+    values = cache.get_many([VERSION_KEY, MODIFIED_KEY])
+    if len(values) < 2:
+        _seed()
+        values = cache.get_many([VERSION_KEY, MODIFIED_KEY])
+    return int(values[VERSION_KEY]), float(values[MODIFIED_KEY])
+
+
+def _build() -> List[dict]:
+    from ..models import Style
+    from ..serializers import StyleSerializer
+    qs = Style.objects.filter(is_active=True).order_by("id")
+    return list(StyleSerializer(qs, many=True).data)
+
+
+def get_style_list() -> StyleList:
+    """One cache read when this process already holds the current version."""
+    global _local
+    version, modified = _current_version()
+    local = _local
+    if local is not None and local.version == version:
+        return local._replace(modified=modified) if local.modified != modified else local
+
+    data_key = f"styles:list:{version}"
+    data = cache.get(data_key)
+    if data is None:
+        data = _build()
+        cache.set(data_key, data)
+    with _lock:
+        _local = StyleList(version, modified, data)
+        return _local
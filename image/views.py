@@ -1,31 +1,73 @@
-import io, mimetypes
+import asyncio
+import io
 from django.conf import settings
+from django.core.files import File
 from django.db import transaction
-from django.http import HttpResponseRedirect, HttpResponseNotFound, StreamingHttpResponse
+from django.http import Http404, HttpResponse, HttpResponseRedirect, HttpResponseNotFound, StreamingHttpResponse
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.views.decorators.http import require_http_methods
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
 from django.shortcuts import get_object_or_404
 from .models import Session, Style, ImageAsset, AIJob, QRCode
 from .serializers import (
-    SessionCreateSerializer, ImageUploadSerializer,
-    FinalizeSerializer, StyleSerializer, SessionListSerializer
+    SessionCreateSerializer, SessionBulkCreateSerializer, ImageUploadSerializer,
+    FinalizeSerializer, StyleSerializer, SessionListSerializer,
+    UploadURLSerializer, UploadCommitSerializer, SessionListFilterSerializer,
+    ChunkedUploadInitSerializer
 )
-from .utils.gcs import upload_fileobj, build_object_name, upload_bytes
-from .utils.images import get_image_size
-from .utils.qr import build_redirect_url
+from .pagination import SessionCursorPagination
+from .utils.export import FORMATS as EXPORT_FORMATS, iter_session_rows, render as render_export
+from .utils.gcs import (
+    build_object_name, upload_bytes,
+    generate_upload_url, get_object_info, download_bytes,
+    build_gcs_path, build_public_url
+)
+from .utils.images import TAIL_BYTES, check_complete, probe_image
+from .utils.ingest import ingest_image
+from .utils.handoff import accepts as handoff_accepts, stash_original
+from .utils.chunked_upload import (
+    ChunkError, append_chunk, create_upload as create_chunked_upload,
+    get_upload as get_chunked_upload, mark_completed as mark_chunked_upload_completed,
+    open_assembled as open_assembled_upload
+)
+from .utils.qr import build_redirect_url, build_qr_image_url, generate_slug
+from .utils.qr_images import CONTENT_TYPES as QR_IMAGE_CONTENT_TYPES, get_qr_image, qr_image_etag
+from .utils.qr_pool import claim_pooled_qr, claim_pooled_qrs, request_replenish_if_low, unique_slugs
+from .utils.redirect_cache import prime_target, resolve_target
+from .utils.style_cache import get_style_list
+from .utils.session_snapshot import get_snapshot as get_session_snapshot, snapshot_etag
 from .tasks import generate_qr_task
-from .tasks import run_ai_generation_task
-from .utils.events import stream_session_events, publish_session_event
+from .tasks import dispatch_ai_job, dispatch_qr_batches
+from .utils.events import stream_session_events, publish_session_event, parse_last_event_id
+from .utils.sse_hub import astream_session_events, get_event_hub
+from .utils.ratelimit import utilization as model_utilization
+from .utils.result_cache import cache_stats as result_cache_stats
 from drf_spectacular.utils import (
     extend_schema, OpenApiParameter, OpenApiTypes, OpenApiResponse, OpenApiExample
 )
 
-def _generate_slug():
-    # 짧고 URL 친화적인 슬러그
-    import secrets, string
-    alphabet = string.ascii_letters + string.digits + "_"
-    return ''.join(secrets.choice(alphabet) for _ in range(9))
+# 서명 URL 업로드 시 세션별 오브젝트 prefix
+_UPLOAD_PREFIXES = {
+    ImageAsset.Kind.ORIGINAL: "original",
+    ImageAsset.Kind.FINAL: "final",
+}
+
+# 이미지 검증 실패(포맷/손상/잘림) 응답 문구. PIL 오류 문구 대신 항상 이것을 쓴다
+_INVALID_IMAGE_MESSAGE = "이미지 파일이 아닙니다."
+# 커밋 시 헤더를 읽으려고 받는 앞부분 크기
+_PROBE_HEAD_BYTES = 64 * 1024
+
+def _qr_payload(qr):
+    return {
+        "slug": qr.slug,
+        "redirect_url": build_redirect_url(qr.slug),
+        "status": qr.status,
+        "qr_image_url": qr.qr_image_public_url or None,
+    }
 
 class SessionCreateView(APIView):
     @extend_schema(
@@ -35,7 +77,7 @@ class SessionCreateView(APIView):
         responses={
             201: OpenApiResponse(
                 response=OpenApiTypes.OBJECT,
-                description="세션이 생성되고 QR 발급 작업이 큐에 등록됩니다."
+                description="세션이 생성됩니다. QR 풀에 여유가 있으면 READY 상태의 QR이 바로 할당되고, 없으면 QR 발급 작업이 큐에 등록됩니다."
             ),
             400: OpenApiResponse(description="유효성 검증 오류")
         },
@@ -49,7 +91,8 @@ class SessionCreateView(APIView):
                     "qr": {
                         "slug": "a1b2c3d4e",
                         "redirect_url": "http://34.50.8.24/s/a1b2c3d4e",
-                        "status": "PENDING"
+                        "status": "READY",
+                        "qr_image_url": "https://storage.googleapis.com/bucket/qr/a1b2c3d4e.png"
                     }
                 }
             )
@@ -59,25 +102,109 @@ class SessionCreateView(APIView):
         s = SessionCreateSerializer(data=request.data)
         s.is_valid(raise_exception=True)
         style = get_object_or_404(Style, id=s.validated_data["style_id"])
+        endpoint_mode = settings.QR_IMAGE_MODE == "endpoint"
         with transaction.atomic():
-            qr = QRCode.objects.create(slug=_generate_slug())
+            if endpoint_mode:
+                # QR 이미지는 /api/qr/<slug>.png 에서 바로 렌더링되므로 업로드/대기 없음
+                slug = generate_slug()
+                qr = QRCode.objects.create(
+                    slug=slug,
+                    status=QRCode.Status.READY,
+                    qr_image_public_url=build_qr_image_url(slug)
+                )
+            else:
+                # 미리 만들어 둔 READY QR을 우선 사용, 풀이 비었으면 새로 생성
+                qr = claim_pooled_qr()
+                if qr is None:
+                    qr = QRCode.objects.create(slug=generate_slug())
             session = Session.objects.create(
                 style=style,
                 status=Session.Status.CREATED,
                 qr=qr
             )
-        # QR 이미지는 비동기로 생성
-        generate_qr_task.delay(qr.id)
+        if qr.status != QRCode.Status.READY:
+            # QR 이미지는 비동기로 생성
+            generate_qr_task.delay(qr.id)
+        if not endpoint_mode:
+            request_replenish_if_low()
 
         data = {
             "session_uuid": str(session.uuid),
             "status": session.status,
-            "qr": {
-                "slug": qr.slug,
-                "redirect_url": build_redirect_url(qr.slug),
-                "status": qr.status,
-                # 이미지 URL은 아직 없을 수 있음
-            }
+            # qr_image_url은 풀에서 가져왔거나 endpoint 모드인 경우에만 바로 존재
+            "qr": _qr_payload(qr)
+        }
+        return Response(data, status=status.HTTP_201_CREATED)
+
+class SessionBulkCreateView(APIView):
+    @extend_schema(
+        tags=["Session"],
+        summary="세션 일괄 생성 (여러 부스 사전 준비)",
+        description="한 번의 요청으로 같은 스타일의 세션 N개와 QR을 만듭니다. "
+                    "QR 풀에 남은 코드를 먼저 쓰고, 나머지는 묶음 단위 Celery 그룹으로 렌더링합니다.",
+        request=SessionBulkCreateSerializer,
+        responses={
+            201: OpenApiResponse(
+                response=OpenApiTypes.OBJECT,
+                description="생성된 세션 목록",
+                examples=[
+                    OpenApiExample(
+                        name="bulk-create",
+                        response_only=True,
+                        value={
+                            "count": 2,
+                            "sessions": [
+                                {
+                                    "session_uuid": "c1f9c3d6-2a1b-4a1b-9d1c-2f5f7d3a0c1e",
+                                    "status": "CREATED",
+                                    "qr": {"slug": "a1b2c3d4e", "redirect_url": "http://34.50.8.24/s/a1b2c3d4e", "status": "READY", "qr_image_url": "https://storage.googleapis.com/bucket/qr/a1b2c3d4e.png"}
+                                },
+                                {
+                                    "session_uuid": "0d3c4b2a-1f2e-4d5c-8b7a-6f5e4d3c2b1a",
+                                    "status": "CREATED",
+                                    "qr": {"slug": "Zx9_k2LmQ", "redirect_url": "http://34.50.8.24/s/Zx9_k2LmQ", "status": "PENDING", "qr_image_url": None}
+                                }
+                            ]
+                        }
+                    )
+                ]
+            ),
+            400: OpenApiResponse(description="유효성 검증 오류")
+        }
+    )
+    def post(self, request):
+        s = SessionBulkCreateSerializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        style = get_object_or_404(Style, id=s.validated_data["style_id"])
+        count = s.validated_data["count"]
+        endpoint_mode = settings.QR_IMAGE_MODE == "endpoint"
+
+        with transaction.atomic():
+            qrs = [] if endpoint_mode else claim_pooled_qrs(count)
+            slugs = unique_slugs(count - len(qrs))
+            if endpoint_mode:
+                new_qrs = [
+                    QRCode(slug=slug, status=QRCode.Status.READY, qr_image_public_url=build_qr_image_url(slug))
+                    for slug in slugs
+                ]
+            else:
+                new_qrs = [QRCode(slug=slug) for slug in slugs]
+            qrs += QRCode.objects.bulk_create(new_qrs)
+            sessions = Session.objects.bulk_create([
+                Session(style=style, status=Session.Status.CREATED, qr=qr) for qr in qrs
+            ])
+            pending_ids = [qr.id for qr in qrs if qr.status != QRCode.Status.READY]
+            # 커밋 후 묶음 단위로 렌더링 (generate_qr_batch_task 그룹)
+            transaction.on_commit(lambda: dispatch_qr_batches(pending_ids))
+        if not endpoint_mode:
+            request_replenish_if_low()
+
+        data = {
+            "count": len(sessions),
+            "sessions": [
+                {"session_uuid": str(session.uuid), "status": session.status, "qr": _qr_payload(session.qr)}
+                for session in sessions
+            ]
         }
         return Response(data, status=status.HTTP_201_CREATED)
 
@@ -109,32 +236,35 @@ class SessionDetailView(APIView):
                     )
                 ]
             ),
+            304: OpenApiResponse(description="If-None-Match 와 같은 버전 (변경 없음)"),
             404: OpenApiResponse(description="세션 없음")
         }
     )
     def get(self, request, session_uuid):
-        session = get_object_or_404(Session, uuid=session_uuid)
-        qr = session.qr
-        qr_obj = None
-        if qr:
-            qr_obj = {
-                "slug": qr.slug,
-                "redirect_url": build_redirect_url(qr.slug),
-                "status": qr.status,
-                "qr_image_url": qr.qr_image_public_url or None
-            }
-        return Response({
-            "session_uuid": str(session.uuid),
-            "status": session.status,
-            "qr": qr_obj
-        })
+        # Redis 스냅샷 한 번 읽기로 응답, 없을 때만 DB 조회 (utils/session_snapshot)
+        snapshot = get_session_snapshot(str(session_uuid))
+        if snapshot is None:
+            raise Http404("Session not found")
+        version, data = snapshot
+        etag = snapshot_etag(str(session_uuid), version)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(data, headers=headers)
+
+def _last_event_id(request):
+    # EventSource는 재연결 시 Last-Event-ID 헤더를 보낸다. 폴리필용으로 쿼리도 허용
+    return parse_last_event_id(request.headers.get("Last-Event-ID") or request.GET.get("last_event_id"))
 
 class SessionEventsView(APIView):
     @extend_schema(
         tags=["Session"],
         summary="세션 SSE 이벤트 스트림",
+        description="재연결 시 Last-Event-ID 이후 이벤트를 재전송하며, 처음 연결한 클라이언트는 최신 이벤트(현재 상태)를 즉시 받습니다.",
         parameters=[
-            OpenApiParameter(name="session_uuid", location=OpenApiParameter.PATH, type=str, description="세션 UUID")
+            OpenApiParameter(name="session_uuid", location=OpenApiParameter.PATH, type=str, description="세션 UUID"),
+            OpenApiParameter(name="Last-Event-ID", location=OpenApiParameter.HEADER, type=str, required=False, description="마지막으로 받은 이벤트 id"),
+            OpenApiParameter(name="last_event_id", location=OpenApiParameter.QUERY, type=str, required=False, description="Last-Event-ID 헤더 대체용")
         ],
         responses={
             200: OpenApiResponse(
@@ -174,8 +304,10 @@ class SessionEventsView(APIView):
         # 존재 확인 후 SSE 연결
         get_object_or_404(Session, uuid=session_uuid)
 
+        last_event_id = _last_event_id(request)
+
         def event_stream():
-            for chunk in stream_session_events(str(session_uuid)):
+            for chunk in stream_session_events(str(session_uuid), last_event_id=last_event_id):
                 yield chunk
 
         response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
@@ -183,6 +315,25 @@ class SessionEventsView(APIView):
         response["X-Accel-Buffering"] = "no"
         return response
 
+async def session_events_async(request, session_uuid):
+    """ASGI 전용 SSE 엔드포인트 (SSE_ASYNC=True 일 때 SessionEventsView 대신 라우팅).
+
+    워커 스레드를 점유하지 않고, 프로세스당 하나의 Redis 패턴 구독을 공유한다.
+    """
+    if not await Session.objects.filter(uuid=session_uuid).aexists():
+        return HttpResponseNotFound("Session not found")
+    try:
+        # Redis 구독이 안 잡히면 스트림을 열어 둔 채 매달리지 않고 바로 실패
+        await get_event_hub().wait_ready()
+    except asyncio.TimeoutError:
+        return HttpResponse("Event stream unavailable", status=503, headers={"Retry-After": "3"})
+
+    stream = astream_session_events(str(session_uuid), last_event_id=_last_event_id(request))
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
 class QRStatusView(APIView):
     @extend_schema(
         tags=["QR"],
@@ -221,6 +372,23 @@ class QRStatusView(APIView):
             "target_url": qr.target_url or None
         })
 
+@require_http_methods(["GET", "HEAD"])
+def qr_image(request, slug: str, fmt: str):
+    """슬러그로부터 QR 이미지를 바로 렌더링 (PNG/SVG). 결과는 불변이므로 CDN이 캐싱한다."""
+    # 없는 슬러그는 ETag가 맞아도 404 (존재 여부는 리다이렉트 캐시로 확인)
+    exists, _ = resolve_target(slug)
+    if not exists:
+        return HttpResponseNotFound("QR not found")
+    etag = qr_image_etag(slug, fmt)
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponse(status=304)
+    else:
+        data, etag = get_qr_image(slug, fmt)
+        response = HttpResponse(data, content_type=QR_IMAGE_CONTENT_TYPES[fmt])
+    response["ETag"] = etag
+    response["Cache-Control"] = f"public, max-age={settings.QR_IMAGE_MAX_AGE}, immutable"
+    return response
+
 class ImageUploadView(APIView):
     @extend_schema(
         tags=["Image"],
@@ -261,53 +429,170 @@ class ImageUploadView(APIView):
         s.is_valid(raise_exception=True)
         session = get_object_or_404(Session, uuid=s.validated_data["session_uuid"])
         image_file = s.validated_data["image_file"]
+        public_url = _ingest_original(session, image_file, image_file.name)
 
-        # 업로드
-        object_name = build_object_name("original", image_file.name)
-        content_type = image_file.content_type or mimetypes.guess_type(image_file.name)[0] or "application/octet-stream"
-        gcs_path, public_url = upload_fileobj(image_file, object_name, content_type)
-
-        width, height = get_image_size(image_file)
-
-        ImageAsset.objects.create(
-            session=session,
-            kind=ImageAsset.Kind.ORIGINAL,
-            gcs_path=gcs_path,
-            public_url=public_url,
-            width=width, height=height,
-            mime=content_type,
-            size_bytes=getattr(image_file, "size", None)
-        )
+        return Response({
+            "session_status": session.status,
+            "original_image_url": public_url
+        }, status=status.HTTP_201_CREATED)
 
-        session.status = Session.Status.UPLOADED
-        session.save(update_fields=["status","updated_at"])
-
-        # 업로드 직후 내부 AI 생성 파이프라인 트리거
-        prompt = (getattr(session.style, "prompt", None) or session.style.description or session.style.name or "Transform the photo")
-        job = AIJob.objects.create(
-            session=session,
-            status=AIJob.Status.PENDING,
-            request_payload={
-                "model": "gemini-3-pro-image-preview",
-                "prompt": prompt,
-            }
+def _chunked_upload_enabled():
+    return settings.MOBILE_NETWORK_OPTIMIZATIONS.get("chunked_upload", False)
+
+
+def _chunked_upload_or_404(upload_id):
+    if not _chunked_upload_enabled():
+        raise Http404("Chunked uploads are disabled")
+    upload = get_chunked_upload(upload_id)
+    if upload is None:
+        raise Http404("Upload not found or expired")
+    return upload
+
+
+def _chunked_upload_status(upload):
+    return {
+        "upload_id": upload["upload_id"],
+        "offset": upload["offset"],
+        "total_size": upload["total_size"],
+        "completed": bool(upload.get("result")),
+    }
+
+
+class ChunkedUploadInitView(APIView):
+    @extend_schema(
+        tags=["Image"],
+        summary="청크 업로드 시작 (LTE 등 불안정한 네트워크용)",
+        description="upload_id를 받은 뒤 chunk_size 단위로 PUT 합니다. 연결이 끊기면 GET으로 offset을 확인하고 그 지점부터 이어서 보냅니다.",
+        request=ChunkedUploadInitSerializer,
+        responses={
+            201: OpenApiResponse(
+                response=OpenApiTypes.OBJECT,
+                description="업로드 세션 생성",
+                examples=[
+                    OpenApiExample(
+                        name="chunked-init",
+                        response_only=True,
+                        value={"upload_id": "9f0c2b7e4d1a4e3f8b6c5d4e3f2a1b0c", "offset": 0, "total_size": 4821733, "completed": False, "chunk_size": 1048576}
+                    )
+                ]
+            ),
+            400: OpenApiResponse(description="유효성 검증 오류"),
+            404: OpenApiResponse(description="세션 없음 또는 청크 업로드 비활성화")
+        }
+    )
+    def post(self, request):
+        if not _chunked_upload_enabled():
+            raise Http404("Chunked uploads are disabled")
+        s = ChunkedUploadInitSerializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        session = get_object_or_404(Session, uuid=s.validated_data["session_uuid"])
+        upload = create_chunked_upload(
+            str(session.uuid),
+            s.validated_data["filename"],
+            s.validated_data["content_type"],
+            s.validated_data["total_size"],
         )
+        upload["offset"] = 0
+        data = _chunked_upload_status(upload)
+        data["chunk_size"] = settings.CHUNKED_UPLOAD_CHUNK_SIZE
+        return Response(data, status=status.HTTP_201_CREATED)
 
-        # 상태 전이 및 이벤트 알림
-        session.status = Session.Status.AI_REQUESTED
-        session.save(update_fields=["status","updated_at"])
-        publish_session_event(str(session.uuid), "progress", {
-            "status": session.status,
-            "message": "AI generation requested"
-        })
 
-        # 비동기 AI 작업 실행
-        run_ai_generation_task.delay(job.id)
+class ChunkedUploadView(APIView):
+    @extend_schema(
+        tags=["Image"],
+        summary="청크 업로드 진행 상태 (재개 지점) 조회",
+        responses={200: OpenApiTypes.OBJECT, 404: OpenApiResponse(description="업로드 없음/만료")}
+    )
+    def get(self, request, upload_id):
+        return Response(_chunked_upload_status(_chunked_upload_or_404(upload_id)))
+
+    @extend_schema(
+        tags=["Image"],
+        summary="청크 전송",
+        description="본문은 청크 원본 바이트(application/octet-stream). "
+                    "쿼리 offset은 현재 업로드된 크기와 같아야 하며, X-Chunk-SHA256 헤더에 청크의 SHA-256(hex)을 보냅니다.",
+        parameters=[
+            OpenApiParameter(name="offset", type=int, required=True, description="이 청크의 시작 위치"),
+            OpenApiParameter(name="X-Chunk-SHA256", location=OpenApiParameter.HEADER, type=str, required=True, description="청크 SHA-256 (hex)"),
+        ],
+        request={"application/octet-stream": OpenApiTypes.BINARY},
+        responses={
+            200: OpenApiResponse(response=OpenApiTypes.OBJECT, description="저장 후 다음 offset"),
+            400: OpenApiResponse(description="체크섬 불일치/잘린 청크 (offset 그대로, 같은 청크 재전송)"),
+            409: OpenApiResponse(description="offset 불일치 (응답의 offset부터 재전송)")
+        }
+    )
+    def put(self, request, upload_id):
+        upload = _chunked_upload_or_404(upload_id)
+        checksum = request.headers.get("X-Chunk-SHA256", "")
+        try:
+            offset = int(request.query_params["offset"])
+            length = int(request.headers.get("Content-Length") or 0)
+        except (KeyError, ValueError):
+            raise ValidationError({"offset": "offset query parameter and Content-Length are required"})
+        if not checksum:
+            raise ValidationError({"X-Chunk-SHA256": "This header is required"})
+
+        try:
+            new_offset = append_chunk(upload_id, offset, request.stream, length, checksum)
+        except ChunkError as e:
+            return Response({"detail": str(e), "offset": e.offset}, status=e.status_code)
+        upload["offset"] = new_offset
+        return Response(_chunked_upload_status(upload))
+
+
+class ChunkedUploadCompleteView(APIView):
+    @extend_schema(
+        tags=["Image"],
+        summary="청크 업로드 완료 (원본 이미지 업로드와 동일하게 처리)",
+        request=None,
+        responses={
+            201: OpenApiResponse(
+                response=OpenApiTypes.OBJECT,
+                description="업로드 성공 (재시도해도 같은 결과)",
+                examples=[
+                    OpenApiExample(
+                        name="chunked-complete",
+                        response_only=True,
+                        value={
+                            "session_status": "AI_REQUESTED",
+                            "original_image_url": "https://storage.googleapis.com/bucket/original/abc.png"
+                        }
+                    )
+                ]
+            ),
+            404: OpenApiResponse(description="업로드 없음/만료"),
+            409: OpenApiResponse(description="아직 모든 바이트가 도착하지 않음")
+        }
+    )
+    def post(self, request, upload_id):
+        upload = _chunked_upload_or_404(upload_id)
+        if upload.get("result"):
+            return Response(upload["result"], status=status.HTTP_201_CREATED)
+        if upload["offset"] != upload["total_size"]:
+            return Response(
+                {"detail": "Upload is incomplete", "offset": upload["offset"]},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        session = get_object_or_404(Session, uuid=upload["session_uuid"])
+        with open_assembled_upload(upload_id) as f:
+            if f is None:
+                # 동시에 들어온 다른 complete 요청이 이미 처리함 (결과 없이 스풀만 사라졌으면 만료)
+                upload = _chunked_upload_or_404(upload_id)
+                if not upload.get("result"):
+                    raise Http404("Upload not found or expired")
+                return Response(upload["result"], status=status.HTTP_201_CREATED)
+            image_file = File(f, name=upload["filename"])
+            public_url = _ingest_original(session, image_file, upload["filename"], field="upload_id")
+            result = {
+                "session_status": session.status,
+                "original_image_url": public_url
+            }
+            mark_chunked_upload_completed(upload_id, result)
+        return Response(result, status=status.HTTP_201_CREATED)
 
-        return Response({
-            "session_status": session.status,
-            "original_image_url": public_url
-        }, status=status.HTTP_201_CREATED)
 
 class FinalizeView(APIView):
     @extend_schema(
@@ -354,63 +639,416 @@ class FinalizeView(APIView):
         session = get_object_or_404(Session, uuid=s.validated_data["session_uuid"])
         edited_image = s.validated_data["edited_image"]
 
-        object_name = build_object_name("final", edited_image.name)
-        content_type = edited_image.content_type or mimetypes.guess_type(edited_image.name)[0] or "image/png"
-        gcs_path, public_url = upload_fileobj(edited_image, object_name, content_type)
-
-        # 최종 이미지는 세션당 1개 제약(모델 제약으로 보호)
-        ImageAsset.objects.create(
-            session=session,
-            kind=ImageAsset.Kind.FINAL,
-            gcs_path=gcs_path,
-            public_url=public_url,
-            mime=content_type,
-            size_bytes=getattr(edited_image, "size", None)
+        ingested = _ingest_or_400(edited_image, build_object_name("final", edited_image.name), "edited_image")
+        _register_final(
+            session, ingested.gcs_path, ingested.public_url,
+            mime=ingested.mime,
+            size_bytes=ingested.size_bytes,
+            width=ingested.width, height=ingested.height,
+            orientation=ingested.orientation,
+            sha256=ingested.sha256
+        )
+        return Response(_finalize_response(session, ingested.public_url), status=status.HTTP_201_CREATED)
+
+
+def _ingest_or_400(fobj, object_name, field, keep_data=False):
+    """헤더 확인 + 업로드/해시를 한 번에 (utils/ingest). 이미지가 아니면 400."""
+    try:
+        return ingest_image(fobj, object_name, keep_data=keep_data)
+    except ValueError:
+        # PIL 오류 문구는 응답에 내보내지 않는다
+        raise ValidationError({field: _INVALID_IMAGE_MESSAGE})
+
+
+def _ingest_original(session, fobj, filename, field="image_file"):
+    """원본 파일을 업로드하고 AI 파이프라인까지 연결 (단일 업로드/청크 업로드 공용). return: public_url"""
+    # AI 워커가 공개 URL에서 다시 내려받지 않도록 원본 바이트를 넘겨둔다.
+    # 바이트는 업로드하며 모으므로 파일을 다시 읽지 않는다
+    keep_data = handoff_accepts(getattr(fobj, "size", None))
+    ingested = _ingest_or_400(fobj, build_object_name("original", filename), field, keep_data=keep_data)
+    if ingested.data is not None:
+        stash_original(str(session.uuid), ingested.data)
+
+    _register_original(
+        session, ingested.gcs_path, ingested.public_url,
+        width=ingested.width, height=ingested.height,
+        mime=ingested.mime,
+        size_bytes=ingested.size_bytes,
+        orientation=ingested.orientation,
+        sha256=ingested.sha256
+    )
+    return ingested.public_url
+
+
+def _register_original(session, gcs_path, public_url, *, width, height, mime, size_bytes, orientation=None, sha256=""):
+    """원본 이미지 자산을 기록하고 AI 생성 파이프라인을 트리거."""
+    ImageAsset.objects.create(
+        session=session,
+        kind=ImageAsset.Kind.ORIGINAL,
+        gcs_path=gcs_path,
+        public_url=public_url,
+        width=width, height=height,
+        mime=mime,
+        size_bytes=size_bytes,
+        orientation=orientation,
+        sha256=sha256
+    )
+
+    session.status = Session.Status.UPLOADED
+    session.save(update_fields=["status","updated_at"])
+
+    # 업로드 직후 내부 AI 생성 파이프라인 트리거
+    prompt = (getattr(session.style, "prompt", None) or session.style.description or session.style.name or "Transform the photo")
+    job = AIJob.objects.create(
+        session=session,
+        status=AIJob.Status.PENDING,
+        request_payload={
+            "model": "gemini-3-pro-image-preview",
+            "prompt": prompt,
+        }
+    )
+
+    # 상태 전이 및 이벤트 알림
+    session.status = Session.Status.AI_REQUESTED
+    session.save(update_fields=["status","updated_at"])
+    publish_session_event(str(session.uuid), "progress", {
+        "status": session.status,
+        "message": "AI generation requested"
+    })
+
+    # 비동기 AI 작업 실행 (Celery 또는 asyncio 러너). 커밋 뷰의 트랜잭션 안에서 불리면 커밋 후에 보낸다
+    transaction.on_commit(lambda: dispatch_ai_job(job.id))
+    return job
+
+
+def _register_final(session, gcs_path, public_url, *, mime, size_bytes, width=None, height=None, orientation=None, sha256=""):
+    """최종 이미지 자산을 기록하고 QR 타깃을 연결."""
+    # 최종 이미지는 세션당 1개 제약(모델 제약으로 보호)
+    ImageAsset.objects.create(
+        session=session,
+        kind=ImageAsset.Kind.FINAL,
+        gcs_path=gcs_path,
+        public_url=public_url,
+        width=width, height=height,
+        mime=mime,
+        size_bytes=size_bytes,
+        orientation=orientation,
+        sha256=sha256
+    )
+
+    # QR target 연결
+    if session.qr:
+        session.qr.target_url = public_url
+        # 만약 QR 이미지가 아직 없거나 실패했다면 여기서 동기 생성 폴백도 가능:
+        # if session.qr.status != QRCode.Status.READY:
+        #     from .tasks import generate_qr_task
+        #     generate_qr_task(qr_id=session.qr.id)
+        session.qr.save(update_fields=["target_url","updated_at"])
+        # 스캔 폭주 전에 리다이렉트 캐시를 채워 둔다 (signal의 invalidate 뒤에 실행됨)
+        slug = session.qr.slug
+        transaction.on_commit(lambda: prime_target(slug, public_url))
+
+    session.status = Session.Status.FINALIZED
+    session.save(update_fields=["status","updated_at"])
+
+
+def _finalize_response(session, public_url):
+    return {
+        "final_image": {"public_url": public_url},
+        "qr": {
+            "redirect_url": build_redirect_url(session.qr.slug) if session.qr else None,
+            "qr_image_url": session.qr.qr_image_public_url if session.qr else None
+        },
+        "session_status": session.status
+    }
+
+
+def _probe_uploaded_image(object_name, size):
+    """업로드된 오브젝트의 앞부분과 끝 TAIL_BYTES만 받아 크기/EXIF 방향과 잘림 여부를 확인. 이미지가 아니면 400."""
+    head = download_bytes(object_name, start=0, end=_PROBE_HEAD_BYTES - 1)
+    if head[8:12] == b"WEBP" and size > len(head):
+        # PIL은 WebP 컨테이너 전체가 있어야 열 수 있다 (WebP는 대개 작다)
+        head = download_bytes(object_name)
+    try:
+        probe = probe_image(io.BytesIO(head), complete=False)
+        if size <= len(head):
+            tail = head[-TAIL_BYTES:]
+        else:
+            tail = download_bytes(object_name, start=size - TAIL_BYTES, end=size - 1)
+        check_complete(probe.format, head, tail, size)
+    except ValueError:
+        raise ValidationError({"object_name": _INVALID_IMAGE_MESSAGE})
+    return probe
+
+
+def _committed_asset(session, kind, gcs_path):
+    """같은 오브젝트로 이미 커밋된 자산. 커밋 재시도에는 새로 만들지 않고 이것을 돌려준다."""
+    return ImageAsset.objects.filter(session=session, kind=kind, gcs_path=gcs_path).first()
+
+
+def _verify_committed_object(session, kind, object_name):
+    """커밋 요청의 오브젝트가 이 세션에 발급된 것이고 실제로 업로드되었는지 확인."""
+    expected_prefix = f"{_UPLOAD_PREFIXES[kind]}/{session.uuid}/"
+    if not object_name.startswith(expected_prefix) or ".." in object_name:
+        raise ValidationError({"object_name": "이 세션에 발급된 업로드 경로가 아닙니다."})
+    info = get_object_info(object_name)
+    if info is None:
+        raise ValidationError({"object_name": "업로드된 오브젝트가 없습니다."})
+    if not (info["content_type"] or "").startswith("image/"):
+        raise ValidationError({"object_name": _INVALID_IMAGE_MESSAGE})
+    if info["size"] is None or info["size"] > settings.UPLOAD_MAX_BYTES:
+        raise ValidationError({"object_name": "허용 크기를 초과했습니다."})
+    return info
+
+
+class ImageUploadURLView(APIView):
+    @extend_schema(
+        tags=["Image"],
+        summary="GCS 직접 업로드용 서명 URL 발급",
+        description="클라이언트는 응답의 upload_url로 headers와 함께 PUT 업로드한 뒤 commit API를 호출합니다.",
+        request=UploadURLSerializer,
+        responses={
+            201: OpenApiResponse(
+                response=OpenApiTypes.OBJECT,
+                description="서명 URL 발급 성공",
+                examples=[
+                    OpenApiExample(
+                        name="upload-url-success",
+                        response_only=True,
+                        value={
+                            "upload_url": "https://storage.googleapis.com/bucket/original/c1f9.../abc.jpg?X-Goog-Signature=...",
+                            "method": "PUT",
+                            "headers": {"Content-Type": "image/jpeg", "x-goog-content-length-range": "0,20971520"},
+                            "object_name": "original/c1f9c3d6-2a1b-4a1b-9d1c-2f5f7d3a0c1e/abc.jpg",
+                            "expires_in": 900
+                        }
+                    )
+                ]
+            ),
+            400: OpenApiResponse(description="유효성 검증 오류"),
+            404: OpenApiResponse(description="세션 없음")
+        }
+    )
+    def post(self, request):
+        s = UploadURLSerializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        session = get_object_or_404(Session, uuid=s.validated_data["session_uuid"])
+        kind = s.validated_data["kind"]
+        content_type = s.validated_data["content_type"]
+
+        object_name = build_object_name(f"{_UPLOAD_PREFIXES[kind]}/{session.uuid}", s.validated_data["filename"])
+        expires_in = settings.GCS_SIGNED_URL_EXPIRATION
+        upload_url, headers = generate_upload_url(
+            object_name, content_type,
+            max_bytes=settings.UPLOAD_MAX_BYTES,
+            expires_seconds=expires_in
         )
+        return Response({
+            "upload_url": upload_url,
+            "method": "PUT",
+            "headers": headers,
+            "object_name": object_name,
+            "expires_in": expires_in
+        }, status=status.HTTP_201_CREATED)
 
-        # QR target 연결
-        if session.qr:
-            session.qr.target_url = public_url
-            # 만약 QR 이미지가 아직 없거나 실패했다면 여기서 동기 생성 폴백도 가능:
-            # if session.qr.status != QRCode.Status.READY:
-            #     from .tasks import generate_qr_task
-            #     generate_qr_task(qr_id=session.qr.id)
-            session.qr.save(update_fields=["target_url","updated_at"])
+class ImageUploadCommitView(APIView):
+    @extend_schema(
+        tags=["Image"],
+        summary="원본 이미지 직접 업로드 커밋",
+        request=UploadCommitSerializer,
+        responses={
+            201: OpenApiResponse(
+                response=OpenApiTypes.OBJECT,
+                description="커밋 성공 (ImageUploadView와 동일한 응답)"
+            ),
+            200: OpenApiResponse(description="이미 커밋된 오브젝트 (재시도)"),
+            400: OpenApiResponse(description="오브젝트 없음/검증 실패"),
+            404: OpenApiResponse(description="세션 없음")
+        }
+    )
+    def post(self, request):
+        s = UploadCommitSerializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        session = get_object_or_404(Session, uuid=s.validated_data["session_uuid"])
+        object_name = s.validated_data["object_name"]
+        info = _verify_committed_object(session, ImageAsset.Kind.ORIGINAL, object_name)
 
-        session.status = Session.Status.FINALIZED
-        session.save(update_fields=["status","updated_at"])
+        public_url = build_public_url(object_name)
+        gcs_path = build_gcs_path(object_name)
+        probe = _probe_uploaded_image(object_name, info["size"])
+        with transaction.atomic():
+            # 같은 세션의 동시 재시도를 직렬화해 원본/AI 작업이 두 번 만들어지지 않게 한다
+            session = Session.objects.select_for_update().get(pk=session.pk)
+            if _committed_asset(session, ImageAsset.Kind.ORIGINAL, gcs_path):
+                return Response({
+                    "session_status": session.status,
+                    "original_image_url": public_url
+                }, status=status.HTTP_200_OK)
+            _register_original(
+                session, gcs_path, public_url,
+                width=probe.width,
+                height=probe.height,
+                mime=probe.mime,
+                size_bytes=info["size"],
+                orientation=probe.orientation
+            )
 
         return Response({
-            "final_image": {"public_url": public_url},
-            "qr": {
-                "redirect_url": build_redirect_url(session.qr.slug) if session.qr else None,
-                "qr_image_url": session.qr.qr_image_public_url if session.qr else None
-            },
-            "session_status": session.status
+            "session_status": session.status,
+            "original_image_url": public_url
         }, status=status.HTTP_201_CREATED)
 
+class FinalizeCommitView(APIView):
+    @extend_schema(
+        tags=["Image"],
+        summary="최종 이미지 직접 업로드 커밋 및 QR 타깃 연결",
+        request=UploadCommitSerializer,
+        responses={
+            201: OpenApiResponse(
+                response=OpenApiTypes.OBJECT,
+                description="커밋 성공 (FinalizeView와 동일한 응답)"
+            ),
+            200: OpenApiResponse(description="이미 커밋된 오브젝트 (재시도)"),
+            400: OpenApiResponse(description="오브젝트 없음/검증 실패"),
+            409: OpenApiResponse(description="다른 최종 이미지가 이미 등록됨"),
+            404: OpenApiResponse(description="세션 없음")
+        }
+    )
+    def post(self, request):
+        s = UploadCommitSerializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        session = get_object_or_404(Session, uuid=s.validated_data["session_uuid"])
+        object_name = s.validated_data["object_name"]
+        info = _verify_committed_object(session, ImageAsset.Kind.FINAL, object_name)
+
+        public_url = build_public_url(object_name)
+        gcs_path = build_gcs_path(object_name)
+        probe = _probe_uploaded_image(object_name, info["size"])
+        with transaction.atomic():
+            session = Session.objects.select_for_update().get(pk=session.pk)
+            existing = ImageAsset.objects.filter(session=session, kind=ImageAsset.Kind.FINAL).first()
+            if existing is not None:
+                if existing.gcs_path != gcs_path:
+                    return Response({"detail": "이미 최종 이미지가 등록된 세션입니다."}, status=status.HTTP_409_CONFLICT)
+                # 같은 오브젝트의 커밋 재시도
+                return Response(_finalize_response(session, existing.public_url), status=status.HTTP_200_OK)
+            _register_final(
+                session, gcs_path, public_url,
+                mime=probe.mime,
+                size_bytes=info["size"],
+                width=probe.width,
+                height=probe.height,
+                orientation=probe.orientation
+            )
+        return Response(_finalize_response(session, public_url), status=status.HTTP_201_CREATED)
+
 
+@require_http_methods(["GET", "HEAD"])
 def redirect_by_slug(request, slug: str):
-    qr = QRCode.objects.filter(slug=slug).first()
-    if not qr:
-        return HttpResponseNotFound("QR not found")
-    if qr.target_url:
-        return HttpResponseRedirect(qr.target_url)
+    # 로컬 TTL 캐시 → Redis → DB 순으로 조회 (utils/redirect_cache)
+    exists, target_url = resolve_target(slug)
+    if not exists:
+        response = HttpResponseNotFound("QR not found")
+        response["Cache-Control"] = f"public, max-age={settings.REDIRECT_NEGATIVE_TTL}"
+        return response
+    if target_url:
+        response = HttpResponseRedirect(target_url)
+        response["Cache-Control"] = f"public, max-age={settings.REDIRECT_MAX_AGE}"
+        return response
     # 아직 타깃이 없으면 대기 페이지(간단 404 메시지로 대체)
-    return HttpResponseNotFound("Your image is not ready yet.")
+    response = HttpResponseNotFound("Your image is not ready yet.")
+    response["Cache-Control"] = f"public, max-age={settings.REDIRECT_NEGATIVE_TTL}"
+    return response
 
 class SessionListView(APIView):
     @extend_schema(
         tags=["Session"],
         summary="세션 목록 조회",
+        description="updated_at 내림차순 커서 페이지네이션. 다음 페이지는 응답의 next URL을 그대로 호출합니다.",
+        parameters=[
+            SessionListFilterSerializer,
+            OpenApiParameter(name="cursor", type=str, description="이전 응답의 next/previous에 포함된 커서"),
+            OpenApiParameter(name="page_size", type=int, description="페이지 크기 (최대 200)"),
+            OpenApiParameter(name="include_count", type=bool, description="전체 개수 포함 여부 (잠시 캐싱된 값)"),
+        ],
         responses={
-            200: SessionListSerializer(many=True)
+            200: OpenApiResponse(
+                response=OpenApiTypes.OBJECT,
+                description="세션 목록 페이지",
+                examples=[
+                    OpenApiExample(
+                        name="sessions",
+                        response_only=True,
+                        value={
+                            "next": "http://34.50.8.24/api/sessions?cursor=cD0yMDI2LTEwLTE3",
+                            "previous": None,
+                            "count": 1532,
+                            "results": [
+                                {
+                                    "uuid": "2b1f2c0e-8a0c-4a76-9d1f-0c1f5c6b1a11",
+                                    "style": "cartoon_v1",
+                                    "status": "FINALIZED",
+                                    "created_at": "2026-10-17T10:00:00Z",
+                                    "updated_at": "2026-10-17T10:03:12Z",
+                                    "qr": {"slug": "a1b2c3d4e", "target_url": "https://storage.googleapis.com/bucket/final/abc.png"}
+                                }
+                            ]
+                        }
+                    )
+                ]
+            ),
+            400: OpenApiResponse(description="필터 유효성 검증 오류")
         }
     )
     def get(self, request):
-        qs = Session.objects.select_related('style', 'qr').all().order_by('-updated_at')
-        serializer = SessionListSerializer(qs, many=True)
-        return Response(serializer.data)
+        f = SessionListFilterSerializer(data=request.query_params)
+        f.is_valid(raise_exception=True)
+        filters = f.validated_data
+
+        qs = Session.objects.select_related('style', 'qr')
+        if filters.get("status"):
+            qs = qs.filter(status__in=filters["status"])
+        if filters.get("style"):
+            qs = qs.filter(style__code=filters["style"])
+        if filters.get("updated_after"):
+            qs = qs.filter(updated_at__gte=filters["updated_after"])
+        if filters.get("updated_before"):
+            qs = qs.filter(updated_at__lt=filters["updated_before"])
+
+        paginator = SessionCursorPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        serializer = SessionListSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+class SessionExportView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        tags=["Session"],
+        summary="세션 전체 내보내기 (NDJSON/CSV 스트리밍, 관리자 전용)",
+        description="세션·이미지·AI 작업 상태를 서버 측 커서로 읽어 한 줄씩 스트리밍합니다. 정산/인쇄 집계용.",
+        parameters=[
+            SessionListFilterSerializer,
+            OpenApiParameter(name="export_format", type=str, enum=["ndjson", "csv"], description="출력 형식 (기본 ndjson)"),
+        ],
+        responses={
+            200: OpenApiResponse(description="NDJSON 또는 CSV 스트림"),
+            400: OpenApiResponse(description="필터 유효성 검증 오류"),
+            403: OpenApiResponse(description="관리자 권한 필요")
+        }
+    )
+    def get(self, request):
+        f = SessionListFilterSerializer(data=request.query_params)
+        f.is_valid(raise_exception=True)
+        fmt = request.query_params.get("export_format", "ndjson")
+        if fmt not in EXPORT_FORMATS:
+            raise ValidationError({"export_format": f"Must be one of: {', '.join(EXPORT_FORMATS)}"})
+
+        rows = iter_session_rows(f.validated_data)
+        response = StreamingHttpResponse(render_export(rows, fmt), content_type=EXPORT_FORMATS[fmt])
+        response["Content-Disposition"] = f'attachment; filename="sessions.{fmt}"'
+        response["X-Accel-Buffering"] = "no"
+        return response
 
 class StyleListView(APIView):
     @extend_schema(
@@ -430,9 +1068,59 @@ class StyleListView(APIView):
                         ]
                     )
                 ]
-            )
+            ),
+            304: OpenApiResponse(description="If-None-Match / If-Modified-Since 와 같은 버전 (변경 없음)")
         }
     )
     def get(self, request):
-        qs = Style.objects.filter(is_active=True).order_by("id")
-        return Response(StyleSerializer(qs, many=True).data)
+        # 스타일 변경 시 signal이 버전을 올린다. 같은 버전이면 메모리 사본 또는 304
+        styles = get_style_list()
+        headers = {
+            "ETag": styles.etag,
+            "Last-Modified": http_date(styles.last_modified),
+            "Cache-Control": f"public, max-age={settings.STYLE_LIST_MAX_AGE}",
+        }
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            not_modified = styles.etag in parse_etags(if_none_match)
+        else:
+            since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+            not_modified = since is not None and int(styles.last_modified) <= since
+        if not_modified:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(styles.data, headers=headers)
+
+class AIUtilizationView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        tags=["AI"],
+        summary="AI 모델 호출 한도 사용률 조회",
+        responses={
+            200: OpenApiResponse(
+                response=OpenApiTypes.OBJECT,
+                description="모델별 토큰/동시 실행 현황 및 결과 캐시 통계",
+                examples=[
+                    OpenApiExample(
+                        name="ai-utilization",
+                        response_only=True,
+                        value={
+                            "models": {
+                                "gemini-3.1-flash-image-preview": {
+                                    "rpm": 60, "burst": 10, "tokens_available": 3.5,
+                                    "concurrency": 8, "in_flight": 6, "concurrency_utilization": 0.75
+                                }
+                            },
+                            "result_cache": {"hits": 12, "misses": 240, "entries": 230}
+                        }
+                    )
+                ]
+            ),
+            403: OpenApiResponse(description="관리자 권한 필요")
+        }
+    )
+    def get(self, request):
+        return Response({
+            "models": model_utilization(),
+            "result_cache": result_cache_stats(),
+        })
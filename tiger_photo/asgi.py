@@ -3,6 +3,11 @@ ASGI config for tiger_photo project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Under ASGI the session SSE endpoint is served by the async view backed by a
+single Redis pattern subscription per process. Run it with, for example::
+
+    gunicorn tiger_photo.asgi:application -k uvicorn.workers.UvicornWorker -w 2
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +17,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tiger_photo.settings')
+os.environ.setdefault('SSE_ASYNC', 'true')
 
 application = get_asgi_application()
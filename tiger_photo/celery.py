@@ -1,6 +1,25 @@
+"""Celery app.
+
+Worker profiles (set CELERY_WORKER_PROFILE before starting a worker):
+
+    # QR rendering: short CPU-bound tasks, kiosks wait on them
+    CELERY_WORKER_PROFILE=qr celery -A tiger_photo worker -n qr@%h
+
+    # AI generation: long I/O-bound tasks, one reserved task per process
+    CELERY_WORKER_PROFILE=ai celery -A tiger_photo worker -n ai@%h
+
+    # Periodic jobs (QR pool replenishment), exactly one per deployment;
+    # also set CELERY_BEAT_ENABLED=true for the web and worker processes
+    celery -A tiger_photo beat
+
+A profile selects the queues the worker consumes plus concurrency and
+prefetch; CLI flags (-Q, -c, --prefetch-multiplier) still take precedence.
+Without a profile the worker consumes every queue, as before.
+"""
 import os
 import platform
 from celery import Celery
+from kombu import Queue
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tiger_photo.settings")
 app = Celery("tiger_photo")
@@ -15,4 +34,28 @@ except Exception:
     # If settings aren't ready yet, skip; CLI flags can still override
     pass
 
+WORKER_PROFILES = {
+    "qr": {
+        "queues": ["qr", "default"],
+        "worker_concurrency": int(os.getenv("QR_WORKER_CONCURRENCY", "4")),
+        "worker_prefetch_multiplier": 4,
+    },
+    "ai": {
+        "queues": ["ai"],
+        "worker_concurrency": int(os.getenv("AI_WORKER_CONCURRENCY", "8")),
+        # acks_late 작업이 한 프로세스에 몰려 대기하지 않도록 하나씩만 예약
+        "worker_prefetch_multiplier": 1,
+        "worker_max_tasks_per_child": int(os.getenv("AI_WORKER_MAX_TASKS_PER_CHILD", "200")),
+    },
+}
+
+# 프로파일 없이 띄운 워커는 모든 큐를 소비 (단일 워커 개발 환경)
+app.conf.task_queues = [Queue("default"), Queue("qr"), Queue("ai")]
+
+_profile_name = os.getenv("CELERY_WORKER_PROFILE")
+if _profile_name:
+    _profile = dict(WORKER_PROFILES[_profile_name])
+    app.conf.task_queues = [Queue(name) for name in _profile.pop("queues")]
+    app.conf.update(**_profile)
+
 app.autodiscover_tasks()
@@ -1,3 +1,5 @@
+import importlib.util
+import json
 import os
 from pathlib import Path
 from urllib.parse import urlparse
@@ -102,6 +104,9 @@ INSTALLED_APPS = [
     # Local apps
     "image",
 ]
+# bench_* 명령과 테스트용 fake 서버 (requirements-dev.txt가 깔린 개발/CI 환경에서만)
+if importlib.util.find_spec("fakeredis") is not None:
+    INSTALLED_APPS.append("benchmarks")
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
@@ -118,9 +123,13 @@ MIDDLEWARE = [
 # DATABASE
 # =============================================================================
 
+# DB_ENGINE=django.db.backends.sqlite3 runs the test suite without Postgres
+# (DB_NAME is then the database file path)
+DB_ENGINE = os.getenv("DB_ENGINE", "django.db.backends.postgresql")
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': DB_ENGINE,
         'NAME': os.getenv("DB_NAME", "tiger_photo_db"),
         'USER': os.getenv("DB_USER", "tiger_photo_user"),
         'PASSWORD': os.getenv("DB_PASSWORD", "default_password"),
@@ -131,6 +140,11 @@ DATABASES = {
         },
     }
 }
+if DB_ENGINE.endswith("sqlite3"):
+    DATABASES['default'] = {
+        'ENGINE': DB_ENGINE,
+        'NAME': os.getenv("DB_NAME", str(BASE_DIR / "db.sqlite3")),
+    }
 
 # =============================================================================
 # INTERNATIONALIZATION
@@ -257,6 +271,7 @@ CORS_ALLOW_HEADERS = [
     'x-requested-with',
     'x-device-id',        # For photobooth identification
     'x-photobooth-version', # For version tracking
+    'x-chunk-sha256',     # Per-chunk checksum for resumable uploads
 ]
 
 # CORS methods for web clients
@@ -327,11 +342,62 @@ CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/1")
 CELERY_TASK_ALWAYS_EAGER = False
 
+# Queue topology: short CPU-bound QR rendering and long I/O-bound AI generation
+# run on separate queues/workers so an AI backlog never delays kiosk QR codes.
+# Worker profiles (concurrency/prefetch per queue) live in tiger_photo/celery.py.
+CELERY_TASK_DEFAULT_QUEUE = "default"
+CELERY_TASK_ROUTES = {
+    "image.tasks.generate_qr_task": {"queue": "qr"},
+    "image.tasks.generate_qr_batch_task": {"queue": "qr"},
+    "image.tasks.replenish_qr_pool": {"queue": "qr"},
+    "image.tasks.run_ai_generation_task": {"queue": "ai"},
+}
+# Periodic jobs: run `celery -A tiger_photo beat` once per deployment and set
+# CELERY_BEAT_ENABLED=true so the features that depend on it switch on.
+CELERY_BEAT_ENABLED = os.getenv("CELERY_BEAT_ENABLED", "false").lower() in ("true", "1", "yes")
+CELERY_BEAT_SCHEDULE = {}
+CELERY_TASK_ANNOTATIONS = {
+    "image.tasks.generate_qr_task": {
+        "soft_time_limit": int(os.getenv("QR_TASK_SOFT_TIME_LIMIT", "20")),
+        "time_limit": int(os.getenv("QR_TASK_TIME_LIMIT", "30")),
+    },
+    "image.tasks.run_ai_generation_task": {
+        # 워커가 죽어도 작업이 유실되지 않도록 완료 후 ack
+        "acks_late": True,
+        "reject_on_worker_lost": True,
+        "soft_time_limit": int(os.getenv("AI_TASK_SOFT_TIME_LIMIT", "240")),
+        "time_limit": int(os.getenv("AI_TASK_TIME_LIMIT", "300")),
+    },
+}
+
 # =============================================================================
 # REDIS CONFIGURATION
 # =============================================================================
 
 REDIS_URL = os.getenv("REDIS_URL", CELERY_BROKER_URL)
+# Per-process connection pool shared by event publishers and SSE subscribers.
+# Each open SSE stream holds one connection, so leave unbounded (0) unless sized for it.
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "0")) or None
+
+# Shared Django cache (style list, QR images, session list counts)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("CACHE_REDIS_URL", REDIS_URL),
+        "KEY_PREFIX": "tiger_photo",
+        "TIMEOUT": int(os.getenv("CACHE_DEFAULT_TIMEOUT", "300")),
+    }
+}
+
+# Serve /api/session/<uuid>/events with the async view. tiger_photo/asgi.py turns
+# this on; WSGI deployments keep the synchronous StreamingHttpResponse view.
+SSE_ASYNC = os.getenv("SSE_ASYNC", "False").lower() in ("true", "1", "yes")
+# How long a new async SSE request waits for the shared Redis subscription before 503
+SSE_HUB_READY_TIMEOUT = float(os.getenv("SSE_HUB_READY_TIMEOUT", "5"))
+
+# Replayable per-session event log (Redis Stream), capped and expired automatically
+SESSION_EVENT_LOG_MAXLEN = int(os.getenv("SESSION_EVENT_LOG_MAXLEN", "100"))
+SESSION_EVENT_LOG_TTL = int(os.getenv("SESSION_EVENT_LOG_TTL", str(24 * 3600)))  # seconds
 
 # =============================================================================
 # APPLICATION SPECIFIC SETTINGS
@@ -343,8 +409,132 @@ _default_gcs_prefix = f"https://storage.googleapis.com/{GCS_BUCKET_NAME}" if GCS
 GCS_PUBLIC_URL_PREFIX = os.getenv("GCS_PUBLIC_URL_PREFIX", _default_gcs_prefix)
 GOOGLE_APPLICATION_CREDENTIALS = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "")
 
+# Direct-to-GCS uploads (signed URL + commit)
+# For local development point STORAGE_EMULATOR_HOST at a fake GCS server
+# (e.g. fsouza/fake-gcs-server); google-cloud-storage picks it up automatically.
+GCS_SIGNED_URL_EXPIRATION = int(os.getenv("GCS_SIGNED_URL_EXPIRATION", "900"))  # seconds
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))  # 20MB
+
+# Resumable chunked uploads (MOBILE_NETWORK_OPTIMIZATIONS['chunked_upload']).
+# Chunks are spooled on local disk, so route a booth's requests to one host
+# (or mount a shared volume) when running several web hosts.
+CHUNKED_UPLOAD_DIR = os.getenv("CHUNKED_UPLOAD_DIR", str(BASE_DIR / ".cache" / "uploads"))
+CHUNKED_UPLOAD_CHUNK_SIZE = int(os.getenv("CHUNKED_UPLOAD_CHUNK_SIZE", str(512 * 1024)))  # suggested to clients
+CHUNKED_UPLOAD_MAX_CHUNK = int(os.getenv("CHUNKED_UPLOAD_MAX_CHUNK", str(4 * 1024 * 1024)))
+CHUNKED_UPLOAD_TTL = int(os.getenv("CHUNKED_UPLOAD_TTL", str(24 * 3600)))  # seconds
+
+# Streaming uploads: files above the threshold go out as resumable uploads in
+# fixed-size chunks (must be a multiple of 256KB) so memory per request stays flat
+GCS_UPLOAD_CHUNK_SIZE = int(os.getenv("GCS_UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # 1MB
+GCS_STREAMING_THRESHOLD = int(os.getenv("GCS_STREAMING_THRESHOLD", str(1024 * 1024)))  # 1MB
+
+# Keep-alive connection pool size of the per-process GCS client
+GCS_HTTP_POOL_MAXSIZE = int(os.getenv("GCS_HTTP_POOL_MAXSIZE", "10"))
+
 # Google GenAI API Key (used by internal AI generation task)
 GOOGLE_GENAI_API_KEY = os.getenv("GOOGLE_GENAI_API_KEY", "")
+# Image generation model used by run_ai_generation_task
+GOOGLE_GENAI_IMAGE_MODEL = os.getenv("GOOGLE_GENAI_IMAGE_MODEL", "gemini-3.1-flash-image-preview")
+# Optional endpoint override (e.g. a local fake model server) and request timeout
+GOOGLE_GENAI_BASE_URL = os.getenv("GOOGLE_GENAI_BASE_URL", "")
+GOOGLE_GENAI_TIMEOUT_MS = int(os.getenv("GOOGLE_GENAI_TIMEOUT_MS", "120000"))
+# Cluster-wide admission control for model calls (Redis token bucket + concurrency leases).
+# "default" applies to every model; per-model overrides via AI_MODEL_LIMITS_JSON, e.g.
+# '{"gemini-3.1-flash-image-preview": {"rpm": 120, "burst": 20, "concurrency": 16}}'
+AI_MODEL_LIMITS = {
+    "default": {
+        "rpm": int(os.getenv("AI_MODEL_RPM", "60")),
+        "concurrency": int(os.getenv("AI_MODEL_CONCURRENCY", "8")),
+    },
+    **json.loads(os.getenv("AI_MODEL_LIMITS_JSON", "{}")),
+}
+AI_MODEL_LEASE_SECONDS = int(os.getenv("AI_MODEL_LEASE_SECONDS", "180"))  # > GOOGLE_GENAI_TIMEOUT_MS
+AI_THROTTLE_BUSY_RETRY_SECONDS = int(os.getenv("AI_THROTTLE_BUSY_RETRY_SECONDS", "3"))
+AI_THROTTLE_MAX_RETRIES = int(os.getenv("AI_THROTTLE_MAX_RETRIES", "40"))
+# AI job executor: "celery" (run_ai_generation_task on the ai queue) or "asyncio"
+# (many jobs per process in one event loop; run `manage.py run_ai_async_worker`)
+AI_EXECUTOR = os.getenv("AI_EXECUTOR", "celery")
+AI_ASYNC_CONCURRENCY = int(os.getenv("AI_ASYNC_CONCURRENCY", "32"))
+# Pre-import heavy modules and pre-load style reference images when a worker process starts
+AI_WORKER_WARMUP = os.getenv("AI_WORKER_WARMUP", "True").lower() in ("true", "1", "yes")
+
+# Style reference image cache (process-local LRU + on-disk cache, ETag revalidation)
+STYLE_ASSET_CACHE_DIR = os.getenv("STYLE_ASSET_CACHE_DIR", str(BASE_DIR / ".cache" / "style_assets"))
+STYLE_ASSET_MEMORY_ITEMS = int(os.getenv("STYLE_ASSET_MEMORY_ITEMS", "16"))
+STYLE_ASSET_TTL = int(os.getenv("STYLE_ASSET_TTL", "3600"))  # seconds before revalidation
+
+# Preprocessing of the user photo before the AI call (image_size="1K").
+# Per-style overrides: Style.generation_options["preprocess"] = {"max_side": .., "format": .., "quality": ..}
+AI_PREPROCESS = {
+    "max_side": int(os.getenv("AI_PREPROCESS_MAX_SIDE", "1024")),
+    "format": os.getenv("AI_PREPROCESS_FORMAT", "JPEG"),  # JPEG | WEBP | PNG
+    "quality": int(os.getenv("AI_PREPROCESS_QUALITY", "90")),
+}
+
+# Content-addressed AI result cache (Redis), keyed by input photo + prompt + generation config
+AI_RESULT_CACHE_ENABLED = os.getenv("AI_RESULT_CACHE_ENABLED", "True").lower() in ("true", "1", "yes")
+AI_RESULT_CACHE_TTL = int(os.getenv("AI_RESULT_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+AI_RESULT_CACHE_MAX_ENTRIES = int(os.getenv("AI_RESULT_CACHE_MAX_ENTRIES", "10000"))
+
+# Where QR images come from: "gcs" (rendered by Celery and uploaded) or
+# "endpoint" (rendered on request at /api/qr/<slug>.png|svg, cached by the CDN)
+QR_IMAGE_MODE = os.getenv("QR_IMAGE_MODE", "gcs")
+QR_IMAGE_MEMORY_ITEMS = int(os.getenv("QR_IMAGE_MEMORY_ITEMS", "2048"))
+QR_IMAGE_CACHE_TTL = int(os.getenv("QR_IMAGE_CACHE_TTL", str(60 * 60 * 24 * 7)))
+QR_IMAGE_MAX_AGE = int(os.getenv("QR_IMAGE_MAX_AGE", str(60 * 60 * 24 * 365)))
+
+# Fixed QR mask (0-7) skips the per-code mask search; empty = pick the best mask
+QR_MASK_PATTERN = int(os.environ["QR_MASK_PATTERN"]) if os.getenv("QR_MASK_PATTERN") else None
+
+# Bulk session provisioning: max sessions per request, QR codes per Celery batch task
+SESSION_BULK_MAX = int(os.getenv("SESSION_BULK_MAX", "200"))
+QR_BATCH_SIZE = int(os.getenv("QR_BATCH_SIZE", "25"))
+
+# Pre-rendered QR pool claimed by SessionCreateView (refilled by replenish_qr_pool)
+# (defaults to off unless beat runs the periodic top-up, and in endpoint mode)
+QR_POOL_ENABLED = os.getenv(
+    "QR_POOL_ENABLED", str(QR_IMAGE_MODE == "gcs" and CELERY_BEAT_ENABLED)
+).lower() in ("true", "1", "yes")
+QR_POOL_LOW_WATER = int(os.getenv("QR_POOL_LOW_WATER", "20"))
+QR_POOL_TARGET = int(os.getenv("QR_POOL_TARGET", "50"))
+# After one session asks for a top-up, others skip the pool count for this many seconds
+QR_POOL_REPLENISH_REQUEST_TTL = int(os.getenv("QR_POOL_REPLENISH_REQUEST_TTL", "10"))
+if QR_POOL_ENABLED:
+    CELERY_BEAT_SCHEDULE["replenish-qr-pool"] = {
+        "task": "image.tasks.replenish_qr_pool",
+        "schedule": float(os.getenv("QR_POOL_REPLENISH_INTERVAL", "30")),
+    }
+
+# Session list (cursor pagination)
+SESSION_LIST_PAGE_SIZE = int(os.getenv("SESSION_LIST_PAGE_SIZE", "50"))
+SESSION_LIST_COUNT_TTL = int(os.getenv("SESSION_LIST_COUNT_TTL", "30"))  # seconds
+
+# Redis snapshot served by SessionDetailView (refreshed on every Session/QRCode save)
+SESSION_SNAPSHOT_TTL = int(os.getenv("SESSION_SNAPSHOT_TTL", str(24 * 3600)))  # seconds
+
+# Cache-Control max-age for GET /api/styles (clients revalidate with ETag after it)
+STYLE_LIST_MAX_AGE = int(os.getenv("STYLE_LIST_MAX_AGE", "60"))
+
+# Rows fetched per server-side cursor round trip for session exports
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
+# /s/<slug> redirect cache (process-local TTL cache in front of Redis)
+REDIRECT_CACHE_TTL = int(os.getenv("REDIRECT_CACHE_TTL", str(7 * 24 * 3600)))  # resolved targets
+REDIRECT_NEGATIVE_TTL = int(os.getenv("REDIRECT_NEGATIVE_TTL", "5"))  # "not ready yet" / unknown slug
+REDIRECT_LOCAL_TTL = int(os.getenv("REDIRECT_LOCAL_TTL", "60"))  # cap for the per-process copy
+REDIRECT_LOCAL_ITEMS = int(os.getenv("REDIRECT_LOCAL_ITEMS", "10000"))
+REDIRECT_MAX_AGE = int(os.getenv("REDIRECT_MAX_AGE", "300"))  # Cache-Control on the 302
+
+# Original photo hand-off from the upload view to the AI task
+# ("redis" | "spool" for single-host setups | "" to disable).
+# The redis backend needs its own HANDOFF_REDIS_URL (a separate DB or instance)
+# so photo blobs never land in the Celery broker. Without one the hand-off is off:
+# a host-local spool only helps when web and worker share a disk, so opt in to it.
+HANDOFF_REDIS_URL = os.getenv("HANDOFF_REDIS_URL", "")
+HANDOFF_BACKEND = os.getenv("HANDOFF_BACKEND", "redis" if HANDOFF_REDIS_URL else "")
+HANDOFF_SPOOL_DIR = os.getenv("HANDOFF_SPOOL_DIR", str(BASE_DIR / ".cache" / "handoff"))
+HANDOFF_TTL = int(os.getenv("HANDOFF_TTL", "300"))  # seconds
+HANDOFF_MAX_BYTES = int(os.getenv("HANDOFF_MAX_BYTES", str(8 * 1024 * 1024)))  # 8MB
 
 # GCS Project and additional settings
 GCS_PROJECT_ID = os.getenv("GCS_PROJECT_ID", "")